@@ -0,0 +1,607 @@
+"""
+batch.py — Concurrent Batch Runner
+===================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Processes a day's worth of transcripts on a single asyncio event loop:
+    1. Discover transcripts (directory glob or manifest file)
+    2. load_transcript → extract_insights_async → route_all, per transcript
+    3. Bound in-flight API calls with a semaphore (--concurrency)
+    4. Print a per-transcript result / error summary at the end
+
+Design Decision: asyncio + AsyncAnthropic over a thread pool.
+Reason: Each transcript spends almost all of its wall-clock time waiting on
+        the API. One event loop holds N requests in flight for the cost of
+        N coroutines, so total time scales with transcripts / concurrency —
+        not with the transcript count.
+
+Design Decision: One failing transcript never kills the batch.
+Reason: Every transcript is isolated in its own try/except and reported in
+        the summary. A bad file at 2am should not cost the other 4,999.
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import anthropic        # Annotations only — main.make_client() imports the SDK
+
+from schema import RoutedAlert, CallMetadata
+from cache import ExtractionCache
+from scheduler import RateLimitScheduler
+from prefilter import Prefilter
+from main import load_transcript, extract_insights_async, make_client, TOKEN_USAGE
+from chunking import extract_insights_chunked_async
+from cascade import extract_insights_cascade_async, CASCADE_STATS
+from packing import (
+    extract_packed_async,
+    plan_packs,
+    PACKING_STATS,
+    PACK_MAX_TRANSCRIPT_CHARS
+)
+from error_handler import handle_empty_extraction, build_extraction_result, REPAIR_STATS
+from router import route_all, alert_to_dict
+from tracing import span, current_span, traced
+from journal import Journal, journal_key, insight_to_dict
+
+logger = logging.getLogger("jtbd.batch")
+
+# Default number of transcripts in flight at once
+DEFAULT_CONCURRENCY = 8
+
+
+# ─────────────────────────────────────────────────────────────
+# DATA STRUCTURES
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class BatchItemResult:
+    """
+    Outcome of one transcript inside a batch run.
+    status is one of: "routed" | "empty" | "failed" | "skipped" (delivered
+    by an earlier run, per the journal)
+    """
+    path:               str
+    transcript_id:      Optional[str]
+    account_name:       Optional[str]
+    status:             str
+    total_insights:     int = 0
+    alerts:             list[RoutedAlert] = field(default_factory=list)
+    processing_note:    Optional[str] = None
+    model_tier:         Optional[str] = None
+    error:              Optional[str] = None
+    elapsed_seconds:    float = 0.0
+
+
+# ─────────────────────────────────────────────────────────────
+# TRANSCRIPT DISCOVERY
+# ─────────────────────────────────────────────────────────────
+
+def discover_transcripts(
+    transcript_dir: Optional[str] = None,
+    manifest: Optional[str] = None,
+    pattern: str = "*.txt"
+) -> list[str]:
+    """
+    Collects transcript paths from a directory and/or a manifest file.
+
+    Manifest format: one transcript path per line. Blank lines and lines
+    starting with '#' are ignored. Relative paths resolve against the
+    manifest's own directory, so manifests can be moved with their data.
+    """
+    paths: list[str] = []
+
+    if transcript_dir:
+        paths.extend(str(p) for p in sorted(Path(transcript_dir).glob(pattern)))
+
+    if manifest:
+        manifest_path = Path(manifest)
+        for line in manifest_path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = Path(line)
+            if not entry.is_absolute():
+                entry = manifest_path.parent / entry
+            paths.append(str(entry))
+
+    # De-duplicate while preserving order
+    return list(dict.fromkeys(paths))
+
+
+def _read_for_ranking(path: str) -> str:
+    """Transcript text for prefilter ranking; unreadable files rank last."""
+    try:
+        return load_transcript(path)[0]
+    except Exception:
+        return ""
+
+
+# ─────────────────────────────────────────────────────────────
+# PER-TRANSCRIPT PIPELINE
+# ─────────────────────────────────────────────────────────────
+
+@traced("route_item")
+def route_item(
+    path: str,
+    metadata: CallMetadata,
+    insights: list,
+    processing_note: Optional[str],
+    started: float,
+    model_tier: Optional[str] = None,
+    journal: Optional[Journal] = None,
+    key: Optional[str] = None
+) -> BatchItemResult:
+    """Builds the ExtractionResult, routes it, and wraps the outcome."""
+    current_span().set_attribute("transcript_id", metadata.transcript_id)
+    if not insights:
+        current_span().set_attribute("status", "empty")
+        result = handle_empty_extraction(metadata)
+        if journal is not None:
+            journal.record(key, metadata.transcript_id, "routed", status="empty", alert_ids=[])
+        return BatchItemResult(
+            path=path,
+            transcript_id=metadata.transcript_id,
+            account_name=metadata.account_name,
+            status="empty",
+            processing_note=processing_note or result.processing_note,
+            model_tier=model_tier,
+            elapsed_seconds=time.perf_counter() - started,
+        )
+
+    result = build_extraction_result(metadata, insights, processing_note, model_tier)
+    alerts = route_all(result)
+    alert_ids = [alert.alert_id for alert in alerts]
+    current_span().set_attributes(status="routed", alerts=len(alerts), alert_ids=alert_ids)
+    if journal is not None:
+        journal.record(key, metadata.transcript_id, "routed", status="routed", alert_ids=alert_ids)
+    return BatchItemResult(
+        path=path,
+        transcript_id=metadata.transcript_id,
+        account_name=metadata.account_name,
+        status="routed",
+        total_insights=result.total_insights,
+        alerts=alerts,
+        processing_note=processing_note,
+        model_tier=result.model_tier,
+        elapsed_seconds=time.perf_counter() - started,
+    )
+
+async def process_transcript_async(
+    path: str,
+    client: Optional[anthropic.AsyncAnthropic],
+    semaphore: asyncio.Semaphore,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    chunked: bool = False,
+    validation: str = "strict",
+    cascade: Optional[tuple] = None,
+    prefilter: Optional[Prefilter] = None,
+    mode: str = "text",
+    journal: Optional[Journal] = None
+) -> BatchItemResult:
+    """
+    Runs load → extract → route for one transcript under the shared semaphore.
+    With a journal, each stage is recorded and a transcript seen by an
+    earlier run resumes from its last recorded stage (journal.py).
+    Never raises — failures are captured on the returned BatchItemResult.
+    """
+    async with semaphore:
+        # Opened inside the semaphore — the span measures work, not queueing
+        with span("process_transcript", path=path) as item_span:
+            started = time.perf_counter()
+            transcript_id = account_name = None
+            try:
+                transcript, metadata = load_transcript(path)
+                transcript_id = metadata.transcript_id
+                account_name = metadata.account_name
+                item_span.set_attributes(transcript_id=transcript_id, account_name=account_name)
+
+                key = entry = None
+                if journal is not None:
+                    key = journal_key(transcript_id, transcript)
+                    entry = journal.get(key)
+                    if entry is None:
+                        journal.record(key, transcript_id, "loaded", path=path)
+                    else:
+                        journal.note_resume(entry)
+                        item_span.set_attribute("resumed_from", entry.state)
+                        if entry.state == "delivered":
+                            return BatchItemResult(
+                                path=path,
+                                transcript_id=transcript_id,
+                                account_name=account_name,
+                                status="skipped",
+                                processing_note="Delivered by an earlier run (journal)",
+                                elapsed_seconds=time.perf_counter() - started,
+                            )
+                        if entry.path != path:
+                            journal.record(key, transcript_id, entry.state, path=path)
+
+                if prefilter is not None:
+                    decision = prefilter.evaluate(transcript, transcript_id)
+                    if decision.skip:
+                        handle_empty_extraction(metadata)
+                        return BatchItemResult(
+                            path=path,
+                            transcript_id=transcript_id,
+                            account_name=account_name,
+                            status="empty",
+                            processing_note=decision.note,
+                            elapsed_seconds=time.perf_counter() - started,
+                        )
+
+                model_tier = None
+                if entry is not None and entry.reached("validated"):
+                    insights = entry.validated_insights()
+                    processing_note, model_tier = entry.processing_note, entry.model_tier
+                elif cascade:
+                    insights, processing_note, model_tier = await extract_insights_cascade_async(
+                        transcript, metadata, client, tiers=cascade, chunked=chunked,
+                        mock=mock, cache=cache, refresh=refresh, validation=validation,
+                        mode=mode
+                    )
+                elif chunked:
+                    insights, processing_note = await extract_insights_chunked_async(
+                        transcript, metadata, client,
+                        mock=mock, cache=cache, refresh=refresh, validation=validation,
+                        mode=mode
+                    )
+                else:
+                    insights, processing_note = await extract_insights_async(
+                        transcript, metadata, client,
+                        mock=mock, cache=cache, refresh=refresh, validation=validation,
+                        mode=mode,
+                        raw_response=entry.raw_response if entry is not None else None,
+                        on_response=None if journal is None else (
+                            lambda raw: journal.record(key, transcript_id, "extracted", raw_response=raw)
+                        )
+                    )
+
+                if journal is not None and not (entry is not None and entry.reached("validated")):
+                    journal.record(
+                        key, transcript_id, "validated",
+                        insights=[insight_to_dict(insight) for insight in insights],
+                        processing_note=processing_note, model_tier=model_tier
+                    )
+
+                return route_item(
+                    path, metadata, insights, processing_note, started, model_tier,
+                    journal=journal, key=key
+                )
+
+            except Exception as e:
+                logger.error(f"Transcript '{path}' failed: {type(e).__name__}: {e}")
+                item_span.set_status("ERROR", f"{type(e).__name__}: {e}")
+                return BatchItemResult(
+                    path=path,
+                    transcript_id=transcript_id,
+                    account_name=account_name,
+                    status="failed",
+                    error=f"{type(e).__name__}: {e}",
+                    elapsed_seconds=time.perf_counter() - started,
+                )
+
+
+async def process_pack_async(
+    paths: list[str],
+    loaded: list[tuple[str, CallMetadata]],
+    client: Optional[anthropic.AsyncAnthropic],
+    semaphore: asyncio.Semaphore,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    validation: str = "strict",
+    prefilter: Optional[Prefilter] = None
+) -> list[BatchItemResult]:
+    """
+    Extracts several short transcripts with one packed request (packing.py)
+    and routes each one separately. Holds one semaphore slot — it is one
+    API request. Never raises; a failed request fails every item in it.
+    """
+    async with semaphore:
+        with span("process_pack", transcripts=len(paths),
+                  transcript_ids=[metadata.transcript_id for _, metadata in loaded]) as pack_span:
+            started = time.perf_counter()
+            results: list[Optional[BatchItemResult]] = [None] * len(paths)
+
+            pending = []
+            for i, (transcript, metadata) in enumerate(loaded):
+                decision = (
+                    prefilter.evaluate(transcript, metadata.transcript_id)
+                    if prefilter is not None else None
+                )
+                if decision is not None and decision.skip:
+                    handle_empty_extraction(metadata)
+                    results[i] = BatchItemResult(
+                        path=paths[i],
+                        transcript_id=metadata.transcript_id,
+                        account_name=metadata.account_name,
+                        status="empty",
+                        processing_note=decision.note,
+                        elapsed_seconds=time.perf_counter() - started,
+                    )
+                else:
+                    pending.append(i)
+
+            try:
+                if len(pending) > 1:
+                    extracted = await extract_packed_async(
+                        [loaded[i] for i in pending], client,
+                        mock=mock, cache=cache, refresh=refresh, validation=validation
+                    )
+                else:
+                    extracted = [
+                        await extract_insights_async(
+                            *loaded[i], client, mock=mock, cache=cache, refresh=refresh,
+                            validation=validation
+                        )
+                        for i in pending
+                    ]
+                for i, (insights, processing_note) in zip(pending, extracted):
+                    results[i] = route_item(
+                        paths[i], loaded[i][1], insights, processing_note, started
+                    )
+            except Exception as e:
+                logger.error(f"Packed request for {len(pending)} transcripts failed: "
+                             f"{type(e).__name__}: {e}")
+                pack_span.set_status("ERROR", f"{type(e).__name__}: {e}")
+                for i in pending:
+                    if results[i] is None:
+                        results[i] = BatchItemResult(
+                            path=paths[i],
+                            transcript_id=loaded[i][1].transcript_id,
+                            account_name=loaded[i][1].account_name,
+                            status="failed",
+                            error=f"{type(e).__name__}: {e}",
+                            elapsed_seconds=time.perf_counter() - started,
+                        )
+
+            return results
+
+
+async def run_batch_async(
+    paths: list[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    mock: bool = False,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    chunked: bool = False,
+    validation: str = "strict",
+    scheduler: Optional[RateLimitScheduler] = None,
+    cascade: Optional[tuple] = None,
+    prefilter: Optional[Prefilter] = None,
+    mode: str = "text",
+    pack: bool = False,
+    journal: Optional[Journal] = None
+) -> list[BatchItemResult]:
+    """
+    Processes every transcript concurrently, at most `concurrency` at a time.
+    With a scheduler, API calls additionally respect rate limits and the
+    scheduler's adaptive concurrency. With a prefilter, transcripts are
+    started most-urgent first. With pack=True, short transcripts share
+    packed requests (packing.py). Results keep the order of `paths`.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be >= 1, got: {concurrency}")
+    if pack and (cascade or mode != "text"):
+        raise ValueError("pack runs text mode on the primary model; it does not combine "
+                         "with a cascade or tool mode")
+
+    if client is None and not mock:
+        client = make_client(async_client=True, scheduler=scheduler)
+
+    order = list(range(len(paths)))
+    if prefilter is not None:
+        order = prefilter.rank([_read_for_ranking(p) for p in paths])
+
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info(
+        f"Batch started | Transcripts: {len(paths)} | Concurrency: {concurrency}"
+    )
+    packs: list[list[int]] = []
+    loaded: dict[int, tuple[str, CallMetadata]] = {}
+    if pack:
+        for i in order:
+            try:
+                loaded[i] = load_transcript(paths[i])
+            except Exception:
+                pass    # Reported by process_transcript_async as a failed item
+        # Unreadable files are forced onto the single-transcript path
+        lengths = [len(loaded[i][0]) if i in loaded else PACK_MAX_TRANSCRIPT_CHARS + 1
+                   for i in order]
+        planned, _ = plan_packs(lengths)
+        packs = [[order[j] for j in group] for group in planned]
+
+    # Semaphore waiters are served FIFO, so task creation order is processing order
+    packed_task_for: dict[int, tuple[asyncio.Task, int]] = {}
+    tasks: dict[int, asyncio.Task] = {}
+    pack_by_first = {group[0]: group for group in packs}
+    for i in order:
+        if i in pack_by_first:
+            group = pack_by_first[i]
+            task = asyncio.create_task(process_pack_async(
+                [paths[j] for j in group], [loaded[j] for j in group],
+                client, semaphore, mock=mock, cache=cache, refresh=refresh,
+                validation=validation, prefilter=prefilter
+            ))
+            for position, j in enumerate(group):
+                packed_task_for[j] = (task, position)
+        elif i not in packed_task_for:
+            tasks[i] = asyncio.create_task(process_transcript_async(
+                paths[i], client, semaphore,
+                mock=mock, cache=cache, refresh=refresh,
+                chunked=chunked, validation=validation, cascade=cascade,
+                prefilter=prefilter, mode=mode, journal=journal
+            ))
+
+    await asyncio.gather(*tasks.values(), *{t for t, _ in packed_task_for.values()})
+    return [
+        tasks[i].result() if i in tasks
+        else packed_task_for[i][0].result()[packed_task_for[i][1]]
+        for i in range(len(paths))
+    ]
+
+
+# ─────────────────────────────────────────────────────────────
+# OUTPUT
+# ─────────────────────────────────────────────────────────────
+
+def batch_result_to_dict(item: BatchItemResult) -> dict:
+    """Serializes one BatchItemResult for JSON output."""
+    return {
+        "path":             item.path,
+        "transcript_id":    item.transcript_id,
+        "account":          item.account_name,
+        "status":           item.status,
+        "total_insights":   item.total_insights,
+        "processing_note":  item.processing_note,
+        "model_tier":       item.model_tier,
+        "error":            item.error,
+        "elapsed_seconds":  round(item.elapsed_seconds, 3),
+        "alerts":           [alert_to_dict(a) for a in item.alerts],
+    }
+
+
+def print_batch_summary(results: list[BatchItemResult], wall_seconds: float) -> None:
+    """
+    Prints the per-transcript result table plus batch totals.
+    Failed transcripts are listed with their error so they can be re-queued.
+    """
+    print("\n" + "═" * 65)
+    print("  BATCH SUMMARY")
+    print("═" * 65)
+
+    status_icons = {"routed": "✅", "empty": "ℹ️ ", "failed": "❌", "skipped": "⏭️ "}
+    for item in results:
+        label = item.transcript_id or Path(item.path).name
+        print(
+            f"  {status_icons.get(item.status, '  ')} {label:28} "
+            f"{item.status:7} {item.total_insights:3} insights  "
+            f"{item.elapsed_seconds:6.2f}s"
+        )
+        if item.error:
+            print(f"       {item.error}")
+
+    routed = sum(1 for r in results if r.status == "routed")
+    empty = sum(1 for r in results if r.status == "empty")
+    failed = sum(1 for r in results if r.status == "failed")
+    skipped = sum(1 for r in results if r.status == "skipped")
+    total_alerts = sum(len(r.alerts) for r in results)
+    rate = len(results) / wall_seconds if wall_seconds > 0 else 0.0
+
+    print("─" * 65)
+    print(f"  Transcripts: {len(results)}  |  Routed: {routed}  |  "
+          f"Empty: {empty}  |  Failed: {failed}"
+          + (f"  |  Skipped: {skipped}" if skipped else ""))
+    print(f"  Alerts:      {total_alerts}")
+    print(f"  Wall time:   {wall_seconds:.2f}s ({rate:.1f} transcripts/s)")
+    print("═" * 65 + "\n")
+
+
+def token_usage_summary(transcripts: int) -> str:
+    """Requests and tokens across all models, per transcript."""
+    requests = sum(u["requests"] for u in TOKEN_USAGE.values())
+    input_tokens = sum(u["input_tokens"] for u in TOKEN_USAGE.values())
+    output_tokens = sum(u["output_tokens"] for u in TOKEN_USAGE.values())
+    n = max(transcripts, 1)
+    return (
+        f"API usage: {requests} requests ({requests / n:.2f}/transcript) | "
+        f"{input_tokens} in / {output_tokens} out tokens "
+        f"({input_tokens / n:.0f} / {output_tokens / n:.0f} per transcript)"
+    )
+
+
+def run_batch(
+    paths: list[str],
+    output_format: str = "terminal",
+    mock: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    chunked: bool = False,
+    validation: str = "strict",
+    scheduler: Optional[RateLimitScheduler] = None,
+    cascade: Optional[tuple] = None,
+    prefilter: Optional[Prefilter] = None,
+    mode: str = "text",
+    pack: bool = False,
+    journal: Optional[Journal] = None
+) -> list[BatchItemResult]:
+    """
+    CLI entry point for batch mode. Runs the event loop and prints output.
+    With a journal and JSON output, transcripts are marked delivered once
+    their alerts are written. The terminal summary has no alerts, so a
+    terminal run leaves them at "routed" for a later run to deliver.
+    """
+    if not paths:
+        print("\n  ⚠️  No transcripts found for batch run.\n")
+        return []
+
+    if output_format != "json":
+        print("\n" + "═" * 65)
+        print("  JTBD FEEDBACK LOOP — BATCH EXTRACTION")
+        print(f"  {len(paths)} transcripts | concurrency {concurrency}"
+              f"{' | MOCK MODE' if mock else ''}")
+        print("═" * 65)
+
+    started = time.perf_counter()
+    results = asyncio.run(run_batch_async(
+        paths, concurrency=concurrency, mock=mock,
+        cache=cache, refresh=refresh, chunked=chunked,
+        validation=validation, scheduler=scheduler, cascade=cascade,
+        prefilter=prefilter, mode=mode, pack=pack, journal=journal
+    ))
+    wall_seconds = time.perf_counter() - started
+
+    alert_ids = sorted({alert.alert_id for r in results for alert in r.alerts})
+    with span("deliver", output_format=output_format, transcripts=len(results),
+              alerts=len(alert_ids), alert_ids=alert_ids):
+        if output_format == "json":
+            print(json.dumps({
+                "wall_seconds": round(wall_seconds, 3),
+                "results": [batch_result_to_dict(r) for r in results],
+            }, indent=2))
+        else:
+            print_batch_summary(results, wall_seconds)
+
+        if journal is not None and output_format == "json":
+            # After the output, not before — a crash in between re-delivers, never loses.
+            # Terminal output is a status table with no alerts, so it delivers nothing.
+            sys.stdout.flush()
+            journal.mark_delivered([r.path for r in results if r.status in ("routed", "empty")])
+
+    if output_format != "json":
+        if cache is not None:
+            print(f"  {cache.summary()}")
+        if scheduler is not None:
+            print(f"  {scheduler.summary()}")
+        if prefilter is not None:
+            print(f"  {prefilter.summary()}")
+        if pack:
+            print(f"  {PACKING_STATS.summary()}")
+        if TOKEN_USAGE:
+            print(f"  {token_usage_summary(len(results))}")
+        if cascade:
+            print("  " + CASCADE_STATS.summary(cascade).replace("\n", "\n  "))
+        if REPAIR_STATS.attempts:
+            print(f"  {REPAIR_STATS.summary()}")
+        if journal is not None:
+            journal.flush()
+            print(f"  {journal.summary()}")
+            print("  Journal: terminal output carries no alerts — nothing marked delivered "
+                  "(--output json delivers)")
+        print()
+
+    return results
@@ -0,0 +1,384 @@
+"""
+batch_api.py — Offline Message Batches Mode
+============================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Nightly backfills don't need answers in seconds — they need them cheap.
+The Message Batches API processes requests asynchronously at a discount:
+
+    1. BUILD   — one batch request per transcript, same extraction prompt
+                 as the synchronous path (build_extraction_content)
+    2. SUBMIT  — messages.batches.create → checkpoint file written
+    3. POLL    — messages.batches.retrieve until processing has ended
+    4. COLLECT — messages.batches.results → parse_with_local_repair
+                 → build_extraction_result → route_all, per transcript
+
+Design Decision: Checkpoint before polling, resume from the checkpoint.
+Reason: A backfill batch can take hours. If the process dies after
+        submitting, rerunning the same command must pick up the batch
+        that is already paid for — not submit a second one.
+
+Design Decision: The checkpoint carries each call's metadata and cache key.
+Reason: Results arrive hours after submit. By then a transcript may have
+        been moved, archived or edited; collecting must route what was
+        submitted without re-reading the file. An item whose checkpoint
+        predates these fields and whose file is gone fails on its own.
+
+Design Decision: LocalBatchClient as a stand-in for the batches endpoint.
+Reason: Resume-after-crash has to be testable without network access.
+        The stand-in keeps its state on disk, exactly like the real
+        endpoint keeps it server-side, so a killed process can resume.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from schema import CallMetadata
+from cache import ExtractionCache
+from prompts import build_system_blocks, build_extraction_content
+from error_handler import (
+    parse_with_local_repair,
+    handle_json_parse_failure,
+    handle_validation_failure,
+    ExtractionValidationError
+)
+from main import (
+    EXTRACTION_MODEL,
+    MOCK_API_RESPONSE,
+    load_transcript,
+    size_max_tokens,
+    response_text,
+    record_usage
+)
+from batch import BatchItemResult, route_item
+
+logger = logging.getLogger("jtbd.batch_api")
+
+DEFAULT_CHECKPOINT = ".jtbd_batch_checkpoint.json"
+DEFAULT_POLL_INTERVAL = 60.0        # Seconds between status checks
+DEFAULT_LOCAL_BATCH_DIR = ".jtbd_local_batches"
+
+
+# ─────────────────────────────────────────────────────────────
+# CHECKPOINT
+# ─────────────────────────────────────────────────────────────
+
+def load_checkpoint(path: str) -> Optional[dict]:
+    """Returns the saved checkpoint, or None if there is none."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    """Atomic write — a crash mid-write never leaves a corrupt checkpoint."""
+    target = Path(path)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+# ─────────────────────────────────────────────────────────────
+# REQUEST BUILDING
+# ─────────────────────────────────────────────────────────────
+
+def build_batch_request(custom_id: str, transcript: str, metadata: CallMetadata) -> dict:
+    """
+    One Message Batches request — the same model, prompt and response budget
+    as the synchronous primary extraction, so cache keys line up.
+    """
+    return {
+        "custom_id": custom_id,
+        "params": {
+            "model": EXTRACTION_MODEL,
+            "max_tokens": size_max_tokens(transcript),
+            "system": build_system_blocks(),
+            "messages": [{
+                "role": "user",
+                "content": build_extraction_content(
+                    transcript=transcript,
+                    csm_name=metadata.csm_name,
+                    account_name=metadata.account_name,
+                    call_date=metadata.call_date
+                ),
+            }],
+        },
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# LOCAL STAND-IN
+# ─────────────────────────────────────────────────────────────
+
+class _LocalBatches:
+    """
+    Disk-backed stand-in for client.messages.batches (create / retrieve / results).
+    A batch "ends" `complete_after` seconds after creation; results come from
+    `respond(params) -> str`, by default the mock extraction response.
+    """
+
+    def __init__(self, root: str, complete_after: float, respond: Callable[[dict], str]):
+        self.root = Path(root)
+        self.complete_after = complete_after
+        self.respond = respond
+
+    def _dir(self, batch_id: str) -> Path:
+        return self.root / batch_id
+
+    def create(self, requests: list[dict]):
+        batch_id = f"msgbatch_local_{uuid.uuid4().hex[:16]}"
+        batch_dir = self._dir(batch_id)
+        batch_dir.mkdir(parents=True)
+        with open(batch_dir / "requests.jsonl", "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request) + "\n")
+        (batch_dir / "meta.json").write_text(
+            json.dumps({"created_at": time.time(), "count": len(requests)}), encoding="utf-8"
+        )
+        return self.retrieve(batch_id)
+
+    def retrieve(self, batch_id: str):
+        meta = json.loads((self._dir(batch_id) / "meta.json").read_text(encoding="utf-8"))
+        ended = time.time() - meta["created_at"] >= self.complete_after
+        return SimpleNamespace(
+            id=batch_id,
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(
+                processing=0 if ended else meta["count"],
+                succeeded=meta["count"] if ended else 0,
+                errored=0, canceled=0, expired=0,
+            ),
+        )
+
+    def results(self, batch_id: str):
+        with open(self._dir(batch_id) / "requests.jsonl", encoding="utf-8") as f:
+            for line in f:
+                request = json.loads(line)
+                text = self.respond(request["params"])
+                yield SimpleNamespace(
+                    custom_id=request["custom_id"],
+                    result=SimpleNamespace(
+                        type="succeeded",
+                        message=SimpleNamespace(
+                            content=[SimpleNamespace(type="text", text=text)],
+                            stop_reason="end_turn",
+                            usage=SimpleNamespace(
+                                input_tokens=0, output_tokens=0,
+                                cache_read_input_tokens=0, cache_creation_input_tokens=0,
+                            ),
+                        ),
+                    ),
+                )
+
+
+class LocalBatchClient:
+    """Offline client exposing only .messages.batches — see _LocalBatches."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_LOCAL_BATCH_DIR,
+        complete_after: float = 0.0,
+        respond: Callable[[dict], str] = lambda params: MOCK_API_RESPONSE
+    ):
+        self.messages = SimpleNamespace(batches=_LocalBatches(root, complete_after, respond))
+
+
+# ─────────────────────────────────────────────────────────────
+# SUBMIT / POLL / COLLECT
+# ─────────────────────────────────────────────────────────────
+
+def _primary_cache_key(transcript: str, metadata: CallMetadata) -> str:
+    """The key the synchronous primary extraction would use for this call."""
+    return ExtractionCache.make_key(
+        transcript, metadata.csm_name, metadata.account_name,
+        metadata.call_date, EXTRACTION_MODEL, size_max_tokens(transcript)
+    )
+
+
+def submit_or_resume(paths: list[str], client, checkpoint_path: str) -> dict:
+    """
+    Returns the checkpoint for this set of transcripts, submitting a new
+    batch only if no checkpoint covers exactly these paths.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint and sorted(checkpoint["items"].values()) == sorted(paths):
+        logger.info(
+            f"Resuming batch {checkpoint['batch_id']} from checkpoint "
+            f"({len(paths)} transcripts, status: {checkpoint['status']})"
+        )
+        return checkpoint
+    if checkpoint:
+        logger.warning(
+            f"Checkpoint {checkpoint_path} is for a different transcript set — "
+            f"submitting a new batch"
+        )
+
+    requests, items, metadatas, cache_keys = [], {}, {}, {}
+    for n, path in enumerate(paths):
+        transcript, metadata = load_transcript(path)
+        custom_id = f"t{n:06d}"      # API ids: [A-Za-z0-9_-]{1,64}
+        items[custom_id] = path
+        metadatas[custom_id] = asdict(metadata)
+        cache_keys[custom_id] = _primary_cache_key(transcript, metadata)
+        requests.append(build_batch_request(custom_id, transcript, metadata))
+
+    batch = client.messages.batches.create(requests=requests)
+    checkpoint = {
+        "batch_id":     batch.id,
+        "submitted_at": time.time(),
+        "status":       batch.processing_status,
+        "items":        items,
+        "metadata":     metadatas,
+        "cache_keys":   cache_keys,
+    }
+    save_checkpoint(checkpoint_path, checkpoint)
+    logger.info(f"Submitted batch {batch.id} | {len(requests)} requests | checkpoint: {checkpoint_path}")
+    return checkpoint
+
+
+def wait_for_batch(
+    client,
+    checkpoint: dict,
+    checkpoint_path: str,
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+) -> None:
+    """Polls until the batch has ended, recording progress in the checkpoint."""
+    while True:
+        batch = client.messages.batches.retrieve(checkpoint["batch_id"])
+        counts = batch.request_counts
+        checkpoint["status"] = batch.processing_status
+        save_checkpoint(checkpoint_path, checkpoint)
+        if batch.processing_status == "ended":
+            logger.info(
+                f"Batch {batch.id} ended | succeeded: {counts.succeeded} | "
+                f"errored: {counts.errored} | expired: {counts.expired} | canceled: {counts.canceled}"
+            )
+            return
+        logger.info(
+            f"Batch {batch.id} {batch.processing_status} | processing: {counts.processing} | "
+            f"next check in {poll_interval:.0f}s"
+        )
+        time.sleep(poll_interval)
+
+
+def _submitted_item(checkpoint: dict, custom_id: str, path: str) -> tuple[CallMetadata, Optional[str]]:
+    """
+    (metadata, cache key) as recorded at submit time. Checkpoints written
+    before those were recorded fall back to re-reading the transcript —
+    raises OSError if it is gone.
+    """
+    recorded = checkpoint.get("metadata", {}).get(custom_id)
+    if recorded is not None:
+        return CallMetadata(**recorded), checkpoint.get("cache_keys", {}).get(custom_id)
+    transcript, metadata = load_transcript(path)
+    return metadata, _primary_cache_key(transcript, metadata)
+
+
+def collect_results(
+    client,
+    checkpoint: dict,
+    cache: Optional[ExtractionCache] = None
+) -> list[BatchItemResult]:
+    """
+    Parses, validates and routes every batch result exactly as the synchronous
+    path does. Complete raw responses that validate are also written to the
+    extraction cache, so a later synchronous run over the same transcripts
+    is free; truncated (max_tokens) or unusable ones never are.
+    There is no fallback round trip offline: unusable results are reported
+    as failed and can be re-run synchronously. Transcripts are not re-read;
+    metadata comes from the checkpoint.
+    """
+    results: dict[str, BatchItemResult] = {}
+
+    for entry in client.messages.batches.results(checkpoint["batch_id"]):
+        path = checkpoint["items"].get(entry.custom_id)
+        if path is None:
+            continue
+        started = time.perf_counter()
+        try:
+            metadata, cache_key = _submitted_item(checkpoint, entry.custom_id, path)
+        except OSError as e:
+            logger.error(f"Batch result for '{path}' cannot be routed: {type(e).__name__}: {e}")
+            results[entry.custom_id] = BatchItemResult(
+                path=path, transcript_id=None, account_name=None, status="failed",
+                error=f"Transcript unreadable at collect time: {type(e).__name__}: {e}",
+            )
+            continue
+
+        if entry.result.type != "succeeded":
+            results[entry.custom_id] = BatchItemResult(
+                path=path, transcript_id=metadata.transcript_id,
+                account_name=metadata.account_name, status="failed",
+                error=f"Batch request {entry.result.type}",
+            )
+            continue
+
+        message = entry.result.message
+        raw_response = response_text(message)
+        record_usage(EXTRACTION_MODEL, message)
+
+        try:
+            insights, processing_note = parse_with_local_repair(raw_response)
+        except json.JSONDecodeError:
+            handle_json_parse_failure(raw_response, attempt=1)
+            error = "Unparseable batch response"
+        except ExtractionValidationError as e:
+            handle_validation_failure(e, attempt=1)
+            error = f"Validation failed: {e}"
+        else:
+            # Only a complete, valid response may stand in for a sync primary call —
+            # the sync path would have continued a max_tokens stop, not replayed it
+            if cache is not None and cache_key is not None and message.stop_reason != "max_tokens":
+                cache.put(cache_key, raw_response, model=EXTRACTION_MODEL,
+                          transcript_id=metadata.transcript_id)
+            results[entry.custom_id] = route_item(
+                path, metadata, insights, processing_note, started
+            )
+            continue
+
+        results[entry.custom_id] = BatchItemResult(
+            path=path, transcript_id=metadata.transcript_id,
+            account_name=metadata.account_name, status="failed", error=error,
+        )
+
+    # Requests the batch never returned (expired batch, truncated results)
+    for custom_id, path in checkpoint["items"].items():
+        recorded = checkpoint.get("metadata", {}).get(custom_id) or {}
+        results.setdefault(custom_id, BatchItemResult(
+            path=path, transcript_id=recorded.get("transcript_id"),
+            account_name=recorded.get("account_name"),
+            status="failed", error="No result returned by batch",
+        ))
+
+    return [results[custom_id] for custom_id in sorted(checkpoint["items"])]
+
+
+def run_batch_api(
+    paths: list[str],
+    client,
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    cache: Optional[ExtractionCache] = None
+) -> list[BatchItemResult]:
+    """
+    Submit (or resume) → poll → collect → route.
+    The checkpoint is removed once results are collected; a rerun after
+    that submits a fresh batch.
+    """
+    checkpoint = submit_or_resume(paths, client, checkpoint_path)
+    if checkpoint["status"] != "ended":
+        wait_for_batch(client, checkpoint, checkpoint_path, poll_interval)
+
+    results = collect_results(client, checkpoint, cache)
+    Path(checkpoint_path).unlink(missing_ok=True)
+    logger.info(f"Batch {checkpoint['batch_id']} collected — checkpoint removed")
+    return results
@@ -0,0 +1,358 @@
+"""
+bench.py — Pipeline Stage Benchmarks + Regression Check
+========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Measures every local stage of the pipeline on the synthetic corpus
+(corpus.py) at 1, 1k and 100k transcripts / insights:
+
+    load_transcript        — file → (transcript, CallMetadata)
+    build_extraction_prompt
+    parse_and_validate     — raw response → validated insights
+    validate_insight_dict  — one raw insight dict
+    route_all              — ExtractionResult → sorted RoutedAlerts
+    format_alert_terminal  — one alert
+    format_alerts_as_json  — one call's alerts
+    run_pipeline           — end to end, mock mode, stdout discarded
+
+Per stage and size: throughput, p50 / p99 latency per call, and peak
+traced memory. Results are written as JSON and compared against a stored
+baseline; a regression beyond the tolerance exits non-zero.
+
+    python bench.py --save-baseline                  # record a baseline
+    python bench.py                                  # compare against it
+    python bench.py --sizes 1,1000 --stages route_all,parse_and_validate
+
+Design Decision: Timing and memory are separate passes.
+Reason: tracemalloc hooks every allocation and slows the code it watches
+        several-fold. Latency is measured untraced; peak memory comes from
+        a second, traced pass that keeps every output alive, the way a
+        batch run holds its results.
+
+Design Decision: Large sizes cycle through a fixed pool of corpus items.
+Reason: 100k distinct transcripts would benchmark the corpus generator
+        and the page cache, not the pipeline. The pool is large enough
+        that no stage can serve a result from a warm entry.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import logging
+import tempfile
+import tracemalloc
+import contextlib
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from corpus import generate_item, generate_insight_dicts, DEFAULT_SEED
+from prompts import build_extraction_prompt
+from error_handler import parse_and_validate, validate_insight_dict, build_extraction_result
+from router import route_all, format_alert_terminal, format_alerts_as_json
+from main import load_transcript, run_pipeline
+from logging_config import configure_logging
+
+logger = logging.getLogger("jtbd.bench")
+
+DEFAULT_SIZES = (1, 1_000, 100_000)
+DEFAULT_OUTPUT = "bench_results.json"
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.25        # Allowed relative slowdown / growth before failing
+POOL_SIZE = 10_000              # Distinct corpus items; larger sizes cycle through them
+MIN_OPS_TO_COMPARE = 100        # Latency of fewer calls is noise, not a regression
+P99_NOISE_FLOOR_US = 25.0       # Smaller p99 shifts are scheduler jitter, not a regression
+MEMORY_SAMPLE = 1_000           # Traced calls for stages that return nothing to retain
+
+
+# ─────────────────────────────────────────────────────────────
+# WORKLOAD
+# ─────────────────────────────────────────────────────────────
+
+class Workload:
+    """
+    Corpus-derived inputs for every stage, built once per pool item
+    (happy-path responses only — failure recovery is not a local stage).
+    """
+
+    def __init__(self, seed: int = DEFAULT_SEED, pool_size: int = POOL_SIZE):
+        self.seed = seed
+        self.pool_size = pool_size
+        self._dir = tempfile.TemporaryDirectory(prefix="jtbd_bench_")
+        self.paths: list[str] = []
+        self.responses: list[str] = []
+        self.loaded: list[tuple] = []
+        self.results: list = []
+        self.alerts: list[list] = []
+        self.insight_dicts: list[dict] = []
+
+    def _ensure(self, size: int) -> int:
+        """Grows the pool to min(size, pool_size) items; returns the pool length."""
+        target = min(size, self.pool_size)
+        for index in range(len(self.paths), target):
+            item = generate_item(index, self.seed, failure_rate=0.0)
+            path = Path(self._dir.name) / f"{item.transcript_id}.txt"
+            path.write_text(item.transcript, encoding="utf-8")
+            transcript, metadata = load_transcript(str(path))
+            insights, note = parse_and_validate(item.response)
+            result = build_extraction_result(metadata, insights, note)
+
+            self.paths.append(str(path))
+            self.responses.append(item.response)
+            self.loaded.append((transcript, metadata))
+            self.results.append(result)
+            self.alerts.append(route_all(result))
+        if len(self.insight_dicts) < target:
+            self.insight_dicts = list(generate_insight_dicts(target, self.seed))
+        return target
+
+    def take(self, pool: str, size: int) -> list:
+        """`size` inputs from one pool, cycling when size exceeds the pool."""
+        self._ensure(size)
+        values = getattr(self, pool)
+        return [values[i % len(values)] for i in range(size)]
+
+    @property
+    def flat_alerts(self) -> list:
+        """Every alert of every pool item, one list."""
+        return [alert for alerts in self.alerts for alert in alerts]
+
+    def close(self) -> None:
+        self._dir.cleanup()
+
+
+def _run_pipeline_mock(path: str) -> None:
+    run_pipeline(path, mock=True)
+
+
+# stage → (workload pool, operation)
+STAGES: dict[str, tuple[str, Callable]] = {
+    "load_transcript":          ("paths",         load_transcript),
+    "build_extraction_prompt":  ("loaded",        lambda tm: build_extraction_prompt(
+                                                      tm[0], tm[1].csm_name, tm[1].account_name, tm[1].call_date)),
+    "parse_and_validate":       ("responses",     parse_and_validate),
+    "validate_insight_dict":    ("insight_dicts", lambda raw: validate_insight_dict(raw, 0)),
+    "route_all":                ("results",       route_all),
+    "format_alert_terminal":    ("flat_alerts",   format_alert_terminal),
+    "format_alerts_as_json":    ("alerts",        format_alerts_as_json),
+    "run_pipeline":             ("paths",         _run_pipeline_mock),
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# MEASUREMENT
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class BenchResult:
+    """One stage at one size."""
+    stage:          str
+    size:           int
+    seconds:        float
+    throughput:     float       # Calls per second
+    p50_us:         float
+    p99_us:         float
+    peak_kb:        float       # Peak traced memory, all outputs retained
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already-sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def measure(stage: str, op: Callable, inputs: list) -> BenchResult:
+    """
+    Untraced timing pass, then a traced pass for peak memory.
+    A stage that returns nothing (run_pipeline) retains nothing, so its
+    peak is per-call and the traced pass stops after MEMORY_SAMPLE calls.
+    """
+    warm = op(inputs[0])    # Warm-up: imports, regex compilation, first-call caches
+    traced = inputs if warm is not None else inputs[:MEMORY_SAMPLE]
+
+    latencies = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for value in inputs:
+        t0 = clock()
+        op(value)
+        latencies.append(clock() - t0)
+    total = (clock() - started) / 1e9
+    latencies.sort()
+
+    tracemalloc.start()
+    outputs = [op(value) for value in traced]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del outputs
+
+    return BenchResult(
+        stage=stage,
+        size=len(inputs),
+        seconds=round(total, 6),
+        throughput=round(len(inputs) / total, 1) if total else 0.0,
+        p50_us=round(percentile(latencies, 0.50) / 1000, 2),
+        p99_us=round(percentile(latencies, 0.99) / 1000, 2),
+        peak_kb=round(peak / 1024, 1),
+    )
+
+
+def run_benchmarks(
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    stages: Optional[list[str]] = None,
+    seed: int = DEFAULT_SEED
+) -> list[BenchResult]:
+    """Runs every requested stage at every size. Pipeline stdout is discarded."""
+    workload = Workload(seed)
+    results = []
+    try:
+        for stage in stages or list(STAGES):
+            pool, op = STAGES[stage]
+            for size in sizes:
+                inputs = workload.take(pool, size)
+                with open(os.devnull, "w", encoding="utf-8") as devnull, \
+                     contextlib.redirect_stdout(devnull):
+                    result = measure(stage, op, inputs)
+                results.append(result)
+                logger.info(
+                    f"{stage} @ {size}: {result.throughput:,.0f}/s | "
+                    f"p50 {result.p50_us:.1f}µs | p99 {result.p99_us:.1f}µs | peak {result.peak_kb:,.0f} KB"
+                )
+    finally:
+        workload.close()
+    return results
+
+
+# ─────────────────────────────────────────────────────────────
+# BASELINE COMPARISON
+# ─────────────────────────────────────────────────────────────
+
+def save_results(path: str, results: list[BenchResult], seed: int) -> None:
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "seed":      seed,
+        },
+        "results": [asdict(r) for r in results],
+    }
+    Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+def compare_to_baseline(
+    results: list[BenchResult],
+    baseline: dict,
+    tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """
+    Returns one message per regression: throughput down, p99 up or peak
+    memory up by more than `tolerance` relative to the baseline.
+    Latency is only compared with at least MIN_OPS_TO_COMPARE calls, and
+    p99 must also grow by more than P99_NOISE_FLOOR_US.
+    """
+    previous = {(r["stage"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = previous.get((result.stage, result.size))
+        if base is None:
+            continue
+        label = f"{result.stage} @ {result.size}"
+        if result.size >= MIN_OPS_TO_COMPARE:
+            if base["throughput"] and result.throughput < base["throughput"] * (1 - tolerance):
+                regressions.append(
+                    f"{label}: throughput {result.throughput:,.0f}/s vs baseline {base['throughput']:,.0f}/s"
+                )
+            if base["p99_us"] and result.p99_us > max(
+                base["p99_us"] * (1 + tolerance), base["p99_us"] + P99_NOISE_FLOOR_US
+            ):
+                regressions.append(
+                    f"{label}: p99 {result.p99_us:.1f}µs vs baseline {base['p99_us']:.1f}µs"
+                )
+        if base["peak_kb"] and result.peak_kb > base["peak_kb"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: peak memory {result.peak_kb:,.0f} KB vs baseline {base['peak_kb']:,.0f} KB"
+            )
+    return regressions
+
+
+def format_report(results: list[BenchResult], baseline: Optional[dict] = None) -> str:
+    """Terminal table; throughput change vs baseline where one exists."""
+    previous = {(r["stage"], r["size"]): r for r in (baseline or {}).get("results", [])}
+    lines = [
+        "═" * 92,
+        f"  {'STAGE':26} {'SIZE':>8} {'CALLS/S':>12} {'P50 µs':>10} {'P99 µs':>10} {'PEAK KB':>11}  VS BASE",
+        "─" * 92,
+    ]
+    for r in results:
+        base = previous.get((r.stage, r.size))
+        delta = f"{(r.throughput / base['throughput'] - 1):+.0%}" if base and base["throughput"] else ""
+        lines.append(
+            f"  {r.stage:26} {r.size:>8,} {r.throughput:>12,.0f} {r.p50_us:>10.1f} "
+            f"{r.p99_us:>10.1f} {r.peak_kb:>11,.0f}  {delta}"
+        )
+    lines.append("═" * 92)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every local pipeline stage")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated sizes (default: 1,1000,100000)")
+    parser.add_argument("--stages", help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Corpus seed")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results JSON (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help=f"Baseline JSON to compare against, if it exists (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Relative regression allowed before failing (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args()
+
+    # Stage logging would dominate the numbers — only the bench itself reports
+    configure_logging()
+    logging.getLogger("jtbd").setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    stages = args.stages.split(",") if args.stages else None
+    unknown = [s for s in stages or [] if s not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(unknown)}")
+    sizes = tuple(int(s) for s in args.sizes.split(","))
+
+    results = run_benchmarks(sizes, stages, args.seed)
+    save_results(args.output, results, args.seed)
+
+    baseline = None
+    if not args.save_baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    print(format_report(results, baseline))
+    print(f"  Results: {args.output}")
+
+    if args.save_baseline:
+        save_results(args.baseline, results, args.seed)
+        print(f"  Baseline saved: {args.baseline}\n")
+        return
+    if baseline is None:
+        print(f"  No baseline at {args.baseline} — run with --save-baseline to record one\n")
+        return
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n  ❌ {len(regressions)} REGRESSION(S) beyond {args.tolerance:.0%} of baseline:")
+        for message in regressions:
+            print(f"     - {message}")
+        print()
+        sys.exit(1)
+    print(f"  ✅ No regressions beyond {args.tolerance:.0%} of baseline\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+bench_memory.py — Alert Memory Benchmark (Bytes per Alert)
+===========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Dashboard aggregation holds a day of RoutedAlerts in memory at once. This
+builds that working set the way the pipeline does — header parsed from
+transcript text, insights parsed from a model response, routed — and
+reports what each retained alert costs, including its insight, its share
+of the call's CallMetadata and every string either one holds:
+
+    python bench_memory.py                       # 1M alerts
+    python bench_memory.py --alerts 100000 --output memory_results.json
+
+Design Decision: Cycle a pool of corpus items, but parse each call afresh.
+Reason: Generating a million distinct transcripts would benchmark corpus.py.
+        Parsing the pooled text again still allocates new strings for every
+        call, as a real run does, so duplicated metadata shows up in the
+        number instead of being hidden by the pool.
+
+Design Decision: Retained bytes are the growth in peak RSS.
+Reason: sys.getsizeof is shallow — it counts an alert's slots but none of
+        the insight, metadata or strings behind them — and tracemalloc
+        slows allocation several-fold, turning a one-minute build into
+        several. Peak RSS is what the aggregation host actually pays,
+        allocator overhead included. Per-class shallow sizes are still
+        reported, since they show what slots save. Unix only (resource).
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import resource
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from corpus import generate_item, DEFAULT_SEED
+from error_handler import parse_and_validate, build_extraction_result
+from router import route_all
+from main import parse_transcript
+from logging_config import configure_logging
+
+logger = logging.getLogger("jtbd.bench_memory")
+
+DEFAULT_ALERTS = 1_000_000
+DEFAULT_OUTPUT = "memory_results.json"
+POOL_SIZE = 2_000               # Distinct corpus items cycled through
+
+
+@dataclass
+class MemoryResult:
+    alerts:             int
+    transcripts:        int
+    retained_mb:        float
+    bytes_per_alert:    float
+    build_seconds:      float
+    shallow_bytes:      dict[str, int]      # One instance per class, __dict__ included
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024     # Linux reports KiB
+
+
+def _shallow_size(obj) -> int:
+    """getsizeof of the instance plus its __dict__, if it has one."""
+    instance_dict = getattr(obj, "__dict__", None)
+    return sys.getsizeof(obj) + (sys.getsizeof(instance_dict) if instance_dict is not None else 0)
+
+
+def _shallow_sizes(alert) -> dict[str, int]:
+    return {
+        "RoutedAlert":      _shallow_size(alert),
+        "ExtractedInsight": _shallow_size(alert.insight),
+        "CallMetadata":     _shallow_size(alert.metadata),
+    }
+
+
+def build_alerts(count: int, seed: int = DEFAULT_SEED, pool_size: int = POOL_SIZE) -> MemoryResult:
+    """Routes pooled corpus calls until `count` alerts are held; measures what they retain."""
+    pool = []
+    for index in range(pool_size):
+        item = generate_item(index, seed, failure_rate=0.0)
+        if item.insight_types:
+            pool.append((item.transcript, item.response))
+
+    gc.collect()
+    baseline = _peak_rss_bytes()
+    started = time.perf_counter()
+
+    alerts = []
+    transcripts = 0
+    while len(alerts) < count:
+        transcript, response = pool[transcripts % len(pool)]
+        _, metadata = parse_transcript(transcript)
+        insights, note = parse_and_validate(response)
+        alerts.extend(route_all(build_extraction_result(metadata, insights, note)))
+        transcripts += 1
+    del alerts[count:]
+
+    elapsed = time.perf_counter() - started
+    retained = _peak_rss_bytes() - baseline
+
+    return MemoryResult(
+        alerts=count,
+        transcripts=transcripts,
+        retained_mb=round(retained / 1024 ** 2, 1),
+        bytes_per_alert=round(retained / count, 1),
+        build_seconds=round(elapsed, 2),
+        shallow_bytes=_shallow_sizes(alerts[0]),
+    )
+
+
+def format_report(result: MemoryResult) -> str:
+    lines = [
+        "═" * 64,
+        f"  {result.alerts:,} alerts from {result.transcripts:,} calls, built in {result.build_seconds:.1f}s",
+        "─" * 64,
+        f"  Retained (RSS):   {result.retained_mb:,.1f} MB",
+        f"  Bytes per alert:  {result.bytes_per_alert:,.0f}   (alert + insight + metadata share + strings + list slot)",
+        "  Shallow sizes:    " + " | ".join(f"{k} {v} B" for k, v in result.shallow_bytes.items()),
+        "═" * 64,
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure retained memory per routed alert")
+    parser.add_argument("--alerts", type=int, default=DEFAULT_ALERTS,
+                        help=f"Alerts to hold in memory (default: {DEFAULT_ALERTS:,})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Corpus seed")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results JSON (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args()
+    if args.alerts < 1:
+        parser.error("--alerts must be >= 1")
+
+    # Per-alert routing lines would dominate the build time
+    configure_logging()
+    logging.getLogger("jtbd").setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    logger.info(f"Building {args.alerts:,} alerts...")
+    result = build_alerts(args.alerts, args.seed)
+    print(format_report(result))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "seed":      args.seed,
+        },
+        "result": asdict(result),
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+bench_startup.py — CLI Startup Benchmark + Budget Check
+========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+The call-ended hook runs `python main.py --transcript <call>.txt` once per
+call, so every invocation pays interpreter startup and module imports
+before any work starts. This measures that cost in fresh processes:
+
+    interpreter    — python -c pass (the floor nothing here can remove)
+    import_main    — python -c "import main"
+    mock_run       — python main.py --mock --transcript sample_transcript.txt
+
+Each is run --runs times; min and median wall time are reported. One
+extra `python -X importtime` run of the mock invocation gives a per-module
+breakdown. The check fails (exit 1) when the mock run's median exceeds
+the budget, or when a module that must stay deferred — the anthropic SDK,
+http.server, numpy — is imported by a mock run at all.
+
+    python bench_startup.py                          # measure + check budget
+    python bench_startup.py --runs 20 --budget-ms 300 --top 25
+
+Design Decision: The deferred-module check is separate from the budget.
+Reason: Wall time is noisy across machines; an import either happens or it
+        doesn't. Re-introducing a top-level `import anthropic` trips the
+        check on any machine, even one fast enough to stay within budget.
+
+Design Decision: No imports from the pipeline.
+Reason: Everything is measured in child processes. Importing main here
+        would only slow the benchmark down, not change its numbers.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import statistics
+import subprocess
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from logging_config import configure_logging
+
+logger = logging.getLogger("jtbd.bench_startup")
+
+POC_DIR = Path(__file__).resolve().parent
+DEFAULT_RUNS = 10
+DEFAULT_BUDGET_MS = 400.0       # Median cold `--mock` run, interpreter startup included
+DEFAULT_TOP = 15
+DEFAULT_OUTPUT = "startup_results.json"
+DEFERRED_MODULES = ("anthropic", "http.server", "numpy")
+
+SCENARIOS = {
+    "interpreter": ["-c", "pass"],
+    "import_main": ["-c", "import main"],
+    "mock_run":    ["main.py", "--mock", "--transcript", "sample_transcript.txt"],
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# MEASUREMENT
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class StartupResult:
+    """Wall time of one scenario over several fresh processes."""
+    scenario:   str
+    runs:       int
+    min_ms:     float
+    median_ms:  float
+    max_ms:     float
+
+
+@dataclass
+class ImportEntry:
+    """One line of -X importtime output."""
+    module:         str
+    depth:          int         # 1 = imported directly by the script
+    self_us:        int
+    cumulative_us:  int
+
+
+def _run(args: list[str], extra_flags: tuple[str, ...] = ()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *extra_flags, *args],
+        cwd=POC_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        text=True, check=True,
+    )
+
+
+def time_scenario(name: str, runs: int = DEFAULT_RUNS) -> StartupResult:
+    """Wall time of `runs` fresh processes, after one unmeasured warm-up run."""
+    args = SCENARIOS[name]
+    _run(args)      # Warm-up: bytecode cache and page cache, as on any second call
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        _run(args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return StartupResult(
+        scenario=name,
+        runs=runs,
+        min_ms=round(min(samples), 1),
+        median_ms=round(statistics.median(samples), 1),
+        max_ms=round(max(samples), 1),
+    )
+
+
+def parse_importtime(stderr: str) -> list[ImportEntry]:
+    """
+    Parses `-X importtime` lines:
+        import time:  self [us] | cumulative | imported package
+        import time:       570 |      46217 |   asyncio
+    Nesting depth is the indentation of the module name, two spaces a level.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue        # The header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip(" ")
+        entries.append(ImportEntry(
+            module=stripped,
+            depth=(len(name) - len(stripped) + 1) // 2,
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+        ))
+    return entries
+
+
+def import_breakdown(scenario: str = "mock_run") -> list[ImportEntry]:
+    return parse_importtime(_run(SCENARIOS[scenario], ("-X", "importtime")).stderr)
+
+
+# ─────────────────────────────────────────────────────────────
+# CHECKS + REPORT
+# ─────────────────────────────────────────────────────────────
+
+def check_budget(results: list[StartupResult], entries: list[ImportEntry], budget_ms: float) -> list[str]:
+    """One message per failure: mock run over budget, or a deferred module imported."""
+    failures = []
+    for result in results:
+        if result.scenario == "mock_run" and result.median_ms > budget_ms:
+            failures.append(f"mock_run median {result.median_ms:.0f} ms exceeds budget {budget_ms:.0f} ms")
+    imported = {entry.module for entry in entries}
+    for module in DEFERRED_MODULES:
+        if module in imported:
+            failures.append(f"'{module}' was imported by a --mock run — it must be imported lazily")
+    return failures
+
+
+def save_results(path: str, results: list[StartupResult], entries: list[ImportEntry], budget_ms: float) -> None:
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "budget_ms": budget_ms,
+        },
+        "results": [asdict(r) for r in results],
+        "imports": [asdict(e) for e in entries if e.depth == 1],
+    }
+    Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+def format_report(results: list[StartupResult], entries: list[ImportEntry], top: int = DEFAULT_TOP) -> str:
+    """Terminal table of scenarios, then the slowest direct imports of the mock run."""
+    lines = [
+        "═" * 64,
+        f"  {'SCENARIO':16} {'RUNS':>6} {'MIN ms':>10} {'MEDIAN ms':>11} {'MAX ms':>10}",
+        "─" * 64,
+    ]
+    for r in results:
+        lines.append(f"  {r.scenario:16} {r.runs:>6} {r.min_ms:>10.1f} {r.median_ms:>11.1f} {r.max_ms:>10.1f}")
+    direct = sorted((e for e in entries if e.depth == 1), key=lambda e: e.cumulative_us, reverse=True)
+    total_us = sum(e.cumulative_us for e in direct)
+    lines += [
+        "─" * 64,
+        f"  Direct imports of main.py (-X importtime), {total_us / 1000:.1f} ms total:",
+    ]
+    for e in direct[:top]:
+        lines.append(f"    {e.module:30} {e.cumulative_us / 1000:>8.1f} ms  (self {e.self_us / 1000:.1f} ms)")
+    lines.append("═" * 64)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup and check it against a budget")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"Fresh processes per scenario (default: {DEFAULT_RUNS})")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum median mock-run wall time (default: {DEFAULT_BUDGET_MS:.0f})")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP,
+                        help=f"Slowest direct imports to list (default: {DEFAULT_TOP})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results JSON (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be >= 1")
+
+    configure_logging()
+    results = []
+    for name in SCENARIOS:
+        result = time_scenario(name, args.runs)
+        results.append(result)
+        logger.info(f"{name}: median {result.median_ms:.1f} ms (min {result.min_ms:.1f} ms)")
+    entries = import_breakdown()
+
+    print(format_report(results, entries, args.top))
+    save_results(args.output, results, entries, args.budget_ms)
+    logger.info(f"Results written to {args.output}")
+
+    failures = check_budget(results, entries, args.budget_ms)
+    for failure in failures:
+        logger.error(failure)
+    if failures:
+        sys.exit(1)
+    logger.info(f"Startup within budget ({args.budget_ms:.0f} ms) — no deferred modules imported")
+
+
+if __name__ == "__main__":
+    main()
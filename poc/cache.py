@@ -0,0 +1,216 @@
+"""
+cache.py — Content-Addressed Extraction Cache
+==============================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Persists raw model responses on disk so a transcript is only ever paid for once
+per (transcript, call context, prompt version, model, max_tokens) combination.
+
+Cache key = SHA-256 over:
+    - transcript text
+    - metadata fields injected by build_extraction_prompt (CSM, account, date)
+    - PROMPT_VERSION
+    - model name
+    - max_tokens
+    - extraction stage ("primary" | "fallback")
+
+Design Decision: Cache the RAW model response, not the validated insights.
+Reason: Routing rules, confidence thresholds and validation logic change far
+        more often than prompts. Re-running parse → validate → route over a
+        cached response picks up those changes for zero API cost. Anything
+        that changes what the model would say is part of the key instead.
+
+Design Decision: LRU eviction by file mtime, bounded by total bytes.
+Reason: No index file to corrupt on a crash. A cache hit touches the entry,
+        eviction deletes oldest-touched entries until the cache fits again.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from prompts import PROMPT_VERSION
+
+logger = logging.getLogger("jtbd.cache")
+
+DEFAULT_CACHE_DIR = ".jtbd_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024      # 512 MB
+
+
+class ExtractionCache:
+    """
+    On-disk, size-bounded LRU cache of raw model responses.
+    Safe to share between threads and between coroutines on one event loop.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size_bytes: Optional[int] = None   # Computed lazily on first write
+
+    # ─────────────────────────────────────────────────────────
+    # KEYS
+    # ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def make_key(
+        transcript: str,
+        csm_name: str,
+        account_name: str,
+        call_date: str,
+        model: str,
+        max_tokens: int,
+        stage: str = "primary",
+        prompt_version: str = PROMPT_VERSION
+    ) -> str:
+        """
+        Builds the content address for one extraction request.
+        Any input that changes what the model would be asked is part of the key.
+        """
+        payload = json.dumps({
+            "transcript":     transcript,
+            "csm_name":       csm_name,
+            "account_name":   account_name,
+            "call_date":      call_date,
+            "prompt_version": prompt_version,
+            "model":          model,
+            "max_tokens":     max_tokens,
+            "stage":          stage,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        # Two-level fan-out keeps directory listings small at 100k+ entries
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    # ─────────────────────────────────────────────────────────
+    # READ / WRITE
+    # ─────────────────────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached raw response for `key`, or None on a miss.
+        A hit refreshes the entry's mtime so it survives LRU eviction.
+        """
+        path = self._path_for(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry.get("raw_response")
+
+    def put(self, key: str, raw_response: str, **info) -> None:
+        """
+        Stores a raw response. Extra keyword args (model, transcript_id, ...)
+        are kept alongside it for debugging but never affect lookups.
+        Writes are atomic: a crash mid-write never leaves a half entry behind.
+        """
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({
+            "key":          key,
+            "created_at":   time.time(),
+            "raw_response": raw_response,
+            **info,
+        }, ensure_ascii=False).encode("utf-8")
+
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        try:
+            replaced = path.stat().st_size      # Overwrite (--refresh): the old entry's bytes go away
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.writes += 1
+            if self._size_bytes is None:
+                self._size_bytes = self._scan_size()
+            else:
+                self._size_bytes += len(data) - replaced
+            over_budget = self._size_bytes > self.max_bytes
+
+        if over_budget:
+            self.evict()
+
+    # ─────────────────────────────────────────────────────────
+    # EVICTION
+    # ─────────────────────────────────────────────────────────
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """
+        Deletes least-recently-used entries until the cache fits in max_bytes.
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._size_bytes = total
+            self.evictions += removed
+
+        if removed:
+            logger.info(f"Cache eviction | Removed {removed} entries | Size now {total} bytes")
+        return removed
+
+    def clear(self) -> None:
+        """Removes every entry in the cache directory."""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._size_bytes = 0
+
+    def summary(self) -> str:
+        """One-line hit/miss summary for end-of-run output."""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"Cache: {self.hits} hits / {lookups} lookups ({hit_rate:.0%}) | "
+            f"{self.writes} writes | {self.evictions} evictions"
+        )
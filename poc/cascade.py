@@ -0,0 +1,257 @@
+"""
+cascade.py — Model Cascade (Small Model First, Escalate on Doubt)
+==================================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Most routine check-in calls produce high-confidence or empty extractions.
+Paying the large model for those is wasted latency and spend:
+
+    1. Transcript matches an escalation keyword → go straight to the top tier
+    2. Otherwise run the smallest tier first (no fallback call on that tier)
+    3. Escalate to the next tier if:
+         - the response fails JSON parsing / schema validation, or
+         - any insight scores below CONFIDENCE_THRESHOLD
+    4. The last tier runs with the normal fallback path and is always accepted
+
+Design Decision: Empty extractions are accepted from the small model.
+Reason: "Nothing to route" is the most common outcome for check-in calls
+        and the one the small model gets right. Escalating on empty would
+        send almost every routine call to the large model anyway.
+
+Design Decision: Escalation keywords skip the small tier entirely.
+Reason: A call that says "cancel" or names a competitor is exactly where a
+        missed insight is expensive. Running the small model first would
+        only add its latency to the calls that matter most.
+
+Design Decision: Record the tier on every ExtractionResult.
+Reason: Savings have to be measured, not assumed. CASCADE_STATS tracks
+        accepted / escalated counts and latency per tier; TOKEN_USAGE in
+        main.py tracks tokens per model.
+"""
+
+from __future__ import annotations
+
+import re
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import anthropic        # Annotations only — main.make_client() imports the SDK
+
+from schema import CallMetadata, CONFIDENCE_THRESHOLD
+from error_handler import ExtractionValidationError
+from main import (
+    extract_insights_async,
+    EXTRACTION_MODEL,
+    TOKEN_USAGE
+)
+
+logger = logging.getLogger("jtbd.cascade")
+
+DEFAULT_FAST_MODEL = "claude-haiku-4-5"
+
+# Phrases that send a transcript straight to the top tier
+ESCALATION_KEYWORDS = (
+    "cancel",
+    "churn",
+    "terminate",
+    "not renew",
+    "won't renew",
+    "switching to",
+    "competitor",
+    "outage",
+    "data loss",
+    "legal",
+    "escalate",
+)
+
+
+# ─────────────────────────────────────────────────────────────
+# TIERS
+# ─────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class ModelTier:
+    """
+    One step of the cascade, smallest model first.
+    max_tokens=None sizes the response budget from the transcript.
+    """
+    name:       str
+    model:      str
+    max_tokens: Optional[int] = None
+
+
+CASCADE_TIERS = (
+    ModelTier("fast", DEFAULT_FAST_MODEL),
+    ModelTier("full", EXTRACTION_MODEL),
+)
+
+
+def build_cascade_tiers(fast_model: str = DEFAULT_FAST_MODEL) -> tuple[ModelTier, ...]:
+    """Two-tier cascade: `fast_model` first, EXTRACTION_MODEL on escalation."""
+    return (
+        ModelTier("fast", fast_model),
+        ModelTier("full", EXTRACTION_MODEL),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# STATS
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class CascadeStats:
+    """Process-wide cascade counters, reported at the end of a run."""
+    accepted:    dict[str, int] = field(default_factory=dict)
+    escalated:   dict[str, int] = field(default_factory=dict)
+    seconds:     dict[str, float] = field(default_factory=dict)
+    keyword_skips: int = 0
+
+    def record(self, tier: str, elapsed: float, escalated: bool) -> None:
+        bucket = self.escalated if escalated else self.accepted
+        bucket[tier] = bucket.get(tier, 0) + 1
+        self.seconds[tier] = self.seconds.get(tier, 0.0) + elapsed
+
+    def summary(self, tiers: tuple[ModelTier, ...] = CASCADE_TIERS) -> str:
+        """One line per tier: accepted / escalated, mean latency, tokens."""
+        lines = [f"Cascade: {self.keyword_skips} keyword escalations"]
+        for tier in tiers:
+            accepted = self.accepted.get(tier.name, 0)
+            escalated = self.escalated.get(tier.name, 0)
+            runs = accepted + escalated
+            mean = self.seconds.get(tier.name, 0.0) / runs if runs else 0.0
+            usage = TOKEN_USAGE.get(tier.model, {})
+            lines.append(
+                f"  {tier.name:5} ({tier.model}): {accepted} accepted | "
+                f"{escalated} escalated | {mean:.2f}s mean | "
+                f"{usage.get('input_tokens', 0)} in / "
+                f"{usage.get('output_tokens', 0)} out tokens"
+            )
+        return "\n".join(lines)
+
+
+CASCADE_STATS = CascadeStats()
+
+
+# ─────────────────────────────────────────────────────────────
+# ESCALATION RULES
+# ─────────────────────────────────────────────────────────────
+
+def match_escalation_keyword(
+    transcript: str,
+    keywords: tuple[str, ...] = ESCALATION_KEYWORDS
+) -> Optional[str]:
+    """Returns the first escalation keyword found in the transcript, or None."""
+    for keyword in keywords:
+        if re.search(rf"\b{re.escape(keyword)}", transcript, re.IGNORECASE):
+            return keyword
+    return None
+
+
+def low_confidence_count(insights: list) -> int:
+    """Number of insights below the auto-routing confidence threshold."""
+    return sum(1 for i in insights if i.confidence_score < CONFIDENCE_THRESHOLD)
+
+
+# ─────────────────────────────────────────────────────────────
+# CASCADE EXTRACTION
+# ─────────────────────────────────────────────────────────────
+
+async def extract_insights_cascade_async(
+    transcript: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    tiers: tuple[ModelTier, ...] = CASCADE_TIERS,
+    chunked: bool = False,
+    keywords: tuple[str, ...] = ESCALATION_KEYWORDS,
+    **extract_kwargs
+) -> tuple[list, str | None, str]:
+    """
+    Runs extraction tier by tier until one is accepted.
+    `extract_kwargs` (mock, cache, refresh, validation) are passed through
+    to extract_insights_async / extract_insights_chunked_async unchanged.
+
+    Returns: (validated_insights, processing_note, tier_name)
+    """
+    if not tiers:
+        raise ValueError("tiers must contain at least one ModelTier")
+
+    if chunked:
+        # Imported here — chunking.py imports main, which must load first
+        from chunking import extract_insights_chunked_async as extract
+    else:
+        extract = extract_insights_async
+
+    start = 0
+    reasons: list[str] = []
+    keyword = match_escalation_keyword(transcript, keywords)
+    if keyword and len(tiers) > 1:
+        start = len(tiers) - 1
+        CASCADE_STATS.keyword_skips += 1
+        reasons.append(f"keyword '{keyword}'")
+        logger.info(
+            f"Cascade | Transcript: {metadata.transcript_id} | "
+            f"Escalation keyword '{keyword}' — starting at tier '{tiers[start].name}'"
+        )
+
+    for index in range(start, len(tiers)):
+        tier = tiers[index]
+        final = index == len(tiers) - 1
+        started = time.perf_counter()
+
+        try:
+            insights, processing_note = await extract(
+                transcript, metadata, client,
+                model=tier.model, max_tokens=tier.max_tokens,
+                fallback=final, **extract_kwargs
+            )
+        except (json.JSONDecodeError, ExtractionValidationError) as e:
+            CASCADE_STATS.record(tier.name, time.perf_counter() - started, escalated=True)
+            reasons.append(f"{tier.name} failed validation")
+            logger.warning(
+                f"Cascade | Tier '{tier.name}' failed validation ({type(e).__name__}) — escalating"
+            )
+            continue
+
+        elapsed = time.perf_counter() - started
+        low = low_confidence_count(insights)
+        if low and not final:
+            CASCADE_STATS.record(tier.name, elapsed, escalated=True)
+            reasons.append(f"{tier.name} returned {low} insights < {CONFIDENCE_THRESHOLD}")
+            logger.info(
+                f"Cascade | Tier '{tier.name}' returned {low} low-confidence insights — escalating"
+            )
+            continue
+
+        CASCADE_STATS.record(tier.name, elapsed, escalated=False)
+        logger.info(
+            f"Cascade | Transcript: {metadata.transcript_id} | Accepted tier "
+            f"'{tier.name}' ({tier.model}) in {elapsed:.2f}s — {len(insights)} insights"
+        )
+        if reasons:
+            note = f"CASCADE: escalated to '{tier.name}' ({'; '.join(reasons)})."
+            processing_note = f"{note} {processing_note or ''}".strip()
+        return insights, processing_note, tier.name
+
+
+def extract_insights_cascade(
+    transcript: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic,
+    tiers: tuple[ModelTier, ...] = CASCADE_TIERS,
+    chunked: bool = False,
+    **extract_kwargs
+) -> tuple[list, str | None, str]:
+    """
+    Synchronous entry point for cascade extraction of a single transcript.
+
+    Returns: (validated_insights, processing_note, tier_name)
+    """
+    return asyncio.run(extract_insights_cascade_async(
+        transcript, metadata, client, tiers=tiers, chunked=chunked, **extract_kwargs
+    ))
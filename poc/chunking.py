@@ -0,0 +1,255 @@
+"""
+chunking.py — Map-Reduce Extraction for Long Transcripts
+=========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Hour-long QBRs are too long to extract in one shot: the response budget runs
+out mid-array, and the fallback prompt only ever sees the first 2,000 chars.
+
+    1. MAP    — split on speaker turns into overlapping windows
+    2.          extract every window concurrently (extract_insights_async)
+    3. REDUCE — merge the per-window insight lists, dropping duplicates
+                that were extracted twice from the overlap
+
+Design Decision: Windows break on speaker turns, never mid-sentence.
+Reason: A verbatim_quote that straddles a window boundary would be cut in
+        half. Turn boundaries keep every quote intact in at least one window.
+
+Design Decision: Overlap by whole turns, dedupe on merge.
+Reason: A churn signal is often a question in one turn and the answer in
+        the next. Repeating the last turns of window N at the start of
+        window N+1 keeps that context; the merge step removes the double count.
+
+Design Decision: A failed window falls back on the whole window.
+Reason: DEFAULT_WINDOW_CHARS is four times FALLBACK_TRANSCRIPT_CHARS. Cutting
+        a window to the fallback limit would drop most of its turns; a window
+        is already sized for one request, so its fallback sends all of it.
+"""
+
+from __future__ import annotations
+
+import re
+import asyncio
+import logging
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import anthropic        # Annotations only — main.make_client() imports the SDK
+
+from schema import CallMetadata, ExtractedInsight
+from cache import ExtractionCache
+from main import extract_insights_async, EXTRACTION_MODEL
+
+logger = logging.getLogger("jtbd.chunking")
+
+DEFAULT_WINDOW_CHARS = 8000     # ~2k tokens of transcript per window
+DEFAULT_OVERLAP_TURNS = 2       # Turns repeated at the start of the next window
+SUMMARY_DUPLICATE_RATIO = 0.85  # SequenceMatcher ratio treated as the same insight
+
+# A new turn starts with "Speaker:" or "Speaker (Role, Company):" at line start
+TURN_START = re.compile(r"^(?=[A-Z][^:\n]{0,80}:\s)", re.MULTILINE)
+
+
+# ─────────────────────────────────────────────────────────────
+# MAP — TURN SPLITTING + WINDOWING
+# ─────────────────────────────────────────────────────────────
+
+def split_turns(transcript: str) -> list[str]:
+    """
+    Splits a transcript into speaker turns.
+    Falls back to blank-line paragraphs if no "Speaker:" prefixes are found.
+    """
+    turns = [t.strip() for t in TURN_START.split(transcript) if t.strip()]
+    if len(turns) <= 1:
+        turns = [p.strip() for p in re.split(r"\n\s*\n", transcript) if p.strip()]
+    return turns
+
+
+def build_windows(
+    turns: list[str],
+    max_chars: int = DEFAULT_WINDOW_CHARS,
+    overlap_turns: int = DEFAULT_OVERLAP_TURNS
+) -> list[str]:
+    """
+    Packs consecutive turns into windows of at most `max_chars`, each starting
+    with the last `overlap_turns` turns of the previous window.
+    A single turn longer than max_chars becomes its own window.
+    """
+    if max_chars < 1:
+        raise ValueError(f"max_chars must be >= 1, got: {max_chars}")
+
+    windows: list[str] = []
+    current: list[str] = []
+    current_chars = 0
+    fresh = 0   # Turns in `current` that are not overlap carried over
+
+    for turn in turns:
+        if current and fresh and current_chars + len(turn) + 2 > max_chars:
+            windows.append("\n\n".join(current))
+            current = current[-overlap_turns:] if overlap_turns > 0 else []
+            current_chars = sum(len(t) + 2 for t in current)
+            fresh = 0
+            # Drop carried turns if they alone would overflow the next window
+            while current and current_chars + len(turn) + 2 > max_chars:
+                current_chars -= len(current.pop(0)) + 2
+        current.append(turn)
+        current_chars += len(turn) + 2
+        fresh += 1
+
+    if current and fresh:
+        windows.append("\n\n".join(current))
+
+    return windows
+
+
+# ─────────────────────────────────────────────────────────────
+# REDUCE — MERGE + DEDUPLICATION
+# ─────────────────────────────────────────────────────────────
+
+def _normalize(text: Optional[str]) -> str:
+    return re.sub(r"\W+", " ", (text or "").lower()).strip()
+
+
+def is_duplicate_insight(a: ExtractedInsight, b: ExtractedInsight) -> bool:
+    """
+    Two insights are the same finding if they share an insight_type and
+    either quote the same words (one quote containing the other) or have
+    near-identical summaries.
+    """
+    if a.insight_type != b.insight_type:
+        return False
+
+    qa, qb = _normalize(a.verbatim_quote), _normalize(b.verbatim_quote)
+    if qa and qb and (qa in qb or qb in qa):
+        return True
+
+    ratio = SequenceMatcher(None, _normalize(a.summary), _normalize(b.summary)).ratio()
+    return ratio >= SUMMARY_DUPLICATE_RATIO
+
+
+def merge_window_insights(
+    per_window: list[list[ExtractedInsight]]
+) -> list[ExtractedInsight]:
+    """
+    Flattens per-window insight lists in transcript order, keeping the
+    higher-confidence copy whenever two windows extracted the same finding.
+    """
+    merged: list[ExtractedInsight] = []
+    for window_insights in per_window:
+        for insight in window_insights:
+            for i, existing in enumerate(merged):
+                if is_duplicate_insight(existing, insight):
+                    if insight.confidence_score > existing.confidence_score:
+                        merged[i] = insight
+                    break
+            else:
+                merged.append(insight)
+    return merged
+
+
+# ─────────────────────────────────────────────────────────────
+# CHUNKED EXTRACTION
+# ─────────────────────────────────────────────────────────────
+
+async def extract_insights_chunked_async(
+    transcript: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    max_chars: int = DEFAULT_WINDOW_CHARS,
+    overlap_turns: int = DEFAULT_OVERLAP_TURNS,
+    validation: str = "strict",
+    model: str = EXTRACTION_MODEL,
+    max_tokens: Optional[int] = None,
+    fallback: bool = True,
+    mode: str = "text"
+) -> tuple[list, str | None]:
+    """
+    Map-reduce version of extract_insights_async().
+    Transcripts that fit in one window take the normal single-call path.
+    Windows are extracted concurrently, so latency is bounded by the
+    slowest window rather than by total transcript length. The first
+    window to fail cancels the rest and its exception is raised.
+
+    Returns: (validated_insights, processing_note)
+    """
+    windows = build_windows(split_turns(transcript), max_chars, overlap_turns)
+    if len(windows) <= 1:
+        return await extract_insights_async(
+            transcript, metadata, client, mock=mock, cache=cache,
+            refresh=refresh, validation=validation,
+            model=model, max_tokens=max_tokens, fallback=fallback, mode=mode
+        )
+
+    logger.info(
+        f"Chunked extraction | Transcript: {metadata.transcript_id} | "
+        f"{len(transcript)} chars → {len(windows)} windows "
+        f"(≤{max_chars} chars, {overlap_turns}-turn overlap)"
+    )
+
+    # A failed window fails the transcript, so the TaskGroup cancels its
+    # siblings rather than letting them spend tokens on a discarded result
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(extract_insights_async(
+                    window, metadata, client, mock=mock, cache=cache,
+                    refresh=refresh, validation=validation,
+                    model=model, max_tokens=max_tokens, fallback=fallback, mode=mode,
+                    fallback_chars=None     # A window's fallback gets the whole window
+                ))
+                for window in windows
+            ]
+    except ExceptionGroup as failed:
+        raise failed.exceptions[0]      # Callers handle the window's own error type
+    results = [task.result() for task in tasks]
+
+    per_window = [insights for insights, _ in results]
+    merged = merge_window_insights(per_window)
+    extracted = sum(len(w) for w in per_window)
+
+    notes = [
+        f"Window {i + 1}: {note}"
+        for i, (_, note) in enumerate(results) if note
+    ]
+    processing_note = (
+        f"CHUNKED: {len(windows)} windows, {extracted} insights extracted, "
+        f"{extracted - len(merged)} duplicates merged. " + " | ".join(notes)
+    ).strip()
+
+    logger.info(
+        f"Chunked extraction merged — {len(merged)} insights "
+        f"({extracted - len(merged)} cross-window duplicates removed)"
+    )
+    return merged, processing_note
+
+
+def extract_insights_chunked(
+    transcript: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    max_chars: int = DEFAULT_WINDOW_CHARS,
+    overlap_turns: int = DEFAULT_OVERLAP_TURNS,
+    validation: str = "strict",
+    model: str = EXTRACTION_MODEL,
+    max_tokens: Optional[int] = None,
+    fallback: bool = True,
+    mode: str = "text"
+) -> tuple[list, str | None]:
+    """
+    Synchronous entry point for chunked extraction of a single transcript.
+
+    Returns: (validated_insights, processing_note)
+    """
+    return asyncio.run(extract_insights_chunked_async(
+        transcript, metadata, client, mock=mock, cache=cache, refresh=refresh,
+        max_chars=max_chars, overlap_turns=overlap_turns, validation=validation,
+        model=model, max_tokens=max_tokens, fallback=fallback, mode=mode
+    ))
@@ -0,0 +1,441 @@
+"""
+corpus.py — Synthetic Transcript + Response Corpus
+===================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+One sample transcript and one canned response say nothing about how
+load_transcript, parse_and_validate or route_all behave at 100k calls.
+This module generates as many as needed, reproducibly:
+
+    1. Call         — account, CSM, ARR, renewal date, 2-6 speakers,
+                      log-normal length (long tail exercises chunking)
+    2. Signals      — one customer turn per planned insight; the turn is
+                      the insight's verbatim_quote
+    3. Response     — the model output for that call, covering every
+                      InsightType, UrgencyLevel and confidence band
+    4. Failure mode — a share of responses broken the ways real ones break
+                      (fences, prose, truncation, bad enums, ...), each
+                      labelled with the strictest stage expected to accept it
+
+    python corpus.py --count 1000 --seed 7 --out corpus/
+    python main.py --manifest corpus/manifest.txt --mock
+    python mock_server.py --template corpus/templates/
+
+Design Decision: Item i depends only on (seed, i).
+Reason: Benchmarks can stream 100k items without holding them, and
+        "item 4812 regressed" means the same call on every machine.
+
+Design Decision: Coverage by rotation, not by chance.
+Reason: Insight type, urgency and confidence band are the digits of one
+        rotating counter, so every (type, urgency, band) combination
+        appears within a few hundred calls — a small seeded corpus still
+        hits every routing rule.
+"""
+
+import json
+import random
+import argparse
+import logging
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from schema import InsightType, UrgencyLevel
+from prefilter import KNOWN_COMPETITORS
+from logging_config import configure_logging
+
+logger = logging.getLogger("jtbd.corpus")
+
+DEFAULT_SEED = 42
+DEFAULT_FAILURE_RATE = 0.20     # Share of responses with an injected failure mode
+FILLER_TURNS_MEDIAN = 24        # Log-normal call length, in non-signal turns
+FILLER_TURNS_SIGMA = 0.9
+FILLER_TURNS_MAX = 600
+MAX_TEMPLATES = 200             # Clean responses written for mock_server.py
+
+# confidence band → (low, high), matching the ExtractedInsight scale
+CONFIDENCE_BANDS = {
+    "high":      (0.90, 1.00),
+    "confident": (0.75, 0.89),
+    "uncertain": (0.60, 0.74),
+    "low":       (0.30, 0.59),
+}
+
+# failure mode → strictest stage expected to accept the response:
+#   strict   — parse_and_validate()
+#   repair   — parse_with_local_repair()
+#   partial  — validate_extraction_partial() (valid insights kept)
+#   fallback — only a fallback / correction API call recovers it
+FAILURE_MODES = {
+    "clean":            "strict",
+    "empty":            "strict",
+    "fenced":           "strict",
+    "prose":            "repair",
+    "trailing_comma":   "repair",
+    "python_literals":  "repair",
+    "unescaped_quote":  "repair",
+    "truncated":        "repair",
+    "enum_synonym":     "partial",
+    "invalid_enum":     "partial",
+    "confidence_range": "partial",
+    "missing_field":    "partial",
+    "not_json":         "fallback",
+}
+INJECTED_MODES = tuple(mode for mode in FAILURE_MODES if mode != "clean")
+# Modes that break one insight outright: "partial" only holds if another
+# insight survives, so these are injected into calls with at least two
+SURVIVOR_MODES = ("invalid_enum", "confidence_range", "missing_field")
+
+
+# ─────────────────────────────────────────────────────────────
+# VOCABULARY
+# ─────────────────────────────────────────────────────────────
+
+ACCOUNT_PREFIXES = (
+    "Acme", "Northwind", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay",
+    "Soylent", "Wonka", "Tyrell", "Cyberdyne", "Gringotts", "Oscorp", "Pied Piper",
+    "Stark", "Wayne", "Dunder", "Prestige", "Sterling", "Bluth",
+)
+ACCOUNT_SUFFIXES = (
+    "Financial Services", "Health", "Insurance", "Auto Group", "Home Services",
+    "Telecom", "Realty", "Travel", "Legal", "Solar", "Dental Partners", "Lending",
+)
+FIRST_NAMES = (
+    "Jordan", "Sarah", "Marcus", "Priya", "Diego", "Mei", "Aisha", "Tom", "Elena",
+    "Kofi", "Hannah", "Raj", "Lucia", "Sam", "Noor", "Ben", "Yuki", "Carlos",
+)
+LAST_NAMES = (
+    "Rivera", "Chen", "Patel", "Okafor", "Nguyen", "Schmidt", "Garcia", "Kim",
+    "Walsh", "Haddad", "Novak", "Silva",
+)
+TITLES = (
+    "VP Marketing", "Marketing Ops", "Director of Digital", "Paid Search Lead",
+    "CMO", "Analytics Manager", "Contact Center Director", "Procurement",
+)
+CALL_TYPES = (
+    "Quarterly Business Review", "Check-in", "Renewal Discussion",
+    "Onboarding Review", "Escalation", "Executive Sponsor Call",
+)
+FEATURES = (
+    "omnichannel attribution across SMS and chat", "a Salesforce field mapping for call outcomes",
+    "bulk export of call transcripts", "custom intent categories", "a Snowflake data share",
+    "real-time alerts in Slack", "multi-touch attribution for calls",
+)
+BUGS = (
+    "call attribution numbers not matching the Google Ads dashboard",
+    "the dashboard timing out on the 90-day view",
+    "duplicate conversions firing into Google Ads",
+    "transcripts missing for calls over an hour",
+    "the webhook retrying the same event all night",
+)
+
+# Customer lines that carry no extractable signal (and no pre-filter hits)
+FILLER_LINES = (
+    "Sure, that works for us.",
+    "Let me pull that up on my side.",
+    "Can you share your screen for a second?",
+    "We went over this with the team on Tuesday.",
+    "That lines up with what I saw last week.",
+    "I'll loop in our analyst after this call.",
+    "Okay, give me one moment.",
+    "Yes, the numbers for last month look about the same.",
+    "We had our all-hands this morning, so it's been a busy day.",
+    "I think that covers the agenda items from our side.",
+)
+CSM_LINES = (
+    "Thanks, that's helpful context.",
+    "Got it — let me make a note of that.",
+    "Makes sense. Anything else on that topic?",
+    "I'll send a recap after the call.",
+    "Let's keep going down the agenda.",
+)
+
+# insight type → (quote templates, plausible sentiments)
+SIGNALS = {
+    InsightType.COMPETITOR_MENTION: ((
+        "We had a demo with {competitor} last month and leadership is asking questions.",
+        "{competitor} quoted us a lower price for basically the same call tracking.",
+        "Our agency keeps pushing {competitor} on us for next year.",
+    ), ("negative", "neutral")),
+    InsightType.FEATURE_REQUEST: ((
+        "It would be really valuable if we had {feature}.",
+        "Is {feature} on the roadmap? We need it before Q3.",
+        "Can you add {feature}? The team asks me every week.",
+    ), ("neutral", "positive")),
+    InsightType.BUG_REPORT: ((
+        "We keep seeing {bug} and the support ticket is still open.",
+        "For three weeks now we've had {bug}. It's broken for the whole team.",
+        "Honestly {bug} is an error we can't explain to our execs.",
+    ), ("negative", "critical")),
+    InsightType.PRICING_FRICTION: ((
+        "The renewal quote came in way over our budget this year.",
+        "Finance is questioning the cost per seat — it's too expensive for what we use.",
+        "We can't justify the price increase without seeing more ROI.",
+    ), ("negative", "neutral")),
+    InsightType.CHURN_SIGNAL: ((
+        "If this isn't fixed by renewal we're not going to renew.",
+        "We're re-evaluating the whole platform next quarter.",
+        "Our CFO asked me to put together a plan to cancel.",
+    ), ("critical", "negative")),
+    InsightType.POSITIVE_SIGNAL: ((
+        "The team loves the new dashboard — it's been a game changer.",
+        "We're impressed with the results and want to expand to two more regions.",
+        "I've already referred your team to a peer at another company.",
+    ), ("positive",)),
+    InsightType.GENERAL_FEEDBACK: ((
+        "The onboarding docs were a little hard to follow at first.",
+        "It would help to have the monthly report a few days earlier.",
+        "Support has been responsive, though the portal could be clearer.",
+    ), ("neutral", "positive")),
+}
+
+INSIGHT_TYPES = tuple(InsightType)
+URGENCIES = tuple(UrgencyLevel)
+BANDS = tuple(CONFIDENCE_BANDS)
+
+
+# ─────────────────────────────────────────────────────────────
+# CORPUS ITEM
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class CorpusItem:
+    """One synthetic call: the transcript file, the model response, and its labels."""
+    transcript_id:  str
+    transcript:     str             # Full file text — header block, ---, turns
+    response:       str             # Raw model response text
+    failure_mode:   str
+    expected:       str             # Strictest stage expected to accept the response
+    insight_types:  list[str]       # Planned insights, in response order
+
+
+def _format_date(d: date) -> str:
+    return f"{d:%B} {d.day}, {d.year}"
+
+
+def _plan_insight(rng: random.Random, index: int, slot: int, account: str) -> tuple[dict, str]:
+    """
+    Returns (raw insight dict, customer quote). Type, urgency and band
+    are the digits of counter k, so every combination is covered.
+    """
+    k = index * 4 + slot
+    insight_type = INSIGHT_TYPES[k % len(INSIGHT_TYPES)]
+    urgency = URGENCIES[(k // len(INSIGHT_TYPES)) % len(URGENCIES)]
+    band = BANDS[(k // (len(INSIGHT_TYPES) * len(URGENCIES))) % len(BANDS)]
+    low, high = CONFIDENCE_BANDS[band]
+
+    templates, sentiments = SIGNALS[insight_type]
+    competitor = rng.choice(KNOWN_COMPETITORS)
+    feature = rng.choice(FEATURES)
+    bug = rng.choice(BUGS)
+    quote = rng.choice(templates).format(competitor=competitor, feature=feature, bug=bug)
+
+    insight = {
+        "insight_type":      insight_type.value,
+        "summary":           f"{account} — {insight_type.value.replace('_', ' ')}: {quote}",
+        "verbatim_quote":    quote,
+        "sentiment":         rng.choice(sentiments),
+        "urgency":           urgency.value,
+        "confidence_score":  round(rng.uniform(low, high), 2),
+        "competitor_named":  competitor if insight_type == InsightType.COMPETITOR_MENTION else None,
+        "feature_requested": feature if insight_type == InsightType.FEATURE_REQUEST else None,
+        "bug_description":   bug if insight_type == InsightType.BUG_REPORT else None,
+        "action_required":   urgency in (UrgencyLevel.HIGH, UrgencyLevel.CRITICAL),
+        "suggested_action":  f"Follow up with {account} on this {insight_type.value.replace('_', ' ')}.",
+    }
+    return insight, quote
+
+
+def _inject_failure(mode: str, payload: dict, rng: random.Random) -> str:
+    """Serializes `payload` broken the way `mode` describes."""
+    insights = payload["insights"]
+    if mode == "enum_synonym" and insights:
+        insights[-1]["urgency"] = rng.choice(("urgent", "moderate", "minor"))
+    elif mode == "invalid_enum" and insights:
+        insights[-1]["insight_type"] = "roadmap_question"
+    elif mode == "confidence_range" and insights:
+        insights[-1]["confidence_score"] = rng.choice((1.7, -0.2, "high"))
+    elif mode == "missing_field" and insights:
+        del insights[-1]["urgency"]
+    elif mode == "unescaped_quote" and insights:
+        insights[0]["summary"] = f'Customer called it "unusable" — {insights[0]["summary"]}'
+
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+
+    if mode == "fenced":
+        return f"```json\n{text}\n```"
+    if mode == "prose":
+        return f"Here are the extracted insights:\n\n{text}\n\nLet me know if you need anything else."
+    if mode == "trailing_comma":
+        return text.replace("\n    }\n  ]", "\n    },\n  ]")
+    if mode == "python_literals":
+        return text.replace(": null", ": None").replace(": true", ": True").replace(": false", ": False")
+    if mode == "unescaped_quote":
+        return text.replace('\\"unusable\\"', '"unusable"', 1)
+    if mode == "truncated":
+        # Cut after the first complete insight — what repair_json can still salvage
+        first_end = text.find("\n    }") + len("\n    }")
+        return text[:rng.randint(first_end, len(text) - 2)]
+    if mode == "not_json":
+        return "I'm sorry, I wasn't able to identify structured insights in this transcript."
+    return text
+
+
+def generate_item(
+    index: int,
+    seed: int = DEFAULT_SEED,
+    failure_rate: float = DEFAULT_FAILURE_RATE
+) -> CorpusItem:
+    """Builds corpus item `index` — a pure function of (seed, index)."""
+    rng = random.Random(f"{seed}:{index}")
+
+    # 1. Failure mode — evenly spaced through the corpus, rotating through every mode
+    mode = "clean"
+    if failure_rate > 0:
+        step = max(1, round(1 / failure_rate))
+        if index % step == step - 1:
+            mode = INJECTED_MODES[(index // step) % len(INJECTED_MODES)]
+
+    # 2. Call metadata
+    account = f"{rng.choice(ACCOUNT_PREFIXES)} {rng.choice(ACCOUNT_SUFFIXES)}"
+    short_account = account.split()[0]
+    csm_first = rng.choice(FIRST_NAMES)
+    call_date = date(2025, 1, 1) + timedelta(days=rng.randrange(600))
+    renewal = call_date + timedelta(days=rng.randrange(14, 400))
+    transcript_id = f"TXN-SYN-{seed}-{index:06d}"
+
+    customers = []
+    for _ in range(rng.randint(1, 5)):
+        name = rng.choice([n for n in FIRST_NAMES if n != csm_first])
+        customers.append(f"{name} ({rng.choice(TITLES)}, {short_account})")
+
+    # 3. Planned insights and their quotes
+    count = 0 if mode == "empty" else rng.randint(2 if mode in SURVIVOR_MODES else 1, 4)
+    planned = [_plan_insight(rng, index, slot, account) for slot in range(count)]
+
+    # 4. Turns — filler with each signal turn dropped in at a random point
+    filler = min(FILLER_TURNS_MAX, max(2, int(rng.lognormvariate(0, FILLER_TURNS_SIGMA) * FILLER_TURNS_MEDIAN)))
+    turns = []
+    for n in range(filler):
+        if n % 2 == 0:
+            turns.append(f"{csm_first}: {rng.choice(CSM_LINES)}")
+        else:
+            turns.append(f"{rng.choice(customers)}: {rng.choice(FILLER_LINES)}")
+    for _, quote in planned:
+        turns.insert(rng.randint(1, len(turns)), f"{rng.choice(customers)}: {quote}")
+    turns.insert(0, f"{csm_first}: Thanks for making time today. How is everything going on your end?")
+
+    header = "\n".join((
+        f"TRANSCRIPT ID: {transcript_id}",
+        f"ACCOUNT: {account}",
+        f"CSM: {csm_first} {rng.choice(LAST_NAMES)}",
+        f"CALL DATE: {_format_date(call_date)}",
+        f"CALL TYPE: {rng.choice(CALL_TYPES)}",
+        f"DURATION: {max(5, len(turns) // 2)} minutes",
+        f"ARR: ${rng.randrange(12, 900) * 1000:,}",
+        f"RENEWAL DATE: {_format_date(renewal)}",
+    ))
+    transcript = f"{header}\n\n---\n\n" + "\n\n".join(turns) + "\n"
+
+    # 5. Response
+    payload = {"insights": [insight for insight, _ in planned]}
+    if mode == "empty":
+        payload["processing_note"] = "Routine call — no actionable insights."
+    response = _inject_failure(mode, payload, rng)
+
+    return CorpusItem(
+        transcript_id=transcript_id,
+        transcript=transcript,
+        response=response,
+        failure_mode=mode,
+        expected=FAILURE_MODES[mode],
+        insight_types=[insight["insight_type"] for insight, _ in planned],
+    )
+
+
+def generate_corpus(
+    count: int,
+    seed: int = DEFAULT_SEED,
+    failure_rate: float = DEFAULT_FAILURE_RATE
+) -> Iterator[CorpusItem]:
+    """Yields `count` items lazily — 100k items never sit in memory at once."""
+    for index in range(count):
+        yield generate_item(index, seed, failure_rate)
+
+
+def generate_insight_dicts(count: int, seed: int = DEFAULT_SEED) -> Iterator[dict]:
+    """Yields `count` valid raw insight dicts (validate_insight_dict input)."""
+    rng = random.Random(f"{seed}:insights")
+    for k in range(count):
+        account = f"{rng.choice(ACCOUNT_PREFIXES)} {rng.choice(ACCOUNT_SUFFIXES)}"
+        yield _plan_insight(rng, k // 4, k % 4, account)[0]
+
+
+# ─────────────────────────────────────────────────────────────
+# ON-DISK CORPUS
+# ─────────────────────────────────────────────────────────────
+
+def write_corpus(
+    out_dir: str,
+    count: int,
+    seed: int = DEFAULT_SEED,
+    failure_rate: float = DEFAULT_FAILURE_RATE
+) -> dict[str, int]:
+    """
+    Writes the corpus under `out_dir`:
+        transcripts/<id>.txt   — load_transcript() input
+        responses/<id>.txt     — the raw model response for that call
+        templates/<id>.json    — clean responses for mock_server.py --template
+        manifest.txt           — transcript paths for main.py --manifest
+        labels.jsonl           — failure_mode / expected / insight_types per call
+
+    Returns: count of items per failure mode
+    """
+    root = Path(out_dir)
+    for sub in ("transcripts", "responses", "templates"):
+        (root / sub).mkdir(parents=True, exist_ok=True)
+
+    modes: dict[str, int] = {}
+    templates = 0
+    with open(root / "manifest.txt", "w", encoding="utf-8") as manifest, \
+         open(root / "labels.jsonl", "w", encoding="utf-8") as labels:
+        for item in generate_corpus(count, seed, failure_rate):
+            (root / "transcripts" / f"{item.transcript_id}.txt").write_text(item.transcript, encoding="utf-8")
+            (root / "responses" / f"{item.transcript_id}.txt").write_text(item.response, encoding="utf-8")
+            manifest.write(f"transcripts/{item.transcript_id}.txt\n")
+
+            label = asdict(item)
+            del label["transcript"], label["response"]
+            labels.write(json.dumps(label) + "\n")
+            modes[item.failure_mode] = modes.get(item.failure_mode, 0) + 1
+
+            if item.failure_mode == "clean" and item.insight_types and templates < MAX_TEMPLATES:
+                account = item.transcript.split("ACCOUNT: ", 1)[1].split("\n", 1)[0]
+                (root / "templates" / f"{item.transcript_id}.json").write_text(
+                    item.response.replace(account, "{{account_name}}"), encoding="utf-8"
+                )
+                templates += 1
+
+    logger.info(f"Corpus written to {root} | {count} calls | seed {seed} | {templates} templates")
+    return modes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic transcript + response corpus")
+    parser.add_argument("--count", type=int, default=1000, help="Number of calls (default: 1000)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Corpus seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--failure-rate", type=float, default=DEFAULT_FAILURE_RATE,
+                        help=f"Share of responses with an injected failure mode (default: {DEFAULT_FAILURE_RATE})")
+    parser.add_argument("--out", default="corpus", help="Output directory (default: corpus/)")
+    args = parser.parse_args()
+
+    configure_logging()
+    modes = write_corpus(args.out, args.count, args.seed, args.failure_rate)
+    for mode, n in sorted(modes.items(), key=lambda kv: -kv[1]):
+        print(f"  {mode:18} {n:>7}  (expected: {FAILURE_MODES[mode]})")
+
+
+if __name__ == "__main__":
+    main()
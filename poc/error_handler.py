@@ -6,7 +6,9 @@ Author: Erwin M. McDonald
 
 Handles all failure modes in the extraction pipeline:
     1. JSON parsing failures   — model returned malformed output
+                                 (local repair first, fallback API call only if that fails)
     2. Schema validation errors — output parsed but fields are wrong
+                                 (partial mode keeps valid insights, re-requests the rest)
     3. Confidence filtering     — valid output but below threshold
     4. Empty extraction         — no insights found (not an error, but needs handling)
     5. API errors               — rate limits, timeouts, network failures
@@ -16,9 +18,12 @@ Reason: During the Q&A, being able to say "here's exactly what happens when X fa
         is the difference between a candidate who built it and one who demoed it.
 """
 
+import re
 import json
+import time
 import logging
-from dataclasses import asdict
+from email.utils import parsedate_to_datetime
+from dataclasses import dataclass, asdict
 from typing import Optional
 
 from schema import (
@@ -26,15 +31,14 @@ from schema import (
     InsightType, SentimentLabel, RoutingDestination, UrgencyLevel,
     CONFIDENCE_THRESHOLD
 )
-
-# ─────────────────────────────────────────────────────────────
-# LOGGING SETUP
-# ─────────────────────────────────────────────────────────────
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+from metrics import (
+    timed_stage,
+    time_stage,
+    PARSE_FAILURES,
+    VALIDATION_FAILURES
 )
+from tracing import traced, current_span
+
 logger = logging.getLogger("jtbd.error_handler")
 
 
@@ -43,8 +47,22 @@ logger = logging.getLogger("jtbd.error_handler")
 # ─────────────────────────────────────────────────────────────
 
 class ExtractionValidationError(Exception):
-    """Raised when extracted JSON fails schema validation."""
-    pass
+    """
+    Raised when extracted JSON fails schema validation.
+    index / field / value identify the offending insight field when known.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        index: Optional[int] = None,
+        field: Optional[str] = None,
+        value: object = None
+    ):
+        super().__init__(message)
+        self.index = index
+        self.field = field
+        self.value = value
 
 
 class ConfidenceBelowThresholdError(Exception):
@@ -52,21 +70,29 @@ class ConfidenceBelowThresholdError(Exception):
     pass
 
 
+REQUIRED_INSIGHT_FIELDS = [
+    "insight_type", "summary", "sentiment", "urgency",
+    "confidence_score", "action_required"
+]
+
+
 def validate_insight_dict(raw: dict, index: int) -> ExtractedInsight:
     """
     Validates a single raw insight dict from the model output.
     Converts to typed ExtractedInsight dataclass.
     Raises ExtractionValidationError with specific field info on failure.
     """
-    required_fields = [
-        "insight_type", "summary", "sentiment", "urgency",
-        "confidence_score", "action_required"
-    ]
+    if not isinstance(raw, dict):
+        raise ExtractionValidationError(
+            f"Insight[{index}] must be a JSON object, got: {type(raw).__name__}",
+            index=index
+        )
 
-    for field in required_fields:
+    for field in REQUIRED_INSIGHT_FIELDS:
         if field not in raw:
             raise ExtractionValidationError(
-                f"Insight[{index}] missing required field: '{field}'"
+                f"Insight[{index}] missing required field: '{field}'",
+                index=index, field=field
             )
 
     # Validate enum values
@@ -75,28 +101,32 @@ def validate_insight_dict(raw: dict, index: int) -> ExtractedInsight:
     except ValueError:
         raise ExtractionValidationError(
             f"Insight[{index}] invalid insight_type: '{raw['insight_type']}'. "
-            f"Must be one of: {[e.value for e in InsightType]}"
+            f"Must be one of: {[e.value for e in InsightType]}",
+            index=index, field="insight_type", value=raw["insight_type"]
         )
 
     try:
         sentiment = SentimentLabel(raw["sentiment"])
     except ValueError:
         raise ExtractionValidationError(
-            f"Insight[{index}] invalid sentiment: '{raw['sentiment']}'"
+            f"Insight[{index}] invalid sentiment: '{raw['sentiment']}'",
+            index=index, field="sentiment", value=raw["sentiment"]
         )
 
     try:
         urgency = UrgencyLevel(raw["urgency"])
     except ValueError:
         raise ExtractionValidationError(
-            f"Insight[{index}] invalid urgency: '{raw['urgency']}'"
+            f"Insight[{index}] invalid urgency: '{raw['urgency']}'",
+            index=index, field="urgency", value=raw["urgency"]
         )
 
     # Validate confidence score range
     score = raw["confidence_score"]
     if not isinstance(score, (int, float)) or not (0.0 <= score <= 1.0):
         raise ExtractionValidationError(
-            f"Insight[{index}] confidence_score must be float 0.0-1.0, got: {score}"
+            f"Insight[{index}] confidence_score must be float 0.0-1.0, got: {score}",
+            index=index, field="confidence_score", value=score
         )
 
     # Determine routing target from insight type
@@ -108,8 +138,9 @@ def validate_insight_dict(raw: dict, index: int) -> ExtractedInsight:
     if score < CONFIDENCE_THRESHOLD:
         routing_target = RoutingDestination.HUMAN_REVIEW
         logger.info(
-            f"Insight[{index}] routed to Human Review — "
-            f"confidence {score:.2f} below threshold {CONFIDENCE_THRESHOLD}"
+            "Insight[%d] routed to Human Review — confidence %.2f below threshold %s",
+            index, score, CONFIDENCE_THRESHOLD,
+            extra={"event": "human_review_override", "confidence": score}
         )
 
     return ExtractedInsight(
@@ -128,6 +159,22 @@ def validate_insight_dict(raw: dict, index: int) -> ExtractedInsight:
     )
 
 
+def strip_markdown_fences(raw_response: str) -> str:
+    """
+    Strips accidental ```json fences the model sometimes wraps around output.
+    """
+    cleaned = raw_response.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("```")[1]
+        if cleaned.startswith("json"):
+            cleaned = cleaned[4:]
+        cleaned = cleaned.strip()
+    if cleaned.endswith("```"):
+        cleaned = cleaned[:-3].strip()
+    return cleaned
+
+
+@traced("parse_and_validate")
 def parse_and_validate(raw_response: str) -> tuple[list[ExtractedInsight], Optional[str]]:
     """
     Full parse + validate pipeline for a raw model response.
@@ -139,19 +186,21 @@ def parse_and_validate(raw_response: str) -> tuple[list[ExtractedInsight], Optio
         json.JSONDecodeError  — if response is not valid JSON
         ExtractionValidationError — if JSON is valid but schema is wrong
     """
-    # Strip any accidental markdown fences
-    cleaned = raw_response.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned.split("```")[1]
-        if cleaned.startswith("json"):
-            cleaned = cleaned[4:]
-        cleaned = cleaned.strip()
-    if cleaned.endswith("```"):
-        cleaned = cleaned[:-3].strip()
+    with time_stage("parse"):
+        parsed = json.loads(strip_markdown_fences(raw_response))
+    return validate_extraction(parsed)
 
-    parsed = json.loads(cleaned)
 
-    if "insights" not in parsed:
+@timed_stage("validate")
+def validate_extraction(parsed: dict) -> tuple[list[ExtractedInsight], Optional[str]]:
+    """
+    Validates an already-parsed response object. All-or-nothing:
+    the first invalid insight raises ExtractionValidationError.
+
+    Returns:
+        (validated_insights, processing_note)
+    """
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("insights"), list):
         raise ExtractionValidationError(
             "Response JSON missing top-level 'insights' array"
         )
@@ -165,6 +214,401 @@ def parse_and_validate(raw_response: str) -> tuple[list[ExtractedInsight], Optio
     return validated, processing_note
 
 
+# ─────────────────────────────────────────────────────────────
+# PARTIAL ACCEPTANCE
+# Validate every insight independently. Keep the valid ones,
+# map near-miss enum values, and collect per-field errors for
+# the rest so only the rejected items are re-requested.
+# ─────────────────────────────────────────────────────────────
+
+# Near-miss values the model produces → the controlled vocabulary.
+# Keys are normalized: lowercase, spaces/hyphens → underscores.
+ENUM_SYNONYMS: dict[str, dict[str, str]] = {
+    "insight_type": {
+        "competitor":           InsightType.COMPETITOR_MENTION.value,
+        "competitive_threat":   InsightType.COMPETITOR_MENTION.value,
+        "feature":              InsightType.FEATURE_REQUEST.value,
+        "feature_gap":          InsightType.FEATURE_REQUEST.value,
+        "bug":                  InsightType.BUG_REPORT.value,
+        "defect":               InsightType.BUG_REPORT.value,
+        "pricing":              InsightType.PRICING_FRICTION.value,
+        "pricing_concern":      InsightType.PRICING_FRICTION.value,
+        "churn":                InsightType.CHURN_SIGNAL.value,
+        "churn_risk":           InsightType.CHURN_SIGNAL.value,
+        "renewal_risk":         InsightType.CHURN_SIGNAL.value,
+        "positive":             InsightType.POSITIVE_SIGNAL.value,
+        "praise":               InsightType.POSITIVE_SIGNAL.value,
+        "feedback":             InsightType.GENERAL_FEEDBACK.value,
+    },
+    "sentiment": {
+        "mixed":                SentimentLabel.NEUTRAL.value,
+        "frustrated":           SentimentLabel.NEGATIVE.value,
+        "concerned":            SentimentLabel.NEGATIVE.value,
+        "angry":                SentimentLabel.CRITICAL.value,
+        "very_negative":        SentimentLabel.CRITICAL.value,
+        "satisfied":            SentimentLabel.POSITIVE.value,
+        "very_positive":        SentimentLabel.POSITIVE.value,
+    },
+    "urgency": {
+        "none":                 UrgencyLevel.LOW.value,
+        "minor":                UrgencyLevel.LOW.value,
+        "moderate":             UrgencyLevel.MEDIUM.value,
+        "normal":               UrgencyLevel.MEDIUM.value,
+        "medium_high":          UrgencyLevel.HIGH.value,
+        "urgent":               UrgencyLevel.HIGH.value,
+        "severe":               UrgencyLevel.CRITICAL.value,
+        "immediate":            UrgencyLevel.CRITICAL.value,
+        "blocker":              UrgencyLevel.CRITICAL.value,
+    },
+}
+
+_ENUM_TYPES = {
+    "insight_type": InsightType,
+    "sentiment":    SentimentLabel,
+    "urgency":      UrgencyLevel,
+}
+
+
+@dataclass
+class InsightFieldError:
+    """One field-level validation problem on one insight."""
+    index:      int
+    field:      Optional[str]
+    value:      object
+    message:    str
+
+
+@dataclass
+class RejectedInsight:
+    """An insight that failed validation, with every field error found."""
+    index:      int
+    raw:        object
+    errors:     list[InsightFieldError]
+
+
+def apply_enum_synonyms(raw: dict, index: int) -> dict:
+    """
+    Returns a copy of `raw` with near-miss enum values mapped through
+    ENUM_SYNONYMS (and case/spacing normalized). Unknown values are left
+    untouched so collect_field_errors() can report them.
+    """
+    mapped = dict(raw)
+    for field, enum_type in _ENUM_TYPES.items():
+        value = raw.get(field)
+        if not isinstance(value, str):
+            continue
+        normalized = value.strip().lower().replace(" ", "_").replace("-", "_")
+        candidate = ENUM_SYNONYMS[field].get(normalized, normalized)
+        if candidate != value and candidate in enum_type._value2member_map_:
+            mapped[field] = candidate
+            logger.info(
+                f"Insight[{index}] mapped {field} '{value}' → '{candidate}'"
+            )
+    return mapped
+
+
+def collect_field_errors(raw: object, index: int) -> list[InsightFieldError]:
+    """
+    Checks every field of one raw insight without stopping at the first
+    problem. Empty list means validate_insight_dict() will accept it.
+    """
+    if not isinstance(raw, dict):
+        return [InsightFieldError(index, None, raw, "insight must be a JSON object")]
+
+    errors = []
+    for field in REQUIRED_INSIGHT_FIELDS:
+        if field not in raw:
+            errors.append(InsightFieldError(index, field, None, "missing required field"))
+
+    for field, enum_type in _ENUM_TYPES.items():
+        if field not in raw:
+            continue
+        # isinstance first — a list or dict value is unhashable and would
+        # raise TypeError from the membership test instead of being reported
+        value = raw[field]
+        if not isinstance(value, str) or value not in enum_type._value2member_map_:
+            errors.append(InsightFieldError(
+                index, field, value,
+                f"must be one of: {[e.value for e in enum_type]}"
+            ))
+
+    score = raw.get("confidence_score")
+    if "confidence_score" in raw and (
+        not isinstance(score, (int, float)) or not (0.0 <= score <= 1.0)
+    ):
+        errors.append(InsightFieldError(
+            index, "confidence_score", score, "must be a float 0.0-1.0"
+        ))
+
+    return errors
+
+
+@timed_stage("validate")
+def validate_extraction_partial(
+    parsed: dict,
+    use_synonyms: bool = True
+) -> tuple[list[ExtractedInsight], Optional[str], list[RejectedInsight]]:
+    """
+    Validates every insight independently instead of all-or-nothing.
+
+    Returns:
+        (validated_insights, processing_note, rejected_insights)
+
+    Raises:
+        ExtractionValidationError — only if there is no 'insights' array at all
+    """
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("insights"), list):
+        raise ExtractionValidationError(
+            "Response JSON missing top-level 'insights' array"
+        )
+
+    validated: list[ExtractedInsight] = []
+    rejected: list[RejectedInsight] = []
+    for i, raw_insight in enumerate(parsed["insights"]):
+        candidate = raw_insight
+        if use_synonyms and isinstance(raw_insight, dict):
+            candidate = apply_enum_synonyms(raw_insight, i)
+
+        errors = collect_field_errors(candidate, i)
+        if errors:
+            rejected.append(RejectedInsight(index=i, raw=raw_insight, errors=errors))
+            continue
+        validated.append(validate_insight_dict(candidate, i))
+
+    if rejected:
+        logger.warning(
+            f"Partial validation: {len(validated)} accepted, {len(rejected)} rejected — "
+            + "; ".join(
+                f"Insight[{r.index}] " + ", ".join(
+                    f"{e.field}={e.value!r}" if e.field else e.message for e in r.errors
+                )
+                for r in rejected
+            )
+        )
+
+    return validated, parsed.get("processing_note"), rejected
+
+
+# ─────────────────────────────────────────────────────────────
+# LOCAL JSON REPAIR
+# Deterministic fixes for the malformed-JSON cases we actually see,
+# attempted before paying for a fallback API round trip.
+# ─────────────────────────────────────────────────────────────
+
+# Python literals the model occasionally emits instead of JSON ones
+_PY_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_VALID_ESCAPES = set('"\\/bfnrtu')
+
+
+@dataclass
+class RepairStats:
+    """
+    Running count of local repair attempts.
+    Every success is one fallback API round trip that was not needed.
+    """
+    attempts:   int = 0
+    successes:  int = 0
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.attempts if self.attempts else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"JSON repair: {self.successes}/{self.attempts} repaired locally "
+            f"({self.success_rate:.0%}) — {self.successes} fallback calls avoided"
+        )
+
+
+REPAIR_STATS = RepairStats()
+
+
+def _closes_string(text: str, i: int) -> bool:
+    """
+    True if the quote at text[i] ends a JSON string: the next non-space
+    character is a delimiter, or the text ends. Otherwise it is an
+    unescaped quote inside the string.
+    """
+    j = i + 1
+    while j < len(text) and text[j] in " \t\r\n":
+        j += 1
+    return j >= len(text) or text[j] in ",:}]"
+
+
+def _repair_pass(text: str) -> tuple[str, list[str], bool, Optional[tuple[str, list[str]]]]:
+    """
+    One string-aware pass over `text` (which starts at the first '{').
+
+    Fixes in flight:
+        - unescaped quotes inside strings
+        - raw newlines / control characters inside strings
+        - invalid escapes such as \\'
+        - trailing commas before } or ]
+        - Python None / True / False
+        - prose after the top-level object closes
+
+    Returns: (repaired_text, open_brackets, ended_in_string, last_safe_cut)
+    where last_safe_cut is (repaired prefix, open brackets) just after the last
+    element that completed inside a container — the point to truncate back to
+    when the output was cut off mid-insight.
+    """
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    escape = False
+    safe_cut: Optional[tuple[int, list[str]]] = None     # (len(out), open brackets)
+    i = 0
+
+    while i < len(text):
+        ch = text[i]
+
+        if in_string:
+            if escape:
+                out.append("\\" + ch if ch in _VALID_ESCAPES else ch)
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                if _closes_string(text, i):
+                    in_string = False
+                    out.append(ch)
+                else:
+                    out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            elif ord(ch) < 0x20:
+                out.append(f"\\u{ord(ch):04x}")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            # Trailing comma before a closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                break           # Top-level object complete — ignore trailing prose
+            safe_cut = (len(out), list(stack))
+        else:
+            for word, literal in _PY_LITERALS.items():
+                if text.startswith(word, i) and not text[i - 1].isalnum():
+                    out.append(literal)
+                    i += len(word)
+                    break
+            else:
+                out.append(ch)
+                i += 1
+            continue
+        i += 1
+
+    if safe_cut is not None:
+        safe_cut = ("".join(out[:safe_cut[0]]), safe_cut[1])
+    return "".join(out), stack, in_string, safe_cut
+
+
+def _close_brackets(text: str, stack: list[str]) -> str:
+    text = re.sub(r"[\s,]*$", "", text)
+    text = re.sub(r',?\s*"[^"]*"\s*:\s*$', "", text)    # Dangling key with no value
+    return text + "".join(reversed(stack))
+
+
+def repair_json(raw_response: str) -> Optional[str]:
+    """
+    Attempts deterministic local fixes on a malformed model response.
+    Returns repaired JSON text that parses and has an "insights" array,
+    or None if the response could not be repaired.
+
+    Truncated output is cut back to the last complete insight and closed —
+    a partially written insight is dropped rather than guessed at.
+    """
+    REPAIR_STATS.attempts += 1
+
+    start = raw_response.find("{")
+    if start == -1:
+        logger.warning("JSON repair failed — no JSON object in response")
+        return None
+
+    repaired, stack, ended_in_string, safe_cut = _repair_pass(raw_response[start:])
+
+    candidates = []
+    if not stack and not ended_in_string:
+        candidates.append(repaired)
+    else:
+        # Truncated mid-output: prefer cutting back to the last complete element
+        if safe_cut is not None:
+            cut_text, cut_stack = safe_cut
+            candidates.append(_close_brackets(cut_text, cut_stack))
+        closed = repaired + ('"' if ended_in_string else "")
+        candidates.append(_close_brackets(closed, stack))
+
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict) and isinstance(parsed.get("insights"), list):
+            REPAIR_STATS.successes += 1
+            logger.info(
+                f"JSON repaired locally — fallback API call avoided | "
+                f"{REPAIR_STATS.summary()}"
+            )
+            return candidate
+
+    logger.warning("JSON repair failed — no deterministic fix produced valid JSON")
+    return None
+
+
+@timed_stage("parse")
+def load_response_json(raw_response: str) -> tuple[object, bool]:
+    """
+    json.loads() for a raw model response, with fence stripping and one
+    local repair attempt on malformed output.
+
+    Returns: (parsed_json, was_repaired)
+    Raises:  json.JSONDecodeError — if the response is malformed and unrepairable
+    """
+    try:
+        return json.loads(strip_markdown_fences(raw_response)), False
+    except json.JSONDecodeError:
+        repaired = repair_json(raw_response)
+        if repaired is None:
+            raise
+    return json.loads(repaired), True
+
+
+@traced("parse_and_validate")
+def parse_with_local_repair(raw_response: str) -> tuple[list[ExtractedInsight], Optional[str]]:
+    """
+    parse_and_validate(), retried once on a locally repaired copy
+    if the response is not valid JSON.
+
+    Raises:
+        json.JSONDecodeError  — if the response is malformed and unrepairable
+        ExtractionValidationError — if JSON is valid but schema is wrong
+    """
+    parsed, repaired = load_response_json(raw_response)
+    current_span().set_attribute("repaired", repaired)
+    insights, processing_note = validate_extraction(parsed)
+    if repaired:
+        processing_note = f"JSON REPAIRED LOCALLY. {processing_note or ''}".strip()
+    return insights, processing_note
+
+
 # ─────────────────────────────────────────────────────────────
 # FAILURE HANDLERS
 # ─────────────────────────────────────────────────────────────
@@ -174,6 +618,7 @@ def handle_json_parse_failure(raw_response: str, attempt: int) -> str:
     Called when raw model output cannot be parsed as JSON.
     Logs the failure and returns a sanitized snippet for the fallback prompt.
     """
+    PARSE_FAILURES.inc()
     logger.warning(
         f"JSON parse failure on attempt {attempt}. "
         f"First 200 chars of response: {raw_response[:200]!r}"
@@ -185,6 +630,7 @@ def handle_validation_failure(error: ExtractionValidationError, attempt: int) ->
     """
     Called when JSON is valid but fails schema validation.
     """
+    VALIDATION_FAILURES.inc()
     logger.warning(
         f"Schema validation failure on attempt {attempt}: {error}"
     )
@@ -214,6 +660,8 @@ def handle_api_error(error: Exception, transcript_id: str) -> None:
     """
     Called when the Anthropic API returns an error.
     Logs with full context for debugging.
+    Retryable errors reach this handler only once the scheduler's
+    retry budget is exhausted (see scheduler.py).
     """
     logger.error(
         f"API error for transcript '{transcript_id}': "
@@ -221,13 +669,68 @@ def handle_api_error(error: Exception, transcript_id: str) -> None:
     )
 
 
+# Status codes worth retrying: timeout, conflict, rate limit, server errors, overloaded
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Connection-level failures carry no status code — matched by class name so
+# this module never needs to import the anthropic SDK
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for 429 (rate limited) and 529 (overloaded) responses."""
+    return getattr(error, "status_code", None) in (429, 529)
+
+
+def is_retryable_api_error(error: Exception) -> bool:
+    """
+    True if the same request may succeed when retried later.
+    4xx errors other than 408/409/429 are permanent and fail immediately.
+    """
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Reads the server's requested wait from retry-after-ms / retry-after headers.
+    Returns None if the error carries no usable hint.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+                return max(0.0, retry_at.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
 def build_extraction_result(
     metadata: CallMetadata,
     insights: list[ExtractedInsight],
-    processing_note: Optional[str]
+    processing_note: Optional[str],
+    model_tier: Optional[str] = None
 ) -> ExtractionResult:
     """
     Assembles the final ExtractionResult with diagnostic counts.
+    model_tier records which cascade tier produced the insights, if any.
     """
     high_confidence = sum(
         1 for i in insights
@@ -245,5 +748,6 @@ def build_extraction_result(
         total_insights=len(insights),
         high_confidence=high_confidence,
         routed_to_review=routed_to_review,
-        processing_note=processing_note
+        processing_note=processing_note,
+        model_tier=model_tier
     )
@@ -0,0 +1,295 @@
+"""
+journal.py — Write-Ahead Journal for Resumable Batch Runs
+==========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+A batch of 5,000 transcripts that dies at 4,200 should not pay for 4,200
+extractions twice. With --journal, every transcript's progress is appended
+to a JSONL file as it happens:
+
+    loaded     — transcript read (path, content digest)
+    extracted  — primary model response received (raw text kept)
+    validated  — insights parsed + validated (insights kept)
+    routed     — alerts built (status, alert ids)
+    delivered  — alerts written to the run output (--output json only)
+
+Re-running the same command with the same journal resumes each transcript
+from its last recorded state:
+
+    delivered  → skipped
+    validated+ → re-routed from the journaled insights (no API call)
+    extracted  → parse + validate replayed on the journaled raw response;
+                 only a failed parse still pays for the fallback call
+    loaded     → extracted from scratch
+
+    python main.py --transcript-dir transcripts/ --journal run.journal
+    python main.py --transcript-dir transcripts/ --journal run.journal --journal-fsync always
+
+Design Decision: Append-only JSONL, replayed on open.
+Reason: An append never rewrites earlier progress, so a crash can cost at
+        most the records still buffered. A torn final line is skipped on
+        replay — the transcript simply resumes from its previous state.
+
+Design Decision: Records are keyed by transcript_id + content digest.
+Reason: Transcripts without a header ID all share a fallback ID, and a
+        transcript edited between runs must not resume from stale output.
+
+Design Decision: Batched writes, tunable fsync.
+Reason: One write + fsync per record would make the journal the slowest
+        stage at high throughput. Records are buffered and written every
+        `batch_size` records, and a background thread writes whatever is
+        buffered every `flush_interval` seconds — so a crash while every
+        worker waits on a slow API call still loses at most that long:
+            fsync="batch"  — fsync each written batch (default)
+            fsync="always" — write and fsync every record
+            fsync="never"  — write batches, leave durability to the OS
+                             (survives a process crash, not a power cut)
+
+Design Decision: Delivery is at-least-once.
+Reason: "delivered" is recorded after the output is written. A crash
+        between the two re-delivers those transcripts on resume; the
+        alternative, recording first, could lose them.
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Optional
+
+from schema import ExtractedInsight, InsightType, SentimentLabel, UrgencyLevel, RoutingDestination
+
+logger = logging.getLogger("jtbd.journal")
+
+JOURNAL_STATES = ("loaded", "extracted", "validated", "routed", "delivered")
+FSYNC_POLICIES = ("always", "batch", "never")
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_FLUSH_INTERVAL = 1.0    # Seconds — bounds how much progress a crash can lose
+
+_STATE_ORDER = {state: i for i, state in enumerate(JOURNAL_STATES)}
+
+
+# ─────────────────────────────────────────────────────────────
+# INSIGHT SERIALIZATION
+# ─────────────────────────────────────────────────────────────
+
+def insight_to_dict(insight: ExtractedInsight) -> dict:
+    """Plain-dict form of a validated insight (enums as their string values)."""
+    record = asdict(insight)
+    for name in ("insight_type", "sentiment", "urgency", "routing_target"):
+        record[name] = record[name].value
+    return record
+
+
+def insight_from_dict(record: dict) -> ExtractedInsight:
+    """Inverse of insight_to_dict()."""
+    return ExtractedInsight(**{
+        **record,
+        "insight_type": InsightType(record["insight_type"]),
+        "sentiment": SentimentLabel(record["sentiment"]),
+        "urgency": UrgencyLevel(record["urgency"]),
+        "routing_target": RoutingDestination(record["routing_target"]),
+    })
+
+
+# ─────────────────────────────────────────────────────────────
+# JOURNAL ENTRIES
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class JournalEntry:
+    """Everything known about one transcript, folded from its records."""
+    key:                str
+    transcript_id:      str
+    path:               Optional[str] = None
+    state:              str = "loaded"
+    raw_response:       Optional[str] = None
+    insights:           Optional[list[dict]] = None
+    processing_note:    Optional[str] = None
+    model_tier:         Optional[str] = None
+    status:             Optional[str] = None
+    alert_ids:          list[str] = field(default_factory=list)
+
+    def reached(self, state: str) -> bool:
+        return _STATE_ORDER[self.state] >= _STATE_ORDER[state]
+
+    def apply(self, record: dict) -> None:
+        if _STATE_ORDER[record["state"]] > _STATE_ORDER[self.state]:
+            self.state = record["state"]
+        for name in ("path", "raw_response", "insights", "processing_note",
+                     "model_tier", "status", "alert_ids"):
+            if name in record:
+                setattr(self, name, record[name])
+
+    def validated_insights(self) -> list[ExtractedInsight]:
+        return [insight_from_dict(record) for record in self.insights or []]
+
+
+def journal_key(transcript_id: str, transcript: str) -> str:
+    digest = hashlib.sha256(transcript.encode("utf-8")).hexdigest()[:16]
+    return f"{transcript_id}:{digest}"
+
+
+# ─────────────────────────────────────────────────────────────
+# JOURNAL
+# ─────────────────────────────────────────────────────────────
+
+class Journal:
+    """
+    Append-only per-transcript progress log. Existing records are replayed
+    on open; new ones are buffered and written in batches (see module doc).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync: str = "batch",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got: {fsync!r}")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got: {batch_size}")
+        self.path = Path(path)
+        self.fsync = fsync
+        self.batch_size = 1 if fsync == "always" else batch_size
+        self.flush_interval = flush_interval
+
+        self.entries: dict[str, JournalEntry] = {}
+        self._key_by_path: dict[str, str] = {}
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.records_written = 0
+        self.flushes = 0
+        self.resumed: dict[str, int] = {}
+
+        self._replay()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            # Terminate a torn final record so the next one starts on its own line
+            self._file.write("\n")
+        atexit.register(self.close)
+        if self.batch_size > 1 and flush_interval > 0:
+            threading.Thread(target=self._flush_periodically, name="journal-flush", daemon=True).start()
+
+    def _replay(self) -> None:
+        if not self.path.exists():
+            return
+        records = torn = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    torn += 1
+                    continue
+                self._fold(record)
+                records += 1
+        if torn:
+            logger.warning(f"Journal {self.path}: skipped {torn} incomplete records")
+        logger.info(
+            f"Journal {self.path}: replayed {records} records for {len(self.entries)} transcripts"
+        )
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _fold(self, record: dict) -> JournalEntry:
+        entry = self.entries.get(record["key"])
+        if entry is None:
+            entry = self.entries[record["key"]] = JournalEntry(
+                key=record["key"], transcript_id=record["transcript_id"]
+            )
+        entry.apply(record)
+        if entry.path:
+            self._key_by_path[entry.path] = entry.key
+        return entry
+
+    # ─────────────────────────────────────────────────────────
+    # READ
+    # ─────────────────────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[JournalEntry]:
+        return self.entries.get(key)
+
+    def note_resume(self, entry: JournalEntry) -> None:
+        """Counts a transcript picked up from a previous run's state."""
+        with self._lock:
+            self.resumed[entry.state] = self.resumed.get(entry.state, 0) + 1
+
+    # ─────────────────────────────────────────────────────────
+    # WRITE
+    # ─────────────────────────────────────────────────────────
+
+    def record(self, key: str, transcript_id: str, state: str, **fields) -> None:
+        """Appends one state transition for a transcript."""
+        record = {"key": key, "transcript_id": transcript_id, "state": state,
+                  "ts": round(time.time(), 3), **fields}
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._fold(record)
+            self._buffer.append(line)
+            if (len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def mark_delivered(self, paths: list[str]) -> None:
+        """Records "delivered" for every journaled transcript among `paths`."""
+        for path in paths:
+            key = self._key_by_path.get(path)
+            entry = self.entries.get(key) if key else None
+            if entry is not None and entry.reached("routed") and entry.state != "delivered":
+                self.record(key, entry.transcript_id, "delivered")
+        self.flush()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer or self._file.closed:
+            return
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self.records_written += len(self._buffer)
+        self.flushes += 1
+        self._buffer.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_periodically(self) -> None:
+        """Timer thread: the flush_interval bound holds even when no record arrives."""
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._buffer:
+                    self._flush_locked()
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            if not self._file.closed:
+                self._file.close()
+
+    def summary(self) -> str:
+        """One-line journal summary for end-of-run output."""
+        resumed = ", ".join(f"{n} from {state}" for state, n in sorted(
+            self.resumed.items(), key=lambda kv: _STATE_ORDER[kv[0]]
+        )) or "none"
+        return (
+            f"Journal: {self.records_written} records in {self.flushes} writes "
+            f"(fsync: {self.fsync}) | resumed: {resumed}"
+        )
@@ -7,7 +7,7 @@ Author: Erwin M. McDonald
 Entry point for the POC. Orchestrates the full pipeline:
     1. Load transcript + metadata
     2. Call Anthropic API with extraction prompt
-    3. Parse and validate structured output
+    3. Parse and validate structured output (local JSON repair if malformed)
     4. Fallback if primary extraction fails
     5. Route insights to stakeholders
     6. Display formatted alerts + CSM confirmations
@@ -25,30 +25,89 @@ USAGE:
     # Run without API key (mock mode for demo)
     python main.py --mock
 
+    # Batch mode — every transcript in a directory, 16 at a time
+    python main.py --transcript-dir transcripts/ --concurrency 16
+
+    # Batch mode — transcripts listed in a manifest file
+    python main.py --manifest todays_calls.txt
+
+    # Re-extract even if a cached response exists (cache is on by default)
+    python main.py --refresh
+
+    # Stream the extraction — each alert routes as soon as it is generated
+    python main.py --stream
+
+    # Long calls — overlapping windows extracted in parallel, then merged
+    python main.py --transcript long_qbr.txt --chunked
+
+    # Keep valid insights, re-request only the invalid ones (no full fallback)
+    python main.py --validation partial
+
+    # Batch under the org's rate limits (429s back off and shrink concurrency)
+    python main.py --transcript-dir transcripts/ --rpm 50 --input-tpm 40000 --output-tpm 8000
+
+    # Stage latency histograms + token counters in Prometheus text format
+    python main.py --transcript-dir transcripts/ --metrics-file jtbd.prom --metrics-port 9108
+
+    # Per-transcript span traces (API call, fallback, routing, delivery) as JSONL
+    python main.py --transcript-dir transcripts/ --trace-file spans.jsonl
+
+    # Structured JSON logs on a background thread, 1% of per-alert routing lines
+    python main.py --transcript-dir transcripts/ --log-format json --log-queue --log-sample route=0.01
+
+    # Worker mode — one process, one client, transcripts dropped into an inbox
+    python main.py --serve --inbox inbox/ --concurrency 16 --metrics-port 9108
+
+    # Crash-safe batch — rerun the same command to resume where it died
+    python main.py --transcript-dir transcripts/ --journal run.journal
+
 REQUIREMENTS:
     pip install anthropic
     export ANTHROPIC_API_KEY=your_key_here
 """
 
+from __future__ import annotations
+
 import os
 import sys
+import atexit
 import json
+import time
+import asyncio
+import inspect
 import argparse
 import logging
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
 
-import anthropic
+if TYPE_CHECKING:
+    import anthropic        # Annotations only — main.make_client() imports the SDK
 
 from schema import CallMetadata, CONFIDENCE_THRESHOLD
+from cache import ExtractionCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from scheduler import RateLimitScheduler, ScheduledClient, DEFAULT_MAX_RETRIES
+from prefilter import Prefilter, DEFAULT_THRESHOLD
+from metrics import timed_stage, time_stage, record_tokens, write_textfile, serve_metrics, FALLBACKS
+from tracing import configure_tracing, current_span, span, traced, TRACE_FORMATS
+from logging_config import configure_logging, parse_sample_rates, LOG_FORMATS, LOG_LEVELS
+from journal import Journal, FSYNC_POLICIES, DEFAULT_BATCH_SIZE as DEFAULT_JOURNAL_BATCH
 from prompts import (
-    SYSTEM_PROMPT,
-    build_extraction_prompt,
-    build_fallback_prompt,
-    PROMPT_VERSION
+    build_system_blocks,
+    build_extraction_content,
+    build_fallback_content,
+    build_correction_content,
+    build_extraction_tool,
+    build_tool_choice,
+    PROMPT_VERSION,
+    FALLBACK_TRANSCRIPT_CHARS
 )
 from error_handler import (
-    parse_and_validate,
+    parse_with_local_repair,
+    load_response_json,
+    validate_extraction,
+    validate_extraction_partial,
+    RejectedInsight,
     handle_json_parse_failure,
     handle_validation_failure,
     handle_empty_extraction,
@@ -66,15 +125,39 @@ from router import (
 
 # ─────────────────────────────────────────────────────────────
 # LOGGING
+# Configured once in main() via logging_config.configure_logging()
 # ─────────────────────────────────────────────────────────────
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-)
 logger = logging.getLogger("jtbd.main")
 
 
+# ─────────────────────────────────────────────────────────────
+# MODEL SETTINGS
+# Part of the extraction cache key — changing any of these
+# invalidates cached responses automatically.
+# ─────────────────────────────────────────────────────────────
+
+EXTRACTION_MODEL = "claude-sonnet-4-6"
+EXTRACTION_MAX_TOKENS = 4096            # Floor for the dynamic response budget
+EXTRACTION_MAX_TOKENS_CAP = 16384       # Ceiling for the dynamic response budget
+OUTPUT_TOKENS_PER_INPUT_TOKEN = 0.35    # Dense QBRs: ~1 insight (~250 tokens) per ~700 transcript tokens
+CHARS_PER_TOKEN = 4
+MAX_CONTINUATIONS = 3                   # Continuation requests after a max_tokens stop
+API_TIMEOUT: Optional[float] = None     # Seconds per request; None = SDK default (--api-timeout)
+FALLBACK_MAX_TOKENS = 2048
+CORRECTION_MAX_TOKENS = 2048
+
+# Running token totals per model for this process — lets a cascade run
+# report what each tier actually cost (see cascade.py)
+TOKEN_USAGE: dict[str, dict[str, int]] = {}
+
+# "strict": all-or-nothing validation | "partial": keep valid insights, correct the rest
+VALIDATION_MODES = ("strict", "partial")
+
+# "text": JSON in the response text | "tool": forced record_insights tool call
+EXTRACTION_MODES = ("text", "tool")
+
+
 # ─────────────────────────────────────────────────────────────
 # MOCK DATA — used when --mock flag is set (no API key needed)
 # ─────────────────────────────────────────────────────────────
@@ -168,12 +251,17 @@ MOCK_API_RESPONSE = """{
 # TRANSCRIPT LOADER
 # ─────────────────────────────────────────────────────────────
 
+@timed_stage("load")
 def load_transcript(path: str) -> tuple[str, CallMetadata]:
     """
     Loads a transcript file and extracts metadata from the header block.
     Supports the standard transcript format used in sample_transcript.txt.
     """
-    content = Path(path).read_text(encoding="utf-8")
+    return parse_transcript(Path(path).read_text(encoding="utf-8"))
+
+
+def parse_transcript(content: str) -> tuple[str, CallMetadata]:
+    """Splits transcript text into (transcript body, CallMetadata from the header)."""
     lines = content.split("\n")
 
     # Parse metadata from header
@@ -206,68 +294,486 @@ def load_transcript(path: str) -> tuple[str, CallMetadata]:
 # EXTRACTION ENGINE
 # ─────────────────────────────────────────────────────────────
 
-def extract_insights(
+async def _create_message(client, **request):
+    """
+    Sends one Messages API request through either client flavour.
+    Timed as the "api" stage — including any rate-limit scheduler wait,
+    since that is latency the transcript actually sees.
+
+    Design Decision: One extraction implementation for both clients.
+    Reason: anthropic.AsyncAnthropic is awaited directly; the blocking
+            anthropic.Anthropic call runs in a worker thread so it never
+            stalls the event loop. The single pipeline, chunked extraction
+            and the batch runner share every line of extraction + fallback
+            logic — and concurrent calls stay concurrent with either client.
+    """
+    with time_stage("api"):
+        if inspect.iscoroutinefunction(inspect.unwrap(client.messages.create)):
+            return await client.messages.create(**request)
+        return await asyncio.to_thread(client.messages.create, **request)
+
+
+def log_usage(label: str, message) -> None:
+    """
+    Logs token usage for one API response, including prompt-cache activity.
+    Cache read tokens are billed at a fraction of base input; cache write
+    tokens at a premium — both are reported so the saving is measurable.
+    """
+    usage = message.usage
+    logger.info(
+        f"{label} | "
+        f"Input tokens: {usage.input_tokens} | "
+        f"Output tokens: {usage.output_tokens} | "
+        f"Cache read: {getattr(usage, 'cache_read_input_tokens', 0) or 0} | "
+        f"Cache write: {getattr(usage, 'cache_creation_input_tokens', 0) or 0}"
+    )
+
+
+def record_usage(model: str, message) -> None:
+    """
+    Adds one response's token usage to the per-model running totals,
+    the Prometheus counters and the current trace span.
+    """
+    usage = message.usage
+    totals = TOKEN_USAGE.setdefault(
+        model, {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+    )
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    output_tokens = getattr(usage, "output_tokens", 0) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    totals["requests"] += 1
+    totals["input_tokens"] += input_tokens + cache_read + cache_write
+    totals["output_tokens"] += output_tokens
+    record_tokens(model, usage)
+
+    active = current_span()
+    active.incr("input_tokens", input_tokens)
+    active.incr("output_tokens", output_tokens)
+    active.incr("cache_read_tokens", cache_read)
+    active.incr("cache_write_tokens", cache_write)
+
+
+def response_text(message) -> str:
+    """
+    Raw output of a Messages API response as a string.
+    A tool_use block is returned as its JSON-serialized input, so caching
+    and logging stay string-based in both extraction modes.
+    """
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use":
+            return json.dumps(block.input, ensure_ascii=False)
+    return "".join(getattr(block, "text", "") for block in message.content)
+
+
+def size_max_tokens(transcript: str) -> int:
+    """
+    Response budget for the primary extraction, scaled to transcript length.
+    Short calls keep EXTRACTION_MAX_TOKENS; long calls get proportionally
+    more, up to EXTRACTION_MAX_TOKENS_CAP. Continuation covers the rest.
+    """
+    input_tokens = len(transcript) / CHARS_PER_TOKEN
+    budget = int(input_tokens * OUTPUT_TOKENS_PER_INPUT_TOKEN)
+    return max(EXTRACTION_MAX_TOKENS, min(EXTRACTION_MAX_TOKENS_CAP, budget))
+
+
+async def continue_truncated_async(
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    request: dict,
+    text: str,
+    message,
+    label: str = "API call"
+) -> tuple[str, object]:
+    """
+    Resumes a text response that stopped on max_tokens.
+    The output so far is sent back as an assistant prefill, so the model
+    continues the same JSON from where it stopped — nothing is regenerated
+    and nothing is dropped. Repeats up to MAX_CONTINUATIONS times.
+
+    Design Decision: Continue, don't fall back.
+    Reason: The simplified fallback drops verbatim quotes and sees only the
+            first 2,000 chars of the transcript. A truncated response is not
+            wrong, just unfinished — the cheapest fix is to let it finish.
+            The continuation repeats the same cached prompt prefix.
+
+    Returns: (stitched_text, last_message)
+    """
+    continuations = 0
+    while (getattr(message, "stop_reason", None) == "max_tokens"
+           and "tools" not in request
+           and continuations < MAX_CONTINUATIONS):
+        continuations += 1
+        current_span().incr("continuations")
+        # The API rejects an assistant prefill ending in whitespace
+        text = text.rstrip()
+        logger.warning(
+            f"{label} stopped at max_tokens ({request['max_tokens']}) — "
+            f"continuation {continuations}/{MAX_CONTINUATIONS} from {len(text)} chars"
+        )
+        message = await _create_message(client, **{
+            **request,
+            "messages": request["messages"] + [{"role": "assistant", "content": text}],
+        })
+        text += response_text(message)
+        log_usage(f"{label} continuation {continuations}", message)
+        record_usage(request["model"], message)
+
+    if getattr(message, "stop_reason", None) == "max_tokens":
+        logger.warning(
+            f"{label} still truncated after {continuations} continuations — "
+            f"local JSON repair will close what was generated"
+        )
+    return text, message
+
+
+async def request_text(
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    request: dict,
+    metadata: CallMetadata,
+    cache: Optional[ExtractionCache] = None,
+    cache_key: Optional[str] = None,
+    refresh: bool = False,
+    label: str = "API call"
+) -> str:
+    """
+    One cache-aware model call: cache lookup → API call → usage log →
+    continuation on max_tokens → cache write.
+    Returns the raw (stitched) response text. API errors propagate to the caller.
+    """
+    with span("api_call", label=label, model=request["model"],
+              transcript_id=metadata.transcript_id) as api_span:
+        if cache is not None and cache_key is not None and not refresh:
+            cached = cache.get(cache_key)
+            api_span.set_attribute("cache_hit", cached is not None)
+            if cached is not None:
+                logger.info(
+                    f"Cache hit — skipping {label} | Transcript: {metadata.transcript_id}"
+                )
+                return cached
+
+        logger.info(
+            f"{label} → Anthropic API | Model: {request['model']} | "
+            f"Prompt version: {PROMPT_VERSION}"
+        )
+        message = await _create_message(client, **request)
+        raw_response = response_text(message)
+        log_usage(f"{label} successful", message)
+        record_usage(request["model"], message)
+        raw_response, _ = await continue_truncated_async(
+            client, request, raw_response, message, label
+        )
+
+        if cache is not None and cache_key is not None:
+            cache.put(
+                cache_key, raw_response,
+                model=request["model"], transcript_id=metadata.transcript_id
+            )
+        return raw_response
+
+
+@traced("extract_insights")
+async def extract_insights_async(
     transcript: str,
     metadata: CallMetadata,
-    client: anthropic.Anthropic,
-    mock: bool = False
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    validation: str = "strict",
+    model: str = EXTRACTION_MODEL,
+    max_tokens: Optional[int] = None,
+    fallback: bool = True,
+    mode: str = "text",
+    raw_response: Optional[str] = None,
+    on_response: Optional[Callable[[str], None]] = None,
+    fallback_chars: Optional[int] = FALLBACK_TRANSCRIPT_CHARS
 ) -> tuple[list, str | None]:
     """
     Calls the Anthropic API to extract structured insights from a transcript.
     Implements two-stage extraction with fallback on failure.
 
+    Accepts either a sync or an async client. The batch runner awaits this
+    directly on its event loop; extract_insights() wraps it for single runs.
+
+    If `cache` is given, raw responses are looked up before — and stored
+    after — every API call. `refresh=True` skips the lookup but still
+    overwrites the entry with the fresh response.
+
+    validation="strict"  — first invalid insight fails the whole response → fallback
+    validation="partial" — keep valid insights, map near-miss enums, re-request
+                           only the rejected ones (see error_handler.py)
+
+    mode="text" — the model writes the JSON contract as text; parsed with
+                  fence stripping + local repair
+    mode="tool" — the contract is a forced tool call (prompts.py Layer 5);
+                  the tool arguments are validated directly, no repair path
+
+    `model` selects the model for every call of this run (primary,
+    correction, fallback). `max_tokens` defaults to size_max_tokens() of the
+    transcript; a text response that still hits the limit is continued, not
+    re-extracted (continue_truncated_async). With fallback=False a primary failure
+    is re-raised instead — the model cascade escalates to a larger model
+    rather than paying for a simplified-schema retry on the small one.
+    `fallback_chars` caps the transcript the fallback sees; chunked
+    extraction passes None, since a window is already sized for one request.
+
+    `raw_response` replays a primary response recorded earlier (journal.py)
+    instead of requesting one; `on_response` receives every fresh primary
+    response before it is parsed, so it can be recorded.
+
     Returns: (validated_insights, processing_note)
     """
-    if mock:
+    current_span().set_attributes(
+        transcript_id=metadata.transcript_id, model=model, mode=mode,
+        validation=validation, mock=mock
+    )
+    if validation not in VALIDATION_MODES:
+        raise ValueError(f"validation must be one of {VALIDATION_MODES}, got: {validation!r}")
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"mode must be one of {EXTRACTION_MODES}, got: {mode!r}")
+    if max_tokens is None:
+        max_tokens = size_max_tokens(transcript)
+
+    if raw_response is not None:
+        logger.info(f"Replaying recorded primary response | Transcript: {metadata.transcript_id}")
+        on_response = None
+    elif mock:
         logger.info("MOCK MODE — using pre-loaded response (no API call)")
         raw_response = MOCK_API_RESPONSE
     else:
-        prompt = build_extraction_prompt(
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(
+                transcript, metadata.csm_name, metadata.account_name,
+                metadata.call_date, model, max_tokens,
+                stage="primary" if mode == "text" else "tool"
+            )
+
+        content = build_extraction_content(
             transcript=transcript,
             csm_name=metadata.csm_name,
             account_name=metadata.account_name,
-            call_date=metadata.call_date
+            call_date=metadata.call_date,
+            mode=mode
         )
 
-        logger.info(
-            f"Calling Anthropic API | Model: claude-sonnet-4-6 | "
-            f"Prompt version: {PROMPT_VERSION}"
+        request = dict(
+            model=model,
+            max_tokens=max_tokens,
+            system=build_system_blocks(),
+            messages=[{"role": "user", "content": content}]
         )
+        if mode == "tool":
+            request["tools"] = [build_extraction_tool()]
+            request["tool_choice"] = build_tool_choice()
 
         try:
-            message = client.messages.create(
-                model="claude-sonnet-4-6",
-                max_tokens=4096,
-                system=SYSTEM_PROMPT,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            raw_response = message.content[0].text
-            logger.info(
-                f"API call successful | "
-                f"Input tokens: {message.usage.input_tokens} | "
-                f"Output tokens: {message.usage.output_tokens}"
+            raw_response = await request_text(
+                client, request, metadata, cache, cache_key, refresh,
+                label="API call" if mode == "text" else "Tool-use API call"
             )
         except Exception as e:
             handle_api_error(e, metadata.transcript_id)
             raise
 
-    # Stage 1: Primary parse + validate
+    if on_response is not None:
+        on_response(raw_response)
+
+    # Stage 1: Primary parse + validate (malformed JSON gets a local repair attempt)
     try:
-        insights, processing_note = parse_and_validate(raw_response)
+        if validation == "partial":
+            insights, processing_note = await _validate_partial_async(
+                raw_response, metadata, client,
+                mock=mock, cache=cache, refresh=refresh, model=model
+            )
+        elif mode == "tool":
+            # Tool arguments are already structured — straight to validation
+            insights, processing_note = validate_extraction(json.loads(raw_response))
+        else:
+            insights, processing_note = parse_with_local_repair(raw_response)
         logger.info(f"Primary extraction succeeded — {len(insights)} insights extracted")
+        current_span().set_attribute("insights", len(insights))
         return insights, processing_note
 
     except json.JSONDecodeError:
         failed = handle_json_parse_failure(raw_response, attempt=1)
+        if not fallback:
+            raise
         logger.warning("Primary extraction failed — attempting fallback")
 
     except ExtractionValidationError as e:
         handle_validation_failure(e, attempt=1)
         failed = raw_response
+        if not fallback:
+            raise
         logger.warning("Primary validation failed — attempting fallback")
 
     # Stage 2: Fallback extraction
-    fallback_prompt = build_fallback_prompt(transcript, failed)
+    current_span().set_attribute("fallback_used", True)
+    return await fallback_extraction_async(
+        transcript, metadata, client, failed,
+        mock=mock, cache=cache, refresh=refresh, model=model,
+        transcript_chars=fallback_chars
+    )
+
+
+async def _validate_partial_async(
+    raw_response: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    model: str = EXTRACTION_MODEL
+) -> tuple[list, str | None]:
+    """
+    Partial-acceptance validation of the primary response.
+    Valid insights are kept; rejected ones get one correction round trip
+    containing only those objects and their field errors.
+
+    Raises ExtractionValidationError only if nothing valid survives —
+    that is the one case where the full fallback is still worth paying for.
+    """
+    parsed, repaired = load_response_json(raw_response)
+    insights, processing_note = await validate_partial_async(
+        parsed, metadata, client, mock=mock, cache=cache, refresh=refresh, model=model
+    )
+    if repaired:
+        processing_note = " ".join(filter(None, ["JSON REPAIRED LOCALLY.", processing_note]))
+    return insights, processing_note
+
+
+async def validate_partial_async(
+    parsed: dict,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    model: str = EXTRACTION_MODEL
+) -> tuple[list, str | None]:
+    """
+    validate_extraction_partial() + one correction round trip for the
+    rejected insights, on an already-parsed {"insights": [...]} object.
+    Shared by the single-call path and packed slices (packing.py).
+
+    Raises ExtractionValidationError if there is no insights array, or if
+    insights were rejected and none survived correction.
+    """
+    insights, processing_note, rejected = validate_extraction_partial(parsed)
+    notes = []
+
+    if rejected:
+        corrected = []
+        if mock:
+            logger.info("MOCK MODE — correction not available, dropping rejected insights")
+        else:
+            corrected = await correct_rejected_insights_async(
+                rejected, metadata, client, cache=cache, refresh=refresh,
+                model=model
+            )
+        insights = insights + corrected
+        notes.append(
+            f"PARTIAL VALIDATION: {len(rejected)} rejected, "
+            f"{len(corrected)} recovered by correction."
+        )
+        if not insights:
+            raise ExtractionValidationError(
+                f"All {len(rejected)} insights failed validation and correction"
+            )
+
+    if processing_note:
+        notes.append(processing_note)
+    return insights, " ".join(notes) or None
+
+
+async def correct_rejected_insights_async(
+    rejected: list[RejectedInsight],
+    metadata: CallMetadata,
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    model: str = EXTRACTION_MODEL
+) -> list:
+    """
+    Re-requests only the rejected insights with their per-field errors.
+    Never raises — anything that still fails is dropped and logged.
+
+    Returns: validated insights recovered from the correction response
+    """
+    items = [
+        {
+            "insight": r.raw,
+            "errors": [
+                f"{e.field or 'insight'}={e.value!r}: {e.message}" for e in r.errors
+            ],
+        }
+        for r in rejected
+    ]
+    payload = json.dumps(items, sort_keys=True, ensure_ascii=False)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            payload, metadata.csm_name, metadata.account_name,
+            metadata.call_date, model, CORRECTION_MAX_TOKENS,
+            stage="correction"
+        )
+
+    try:
+        raw_response = await request_text(
+            client,
+            dict(
+                model=model,
+                max_tokens=CORRECTION_MAX_TOKENS,
+                system=build_system_blocks(),
+                messages=[{"role": "user", "content": build_correction_content(items)}]
+            ),
+            metadata, cache, cache_key, refresh,
+            label="Correction call"
+        )
+        parsed, _ = load_response_json(raw_response)
+        corrected, _, still_rejected = validate_extraction_partial(parsed)
+    except Exception as e:
+        logger.error(f"Correction of {len(rejected)} rejected insights failed: {e}")
+        return []
+
+    logger.info(
+        f"Correction recovered {len(corrected)}/{len(rejected)} rejected insights"
+        + (f" — {len(still_rejected)} dropped" if still_rejected else "")
+    )
+    return corrected
+
+
+@traced("fallback")
+async def fallback_extraction_async(
+    transcript: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic | anthropic.AsyncAnthropic,
+    failed_output: str,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    model: str = EXTRACTION_MODEL,
+    transcript_chars: Optional[int] = FALLBACK_TRANSCRIPT_CHARS
+) -> tuple[list, str | None]:
+    """
+    Stage 2 of extraction — the simplified-schema retry.
+    Called by extract_insights_async() and by the streaming path when the
+    primary output could not be used. Never raises. The prompt carries at
+    most `transcript_chars` of the transcript (None: all of it).
+
+    Returns: (validated_insights, processing_note)
+    """
+    FALLBACKS.inc()
+    current_span().set_attribute("transcript_id", metadata.transcript_id)
+    fallback_content = build_fallback_content(transcript, failed_output, transcript_chars)
+    if transcript_chars is not None and len(transcript) > transcript_chars:
+        logger.warning(
+            f"Fallback prompt truncates transcript '{metadata.transcript_id}' "
+            f"from {len(transcript)} to {transcript_chars} chars — "
+            f"use --chunked for long calls"
+        )
 
     if mock:
         # In mock mode, fallback just returns empty
@@ -275,35 +781,129 @@ def extract_insights(
         return [], "Fallback extraction — mock mode returned empty"
 
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-6",
-            max_tokens=2048,
-            system=SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": fallback_prompt}]
+        fallback_key = None
+        if cache is not None:
+            fallback_key = cache.make_key(
+                transcript[:transcript_chars], metadata.csm_name, metadata.account_name,
+                metadata.call_date, model, FALLBACK_MAX_TOKENS,
+                stage="fallback"
+            )
+
+        fallback_response = await request_text(
+            client,
+            dict(
+                model=model,
+                max_tokens=FALLBACK_MAX_TOKENS,
+                system=build_system_blocks(),
+                messages=[{"role": "user", "content": fallback_content}]
+            ),
+            metadata, cache, fallback_key, refresh,
+            label="Fallback API call"
         )
-        fallback_response = message.content[0].text
-        insights, processing_note = parse_and_validate(fallback_response)
+
+        insights, processing_note = parse_with_local_repair(fallback_response)
         logger.info(
             f"Fallback extraction succeeded — {len(insights)} insights extracted"
         )
+        current_span().set_attribute("insights", len(insights))
         return insights, f"FALLBACK USED. {processing_note or ''}"
 
     except Exception as e:
         logger.error(f"Fallback extraction also failed: {e}")
+        current_span().set_status("ERROR", f"{type(e).__name__}: {e}")
         return [], f"Both extraction attempts failed: {e}"
 
 
+def extract_insights(
+    transcript: str,
+    metadata: CallMetadata,
+    client: anthropic.Anthropic,
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    validation: str = "strict",
+    model: str = EXTRACTION_MODEL,
+    max_tokens: Optional[int] = None,
+    fallback: bool = True,
+    mode: str = "text"
+) -> tuple[list, str | None]:
+    """
+    Synchronous entry point for a single transcript.
+    Runs extract_insights_async() to completion with a blocking client.
+
+    Returns: (validated_insights, processing_note)
+    """
+    return asyncio.run(extract_insights_async(
+        transcript, metadata, client, mock=mock, cache=cache,
+        refresh=refresh, validation=validation,
+        model=model, max_tokens=max_tokens, fallback=fallback, mode=mode
+    ))
+
+
 # ─────────────────────────────────────────────────────────────
 # MAIN PIPELINE
 # ─────────────────────────────────────────────────────────────
 
+def require_api_key() -> str:
+    """
+    Returns ANTHROPIC_API_KEY or exits with the demo-mode hint.
+    Shared by the single-transcript pipeline and the batch runner.
+    """
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("\n  ⚠️  ANTHROPIC_API_KEY not set. Run with --mock for demo mode.\n")
+        sys.exit(1)
+    return api_key
+
+
+def make_client(
+    async_client: bool = False,
+    scheduler: Optional[RateLimitScheduler] = None
+):
+    """
+    Builds the Anthropic client for a run.
+    The endpoint follows ANTHROPIC_BASE_URL (set by --base-url, e.g. for
+    mock_server.py); API_TIMEOUT overrides the SDK's request timeout.
+    With a scheduler, the SDK's own retries are disabled and every
+    messages.create goes through the scheduler's rate limits and retry policy.
+    """
+    import anthropic        # Deferred: the SDK is most of startup, and --mock never needs it
+
+    client_cls = anthropic.AsyncAnthropic if async_client else anthropic.Anthropic
+    options = {"api_key": require_api_key()}
+    if API_TIMEOUT is not None:
+        options["timeout"] = API_TIMEOUT
+    if scheduler is None:
+        return client_cls(**options)
+    return ScheduledClient(client_cls(**options, max_retries=0), scheduler)
+
+
+@traced("run_pipeline")
 def run_pipeline(
     transcript_path: str,
     output_format: str = "terminal",
-    mock: bool = False
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    stream: bool = False,
+    chunked: bool = False,
+    validation: str = "strict",
+    scheduler: Optional[RateLimitScheduler] = None,
+    cascade: Optional[tuple] = None,
+    prefilter: Optional[Prefilter] = None,
+    mode: str = "text"
 ) -> None:
     """
     Full end-to-end pipeline run.
+    With stream=True, each insight is routed and displayed the moment the
+    model finishes generating it (see streaming.py). Streaming is text mode,
+    strict validation, one model, one window: chunked, validation, cascade
+    and mode are not used, and main() rejects those combinations.
+    With chunked=True, long transcripts are extracted as overlapping windows
+    in parallel and merged (see chunking.py).
+    With cascade set to a tuple of ModelTier, the smallest model runs first
+    and only doubtful extractions escalate (see cascade.py).
+    With a prefilter, signal-free transcripts never reach the API (see prefilter.py).
     """
     print("\n" + "═" * 65)
     print("  JTBD FEEDBACK LOOP — INSIGHT EXTRACTION ENGINE")
@@ -313,27 +913,66 @@ def run_pipeline(
     # 1. Load transcript
     logger.info(f"Loading transcript: {transcript_path}")
     transcript, metadata = load_transcript(transcript_path)
+    current_span().set_attributes(
+        transcript_id=metadata.transcript_id, account_name=metadata.account_name
+    )
     print(f"\n  📞 Processing: {metadata.account_name}")
     print(f"  👤 CSM:        {metadata.csm_name}")
     print(f"  📅 Date:       {metadata.call_date}")
     print(f"  🆔 ID:         {metadata.transcript_id}\n")
 
+    if prefilter is not None:
+        decision = prefilter.evaluate(transcript, metadata.transcript_id)
+        if decision.skip:
+            result = handle_empty_extraction(metadata)
+            result.processing_note = decision.note
+            print(f"  ℹ️  {decision.note}\n")
+            return
+
     # 2. Initialize Anthropic client
     if not mock:
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        if not api_key:
-            print("\n  ⚠️  ANTHROPIC_API_KEY not set. Run with --mock for demo mode.\n")
-            sys.exit(1)
-        client = anthropic.Anthropic(api_key=api_key)
+        client = make_client(scheduler=scheduler)
     else:
         client = None
         print("  ⚡ Running in MOCK MODE — no API key required\n")
 
     # 3. Extract insights
-    print("  🔍 Extracting insights from transcript...")
-    insights, processing_note = extract_insights(
-        transcript, metadata, client, mock=mock
-    )
+    alerts = None
+    model_tier = None
+    if stream:
+        # Imported here — streaming.py imports this module for shared settings
+        from streaming import stream_extract_and_route
+        print("  🔍 Streaming extraction — alerts appear as each insight completes...")
+        live_alert = None if output_format == "json" else (
+            lambda alert: print(format_alert_terminal(alert))
+        )
+        alerts, insights, processing_note = stream_extract_and_route(
+            transcript, metadata, client, mock=mock, cache=cache,
+            refresh=refresh, on_alert=live_alert
+        )
+    elif cascade:
+        # Imported here — cascade.py imports this module for extraction
+        from cascade import extract_insights_cascade
+        print("  🔍 Extracting insights from transcript (model cascade)...")
+        insights, processing_note, model_tier = extract_insights_cascade(
+            transcript, metadata, client, tiers=cascade, chunked=chunked,
+            mock=mock, cache=cache, refresh=refresh, validation=validation,
+            mode=mode
+        )
+    elif chunked:
+        # Imported here — chunking.py imports this module for extraction
+        from chunking import extract_insights_chunked
+        print("  🔍 Extracting insights from transcript (chunked)...")
+        insights, processing_note = extract_insights_chunked(
+            transcript, metadata, client, mock=mock, cache=cache,
+            refresh=refresh, validation=validation, mode=mode
+        )
+    else:
+        print("  🔍 Extracting insights from transcript...")
+        insights, processing_note = extract_insights(
+            transcript, metadata, client, mock=mock, cache=cache,
+            refresh=refresh, validation=validation, mode=mode
+        )
 
     # 4. Handle empty extraction
     if not insights:
@@ -342,37 +981,43 @@ def run_pipeline(
         return
 
     # 5. Build extraction result
-    result = build_extraction_result(metadata, insights, processing_note)
+    result = build_extraction_result(metadata, insights, processing_note, model_tier)
     print(f"\n  ✅ Extracted {result.total_insights} insights")
+    if result.model_tier:
+        print(f"     Model tier:      {result.model_tier}")
     print(f"     Auto-routing:    {result.high_confidence} (confidence ≥ {CONFIDENCE_THRESHOLD:.0%})")
     print(f"     Human review:    {result.routed_to_review} (confidence < {CONFIDENCE_THRESHOLD:.0%})")
     if processing_note:
         print(f"\n  📝 Note: {processing_note}")
 
-    # 6. Route insights
-    print("\n  🚦 Routing insights to stakeholders...")
-    alerts = route_all(result)
+    # 6. Route insights (already routed one by one when streaming)
+    if alerts is None:
+        print("\n  🚦 Routing insights to stakeholders...")
+        alerts = route_all(result)
 
     # 7. Output
-    if output_format == "json":
-        print("\n" + format_alerts_as_json(alerts))
-    else:
-        # Terminal display
-        print_routing_summary(alerts)
-
-        print("  FULL ALERT DETAILS\n")
-        for alert in alerts:
-            print(format_alert_terminal(alert))
-
-        # CSM confirmations
-        print("\n" + "─" * 65)
-        print("  CSM CLOSED-LOOP CONFIRMATIONS")
-        print("─" * 65)
-        seen_alerts: set[str] = set()
-        for alert in alerts:
-            if alert.alert_id not in seen_alerts:
-                print(format_csm_confirmation(alert))
-                seen_alerts.add(alert.alert_id)
+    with span("deliver", output_format=output_format, alerts=len(alerts),
+              alert_ids=sorted({alert.alert_id for alert in alerts})):
+        if output_format == "json":
+            print("\n" + format_alerts_as_json(alerts))
+        else:
+            # Terminal display
+            print_routing_summary(alerts)
+
+            if not stream:
+                print("  FULL ALERT DETAILS\n")
+                for alert in alerts:
+                    print(format_alert_terminal(alert))
+
+            # CSM confirmations
+            print("\n" + "─" * 65)
+            print("  CSM CLOSED-LOOP CONFIRMATIONS")
+            print("─" * 65)
+            seen_alerts: set[str] = set()
+            for alert in alerts:
+                if alert.alert_id not in seen_alerts:
+                    print(format_csm_confirmation(alert))
+                    seen_alerts.add(alert.alert_id)
 
     print("\n  Pipeline complete.\n")
 
@@ -401,12 +1046,433 @@ def main():
         action="store_true",
         help="Run in mock mode without API key (uses pre-loaded response)"
     )
+    parser.add_argument(
+        "--transcript-dir",
+        help="Batch mode: process every *.txt transcript in this directory"
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Batch mode: file listing one transcript path per line"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Batch mode: max transcripts processed concurrently (default: 8)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the on-disk extraction cache (always call the API)"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses but overwrite them with fresh ones"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Extraction cache directory (default: {DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Extraction cache size bound before LRU eviction (default: 512)"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the extraction and route each insight as soon as it is generated "
+             "(single transcript, text mode, strict validation; no --cascade or --chunked)"
+    )
+
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Split long transcripts into overlapping windows extracted in parallel"
+    )
+
+    parser.add_argument(
+        "--validation",
+        choices=VALIDATION_MODES,
+        default="strict",
+        help="strict: any invalid insight triggers the fallback | "
+             "partial: keep valid insights, re-request only rejected ones (default: strict)"
+    )
+
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        help="Rate limit: max requests per minute (default: unlimited)"
+    )
+    parser.add_argument(
+        "--input-tpm",
+        type=float,
+        help="Rate limit: max input tokens per minute (default: unlimited)"
+    )
+    parser.add_argument(
+        "--output-tpm",
+        type=float,
+        help="Rate limit: max output tokens per minute (default: unlimited)"
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Retries for 429/529/5xx/timeouts with backoff (default: {DEFAULT_MAX_RETRIES})"
+    )
+
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Run a smaller model first; escalate low-confidence / invalid extractions"
+    )
+    parser.add_argument(
+        "--fast-model",
+        default=None,
+        help="Cascade: first-tier model (default: claude-haiku-4-5)"
+    )
+
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Skip the API call for transcripts with no local extraction signal; "
+             "batch mode also extracts the most urgent-looking calls first"
+    )
+    parser.add_argument(
+        "--prefilter-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Prefilter signal score below which a call is skipped "
+             f"(default: {DEFAULT_THRESHOLD}; calibrate with prefilter.py)"
+    )
+
+    parser.add_argument(
+        "--extraction-mode",
+        choices=EXTRACTION_MODES,
+        default="text",
+        help="text: JSON in the response text | "
+             "tool: forced tool call with a schema-derived input schema (default: text)"
+    )
+
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Batch mode: bundle short transcripts into shared extraction requests "
+             "(text mode, primary model; no --cascade or --extraction-mode tool)"
+    )
+
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Batch mode: submit through the Message Batches API (async, discounted), "
+             "poll, then route — resumable via --checkpoint"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=".jtbd_batch_checkpoint.json",
+        help="Batch API: checkpoint file used to resume a submitted batch"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60.0,
+        help="Batch API: seconds between status checks (default: 60)"
+    )
+    parser.add_argument(
+        "--local-batch-dir",
+        help="Batch API: use the offline stand-in endpoint rooted at this directory "
+             "(implied by --mock)"
+    )
+    parser.add_argument(
+        "--local-batch-delay",
+        type=float,
+        default=0.0,
+        help="Batch API stand-in: seconds before a submitted batch ends (default: 0)"
+    )
+
+    parser.add_argument(
+        "--journal",
+        help="Batch mode: write-ahead journal file; rerunning with the same journal "
+             "skips delivered transcripts and resumes the rest from their last stage"
+    )
+    parser.add_argument(
+        "--journal-fsync",
+        choices=FSYNC_POLICIES,
+        default="batch",
+        help="always: fsync every record | batch: fsync each write batch | "
+             "never: leave durability to the OS (default: batch)"
+    )
+    parser.add_argument(
+        "--journal-batch",
+        type=int,
+        default=DEFAULT_JOURNAL_BATCH,
+        help=f"Journal records buffered per write (default: {DEFAULT_JOURNAL_BATCH})"
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Worker mode: keep one client alive and process transcripts as they "
+             "arrive in --inbox, moving each to done/ or failed/"
+    )
+    parser.add_argument(
+        "--inbox",
+        default="inbox",
+        help="Worker mode: directory watched for *.txt transcripts (default: inbox/)"
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="Worker mode: seconds between inbox scans (default: 1.0)"
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Worker mode: process everything in the inbox, then exit"
+    )
+
+    parser.add_argument(
+        "--base-url",
+        help="Send API calls to this endpoint instead of api.anthropic.com "
+             "(e.g. http://127.0.0.1:8765 for mock_server.py)"
+    )
+    parser.add_argument(
+        "--api-timeout",
+        type=float,
+        help="Per-request API timeout in seconds (default: SDK default)"
+    )
+
+    parser.add_argument(
+        "--metrics-file",
+        help="Write Prometheus-format stage / token metrics to this file on exit"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics during the run"
+    )
+
+    parser.add_argument(
+        "--trace-file",
+        help="Append per-transcript trace spans (one JSON object per line) to this file"
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=TRACE_FORMATS,
+        default="jsonl",
+        help="jsonl: flat span records | otlp: OTLP/JSON export requests (default: jsonl)"
+    )
+
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default="INFO",
+        help="Root log level (default: INFO)"
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help="text: 'time | level | name | message' lines | "
+             "json: one structured object per line (default: text)"
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="Format and write log records on a background thread, off the pipeline's path"
+    )
+    parser.add_argument(
+        "--log-sample",
+        action="append",
+        default=[],
+        metavar="EVENT=RATE",
+        help="Keep only this share of an event's INFO records, e.g. route=0.01 "
+             "(events: route, critical_sla, human_review_override; repeatable)"
+    )
 
     args = parser.parse_args()
+
+    try:
+        sample = parse_sample_rates(args.log_sample)
+        configure_logging(args.log_level, args.log_format, args.log_queue, sample)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.stream:
+        # Streaming routes each insight as it parses; none of these fit that path
+        conflicts = [flag for flag, on in (
+            ("--validation partial", args.validation != "strict"),
+            ("--extraction-mode tool", args.extraction_mode != "text"),
+            ("--cascade/--fast-model", bool(args.cascade or args.fast_model)),
+            ("--chunked", args.chunked),
+            ("--transcript-dir/--manifest/--serve/--batch-api",
+             bool(args.transcript_dir or args.manifest or args.serve or args.batch_api)),
+        ) if on]
+        if conflicts:
+            parser.error(f"--stream does not combine with {', '.join(conflicts)}")
+
+    if args.batch_api:
+        # Batch requests are built up front: text mode, primary model, whole
+        # transcripts, strict parse on collect — none of these can apply
+        conflicts = [flag for flag, on in (
+            ("--validation partial", args.validation != "strict"),
+            ("--extraction-mode tool", args.extraction_mode != "text"),
+            ("--cascade/--fast-model", bool(args.cascade or args.fast_model)),
+            ("--chunked", args.chunked),
+            ("--prefilter", args.prefilter),
+            ("--pack", args.pack),
+            ("--serve", args.serve),
+        ) if on]
+        if conflicts:
+            parser.error(f"--batch-api does not combine with {', '.join(conflicts)}")
+
+    if args.serve:
+        # The worker routes each inbox file on its own and prints no result document
+        conflicts = [flag for flag, on in (
+            ("--pack", args.pack),
+            ("--output json", args.output != "terminal"),
+        ) if on]
+        if conflicts:
+            parser.error(f"--serve does not combine with {', '.join(conflicts)}")
+
+    global API_TIMEOUT
+    API_TIMEOUT = args.api_timeout
+    if args.base_url:
+        # The SDK reads ANTHROPIC_BASE_URL itself; a local stand-in needs no real key
+        os.environ["ANTHROPIC_BASE_URL"] = args.base_url
+        os.environ.setdefault("ANTHROPIC_API_KEY", "local-mock-server")
+
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port)
+    if args.metrics_file:
+        # Registered, not called at the end — failed batches leave via sys.exit()
+        atexit.register(write_textfile, args.metrics_file)
+    if args.trace_file:
+        configure_tracing(args.trace_file, args.trace_format)
+
+    prefilter = Prefilter(args.prefilter_threshold) if args.prefilter else None
+
+    cascade = None
+    if args.cascade or args.fast_model:
+        # Imported here — cascade.py imports this module for extraction
+        from cascade import build_cascade_tiers, DEFAULT_FAST_MODEL
+        cascade = build_cascade_tiers(args.fast_model or DEFAULT_FAST_MODEL)
+
+    scheduler = None
+    if not args.mock:
+        scheduler = RateLimitScheduler(
+            requests_per_minute=args.rpm,
+            input_tokens_per_minute=args.input_tpm,
+            output_tokens_per_minute=args.output_tpm,
+            max_concurrency=args.concurrency,
+            max_retries=args.max_retries
+        )
+
+    cache = None
+    if not args.no_cache and not args.mock:
+        cache = ExtractionCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+    if args.pack and (args.cascade or args.fast_model or args.extraction_mode != "text"):
+        parser.error("--pack runs text mode on the primary model; "
+                     "it does not combine with --cascade/--fast-model or --extraction-mode tool")
+
+    journal = None
+    if args.journal:
+        if not (args.transcript_dir or args.manifest) or args.serve or args.batch_api or args.pack:
+            parser.error("--journal needs --transcript-dir or --manifest, "
+                         "and does not combine with --serve, --batch-api or --pack")
+        journal = Journal(args.journal, fsync=args.journal_fsync, batch_size=args.journal_batch)
+
+    if args.serve:
+        # Imported here — worker.py imports this module through batch.py
+        from worker import run_worker
+        stats = run_worker(
+            args.inbox,
+            concurrency=args.concurrency,
+            mock=args.mock,
+            cache=cache,
+            refresh=args.refresh,
+            chunked=args.chunked,
+            validation=args.validation,
+            scheduler=scheduler,
+            cascade=cascade,
+            prefilter=prefilter,
+            mode=args.extraction_mode,
+            watch_interval=args.watch_interval,
+            once=args.once
+        )
+        if args.once and stats.failed:
+            sys.exit(1)
+        return
+
+    if args.batch_api:
+        # Imported here — batch_api.py imports this module for the pipeline stages
+        from batch import discover_transcripts, print_batch_summary, batch_result_to_dict
+        from batch_api import run_batch_api, LocalBatchClient, DEFAULT_LOCAL_BATCH_DIR
+        if args.mock or args.local_batch_dir:
+            batch_client = LocalBatchClient(
+                args.local_batch_dir or DEFAULT_LOCAL_BATCH_DIR,
+                complete_after=args.local_batch_delay
+            )
+        else:
+            batch_client = make_client()
+        started = time.perf_counter()
+        results = run_batch_api(
+            discover_transcripts(args.transcript_dir, args.manifest),
+            batch_client,
+            checkpoint_path=args.checkpoint,
+            poll_interval=args.poll_interval,
+            cache=cache
+        )
+        if args.output == "json":
+            print(json.dumps({"results": [batch_result_to_dict(r) for r in results]}, indent=2))
+        else:
+            print_batch_summary(results, time.perf_counter() - started)
+        if any(r.status == "failed" for r in results):
+            sys.exit(1)
+        return
+
+    if args.transcript_dir or args.manifest:
+        # Imported here — batch.py imports this module for the pipeline stages
+        from batch import discover_transcripts, run_batch
+        results = run_batch(
+            discover_transcripts(args.transcript_dir, args.manifest),
+            output_format=args.output,
+            mock=args.mock,
+            concurrency=args.concurrency,
+            cache=cache,
+            refresh=args.refresh,
+            chunked=args.chunked,
+            validation=args.validation,
+            scheduler=scheduler,
+            cascade=cascade,
+            prefilter=prefilter,
+            mode=args.extraction_mode,
+            pack=args.pack,
+            journal=journal
+        )
+        if any(r.status == "failed" for r in results):
+            sys.exit(1)
+        return
+
     run_pipeline(
         transcript_path=args.transcript,
         output_format=args.output,
-        mock=args.mock
+        mock=args.mock,
+        cache=cache,
+        refresh=args.refresh,
+        stream=args.stream,
+        chunked=args.chunked,
+        validation=args.validation,
+        scheduler=scheduler,
+        cascade=cascade,
+        prefilter=prefilter,
+        mode=args.extraction_mode
     )
 
 
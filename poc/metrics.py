@@ -0,0 +1,340 @@
+"""
+metrics.py — Stage Timing + Token Metrics (Prometheus Text Format)
+===================================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Free-text log lines can say what happened to one transcript; they can't
+say where p99 goes across ten thousand. This module keeps process-wide
+counters and histograms and renders them in the Prometheus text
+exposition format:
+
+    jtbd_stage_duration_seconds{stage}      — load, prompt_build, api, parse,
+                                              validate, route, format
+    jtbd_api_requests_total{model}
+    jtbd_tokens_total{model,kind}           — input, output, cache_read, cache_write
+    jtbd_fallbacks_total
+    jtbd_parse_failures_total
+    jtbd_validation_failures_total
+    jtbd_human_review_routes_total
+    jtbd_alerts_routed_total{destination}
+    jtbd_worker_transcripts_total{status}   — worker.py: routed, empty, failed
+
+Export either as a textfile (node_exporter textfile collector, or just
+`cat`) or from a local /metrics endpoint while a run is in progress:
+
+    python main.py --transcript-dir transcripts/ --metrics-file jtbd.prom
+    python main.py --transcript-dir transcripts/ --metrics-port 9108
+
+Design Decision: Standard library only, no prometheus_client.
+Reason: The exposition format is a few lines of text. A dependency for it
+        would be the only one besides anthropic.
+
+Design Decision: Always on.
+Reason: One perf_counter pair and a lock per stage call costs one to two
+        microseconds — small against any stage it measures — so there is
+        no "metrics off" code path to keep in sync.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+from functools import wraps
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger("jtbd.metrics")
+
+# Seconds — from sub-millisecond local stages to multi-second API calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_METRICS_PORT = 9108
+
+
+# ─────────────────────────────────────────────────────────────
+# METRIC TYPES
+# ─────────────────────────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, optionally labelled."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0.0)]
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally labelled."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels → [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)    # First bound >= value
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """Observes the wall time of the with-block, even if it raises."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels.get(n, "") for n in self.labelnames))
+        return int(sum(series[:-1])) if series else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _label_text(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {_number(cumulative)}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_number(cumulative)}")
+        return lines
+
+
+class _Timer:
+    """Context manager behind Histogram.time() — a class, not a generator,
+    because @contextmanager alone costs more than the stages it would time."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsRegistry:
+    """Ordered set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+# ─────────────────────────────────────────────────────────────
+# PIPELINE METRICS
+# ─────────────────────────────────────────────────────────────
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "jtbd_stage_duration_seconds", "Wall time per pipeline stage call.", ("stage",)
+)
+API_REQUESTS = REGISTRY.counter(
+    "jtbd_api_requests_total", "Messages API responses received.", ("model",)
+)
+TOKENS = REGISTRY.counter(
+    "jtbd_tokens_total", "Tokens billed, by model and kind (input, output, cache_read, cache_write).",
+    ("model", "kind")
+)
+FALLBACKS = REGISTRY.counter(
+    "jtbd_fallbacks_total", "Simplified-schema fallback extractions attempted."
+)
+PARSE_FAILURES = REGISTRY.counter(
+    "jtbd_parse_failures_total", "Responses that were not parseable JSON after local repair."
+)
+VALIDATION_FAILURES = REGISTRY.counter(
+    "jtbd_validation_failures_total", "Responses that parsed but failed schema validation."
+)
+HUMAN_REVIEW_ROUTES = REGISTRY.counter(
+    "jtbd_human_review_routes_total", "Alerts routed to the Human Review Queue."
+)
+ALERTS_ROUTED = REGISTRY.counter(
+    "jtbd_alerts_routed_total", "Alerts routed, by destination.", ("destination",)
+)
+WORKER_FILES = REGISTRY.counter(
+    "jtbd_worker_transcripts_total", "Inbox transcripts finished by the worker, by status.", ("status",)
+)
+
+
+def time_stage(stage: str):
+    """Context manager: `with time_stage("api"): ...`"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator form of time_stage() for synchronous functions."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return wrapper
+    return decorator
+
+
+def record_tokens(model: str, usage) -> None:
+    """Counts one response's usage block (anthropic Usage or compatible)."""
+    API_REQUESTS.inc(model=model)
+    for kind, attr in (
+        ("input", "input_tokens"),
+        ("output", "output_tokens"),
+        ("cache_read", "cache_read_input_tokens"),
+        ("cache_write", "cache_creation_input_tokens"),
+    ):
+        amount = getattr(usage, attr, 0) or 0
+        if amount:
+            TOKENS.inc(amount, model=model, kind=kind)
+
+
+# ─────────────────────────────────────────────────────────────
+# EXPORT
+# ─────────────────────────────────────────────────────────────
+
+def write_textfile(path: str, registry: MetricsRegistry = REGISTRY) -> None:
+    """Atomic write — a scraper never reads a half-written file."""
+    target = Path(path)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(registry.render(), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def _handler_class(registry: MetricsRegistry) -> type:
+    # http.server (with http.client, email and socket) is imported only when
+    # an endpoint is actually started — most runs never serve /metrics
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        def do_GET(self):
+            if self.path.split("?")[0].rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("content-type", CONTENT_TYPE)
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return MetricsHandler
+
+
+def serve_metrics(
+    port: int = DEFAULT_METRICS_PORT,
+    host: str = "127.0.0.1",
+    registry: MetricsRegistry = REGISTRY
+) -> tuple["ThreadingHTTPServer", str]:
+    """
+    Serves GET /metrics on a background thread (port 0 = any free port).
+    Returns: (server, url) — call server.shutdown() when done.
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _handler_class(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    url = f"http://{bound_host}:{bound_port}/metrics"
+    logger.info(f"Metrics endpoint listening on {url}")
+    return server, url
@@ -0,0 +1,513 @@
+"""
+mock_server.py — Local Mock Anthropic Messages Endpoint
+========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+`--mock` short-circuits the client entirely: zero latency, one canned answer,
+no retries, no fallback. This server sits on the other side of the real
+anthropic client instead, so the whole pipeline runs unmodified:
+
+    python mock_server.py --latency-ms 800 --rate-429 0.05 --rate-truncated 0.1
+    python main.py --transcript-dir transcripts/ --base-url http://127.0.0.1:8765
+
+Serves POST /v1/messages (JSON and SSE streaming) with:
+    - Latency       — fixed | uniform | normal | lognormal, plus per-token time
+    - Rate limits   — injected 429 / 529, or a real RPM bucket with Retry-After
+    - Timeouts      — request held open past the client's timeout
+    - Bad output    — malformed JSON of the kinds local repair handles,
+                      truncated output (stop_reason=max_tokens)
+    - Templates     — response files with {{account_name}} / {{csm_name}} /
+                      {{call_date}} placeholders, picked per request
+    - Protocol      — assistant-prefill continuation, tool_use responses for
+                      tool mode, keyed responses for packed requests
+
+GET /stats returns request / injection counters as JSON.
+
+Design Decision: Standard library only (http.server).
+Reason: A load-test harness that needs its own dependencies is one more
+        thing that breaks on a laptop with no network.
+
+Design Decision: Seeded randomness.
+Reason: Two load-test runs with the same flags see the same sequence of
+        injected failures, so a regression is a regression — not noise.
+"""
+
+import re
+import json
+import math
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from logging_config import configure_logging
+
+logger = logging.getLogger("jtbd.mock_server")
+
+DEFAULT_PORT = 8765
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+STREAM_CHUNK_CHARS = 48
+CHARS_PER_TOKEN = 4
+CACHE_MIN_TOKENS = 1024         # Shorter prefixes are not cached, as on Sonnet
+
+
+# ─────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class MockServerConfig:
+    """
+    Every knob of the mock endpoint. Rates are per-request probabilities,
+    checked in order: timeout, 529, 429, malformed, truncated.
+    """
+    host:               str = "127.0.0.1"
+    port:               int = DEFAULT_PORT
+    latency_dist:       str = "fixed"
+    latency_ms:         float = 0.0
+    latency_jitter_ms:  float = 0.0     # uniform: ± half-width | normal/lognormal: stdev
+    ms_per_token:       float = 0.0     # Added per output token (generation time)
+    rate_429:           float = 0.0
+    rate_529:           float = 0.0
+    rate_timeout:       float = 0.0
+    timeout_seconds:    float = 30.0    # How long a "timed out" request is held open
+    rate_malformed:     float = 0.0
+    rate_truncated:     float = 0.0
+    retry_after:        float = 1.0     # Seconds, sent with injected 429 / 529
+    rpm:                Optional[float] = None  # Real per-minute request limit
+    templates:          list[str] = field(default_factory=list)
+    seed:               Optional[int] = None
+
+
+def load_templates(paths: list[str]) -> list[str]:
+    """Reads response templates from files and/or directories of *.json files."""
+    templates = []
+    for path in paths:
+        p = Path(path)
+        files = sorted(p.glob("*.json")) if p.is_dir() else [p]
+        templates.extend(f.read_text(encoding="utf-8") for f in files)
+    return templates
+
+
+def _default_template() -> str:
+    # Imported here — only needed without --template, and importing the
+    # pipeline would slow every other start of the server
+    from main import MOCK_API_RESPONSE
+    return MOCK_API_RESPONSE
+
+
+# ─────────────────────────────────────────────────────────────
+# SERVER STATE
+# ─────────────────────────────────────────────────────────────
+
+class MockState:
+    """Shared, lock-protected state: RNG, counters, RPM window, seen cache prefixes."""
+
+    def __init__(self, config: MockServerConfig):
+        self.config = config
+        self.templates = config.templates or [_default_template()]
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.counters: dict[str, int] = {}
+        self.request_times: list[float] = []
+        self.cached_prefixes: set[int] = set()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+    def latency_seconds(self) -> float:
+        c = self.config
+        with self.lock:
+            if c.latency_dist == "uniform":
+                ms = self.rng.uniform(c.latency_ms - c.latency_jitter_ms, c.latency_ms + c.latency_jitter_ms)
+            elif c.latency_dist == "normal":
+                ms = self.rng.gauss(c.latency_ms, c.latency_jitter_ms)
+            elif c.latency_dist == "lognormal" and c.latency_ms > 0:
+                # Parameterized by the arithmetic mean and stdev of the result
+                variance = c.latency_jitter_ms ** 2
+                sigma2 = math.log(1 + variance / c.latency_ms ** 2)
+                mu = math.log(c.latency_ms) - sigma2 / 2
+                ms = self.rng.lognormvariate(mu, math.sqrt(sigma2))
+            else:
+                ms = c.latency_ms
+        return max(0.0, ms) / 1000.0
+
+    def pick_template(self) -> str:
+        with self.lock:
+            return self.rng.choice(self.templates)
+
+    def choice(self, options: tuple[str, ...]) -> str:
+        with self.lock:
+            return self.rng.choice(options)
+
+    def rpm_wait(self) -> Optional[float]:
+        """Seconds until the RPM window has room, or None if under the limit."""
+        if not self.config.rpm:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            self.request_times = [t for t in self.request_times if now - t < 60.0]
+            if len(self.request_times) >= self.config.rpm:
+                return 60.0 - (now - self.request_times[0])
+            self.request_times.append(now)
+        return None
+
+    def cache_usage(self, request: dict, input_tokens: int) -> dict:
+        """
+        Simulated prompt caching: tools, then blocks up to the last
+        cache_control breakpoint — nothing if that is under CACHE_MIN_TOKENS.
+        """
+        prefix_chars = len(json.dumps(request["tools"])) if request.get("tools") else 0
+        breakpoint = 0
+        blocks = list(request.get("system") or []) if isinstance(request.get("system"), list) else []
+        for message in request.get("messages", [])[:1]:
+            if isinstance(message.get("content"), list):
+                blocks += message["content"]
+        for block in blocks:
+            prefix_chars += len(block.get("text", ""))
+            if block.get("cache_control"):
+                breakpoint = prefix_chars
+        cached_tokens = breakpoint // CHARS_PER_TOKEN
+        if cached_tokens < CACHE_MIN_TOKENS:
+            return {"input_tokens": input_tokens,
+                    "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        key = hash(json.dumps(blocks, sort_keys=True)[:breakpoint + 200])
+        with self.lock:
+            hit = key in self.cached_prefixes
+            self.cached_prefixes.add(key)
+        return {
+            "input_tokens": max(0, input_tokens - cached_tokens),
+            "cache_read_input_tokens": cached_tokens if hit else 0,
+            "cache_creation_input_tokens": 0 if hit else cached_tokens,
+        }
+
+
+# ─────────────────────────────────────────────────────────────
+# RESPONSE CONSTRUCTION
+# ─────────────────────────────────────────────────────────────
+
+# The damage local repair (error_handler.repair_json) exists for — each one
+# should be fixed without a fallback call, so --rate-malformed exercises repair
+MALFORMED_KINDS = ("prose", "trailing_comma", "python_literals", "unclosed")
+
+
+def malform(text: str, kind: str) -> str:
+    """Breaks a JSON answer the way `kind` describes."""
+    if kind == "prose":
+        return f"Here are the insights:\n```json\n{text}\n```\nLet me know if you need anything else."
+    if kind == "trailing_comma":
+        end = text.rfind("]")
+        head = text[:end].rstrip()
+        return head + ",\n" + text[end:] if head.endswith("}") else text + ","
+    if kind == "python_literals":
+        return text.replace(": null", ": None").replace(": true", ": True").replace(": false", ": False")
+    # unclosed — the closing brackets never arrive
+    return text.rstrip().rstrip("]}\n ")
+
+def _text_of(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+
+
+def render_template(template: str, request_text: str) -> str:
+    """Fills {{account_name}} / {{csm_name}} / {{call_date}} from the CALL CONTEXT."""
+    values = {}
+    for name, label in (("account_name", "Account"), ("csm_name", "CSM"), ("call_date", "Call Date")):
+        match = re.search(rf"^\s*{label}: (.+)$", request_text, re.MULTILINE)
+        values[name] = match.group(1).strip() if match else ""
+    for name, value in values.items():
+        template = template.replace("{{" + name + "}}", value)
+    return template
+
+
+def build_response_text(state: MockState, request: dict) -> str:
+    """The complete response the 'model' would write for this request."""
+    user_text = _text_of(request["messages"][0]["content"])
+    template = render_template(state.pick_template(), user_text)
+
+    # Packed request — answer every TRANSCRIPT ID with its own copy
+    packed_ids = re.findall(r"=== CALL \d+ \| TRANSCRIPT ID: (\S+) ===", user_text)
+    if packed_ids:
+        single = json.loads(template)
+        return json.dumps({"transcripts": {tid: single for tid in packed_ids}}, indent=2)
+    return template
+
+
+def build_message(request: dict, content: list[dict], stop_reason: str, usage: dict) -> dict:
+    return {
+        "id": f"msg_mock_{uuid.uuid4().hex[:20]}",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "mock"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": usage,
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# HTTP HANDLER
+# ─────────────────────────────────────────────────────────────
+
+class MockAnthropicHandler(BaseHTTPRequestHandler):
+    """POST /v1/messages and GET /stats. `state` is set by make_server()."""
+
+    state: MockState
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    # ─────────────────────────────────────────────────────────
+    # PLUMBING
+    # ─────────────────────────────────────────────────────────
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.send_header("request-id", f"req_mock_{uuid.uuid4().hex[:16]}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, error_type: str, message: str, retry_after: Optional[float] = None) -> None:
+        headers = {}
+        if retry_after is not None:
+            headers["retry-after"] = f"{retry_after:.3f}"
+            headers["retry-after-ms"] = str(int(retry_after * 1000))
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+    def _sse(self, event: str, data: dict) -> None:
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    # ─────────────────────────────────────────────────────────
+    # ROUTES
+    # ─────────────────────────────────────────────────────────
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.state.lock:
+                counters = dict(self.state.counters)
+            self._send_json(200, counters)
+        else:
+            self._send_error(404, "not_found_error", f"No route for GET {self.path}")
+
+    def do_POST(self):
+        if self.path.split("?")[0].rstrip("/") != "/v1/messages":
+            self._send_error(404, "not_found_error", f"No route for POST {self.path}")
+            return
+
+        length = int(self.headers.get("content-length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            self._send_error(400, "invalid_request_error", "Body is not valid JSON")
+            return
+
+        state, config = self.state, self.state.config
+        state.count("requests")
+
+        # 1. Injected failures
+        wait = state.rpm_wait()
+        if wait is not None:
+            state.count("429_rpm")
+            self._send_error(429, "rate_limit_error", "Mock RPM limit exceeded", retry_after=wait)
+            return
+        if state.roll(config.rate_timeout):
+            state.count("timeout")
+            time.sleep(config.timeout_seconds)
+            self.close_connection = True
+            return
+        if state.roll(config.rate_529):
+            state.count("529")
+            self._send_error(529, "overloaded_error", "Mock overload", retry_after=config.retry_after)
+            return
+        if state.roll(config.rate_429):
+            state.count("429")
+            self._send_error(429, "rate_limit_error", "Mock rate limit", retry_after=config.retry_after)
+            return
+
+        # 2. The full answer, then what this particular request gets of it
+        full_text = build_response_text(state, request)
+        messages = request.get("messages", [])
+        prefill = ""
+        if messages and messages[-1].get("role") == "assistant":
+            prefill = _text_of(messages[-1]["content"])
+            state.count("continuations")
+
+        text = full_text[len(prefill):] if full_text.startswith(prefill) else full_text
+        stop_reason = "end_turn"
+        if not prefill and state.roll(config.rate_malformed):
+            kind = state.choice(MALFORMED_KINDS)
+            state.count("malformed")
+            state.count(f"malformed_{kind}")
+            text = malform(text, kind)
+        elif not prefill and state.roll(config.rate_truncated):
+            state.count("truncated")
+            text = text[:max(1, len(text) // 2)]
+            stop_reason = "max_tokens"
+
+        input_chars = len(json.dumps(request.get("system", ""))) + len(json.dumps(request.get("tools", []))) + sum(
+            len(_text_of(m.get("content", ""))) for m in messages
+        )
+        usage = state.cache_usage(request, input_chars // CHARS_PER_TOKEN)
+        usage["output_tokens"] = max(1, len(text) // CHARS_PER_TOKEN)
+
+        # 3. Tool mode: answer through the forced tool
+        content = [{"type": "text", "text": text}]
+        tool_choice = request.get("tool_choice") or {}
+        if tool_choice.get("type") == "tool" and stop_reason == "end_turn":
+            try:
+                content = [{
+                    "type": "tool_use",
+                    "id": f"toolu_mock_{uuid.uuid4().hex[:16]}",
+                    "name": tool_choice["name"],
+                    "input": json.loads(full_text),
+                }]
+                stop_reason = "tool_use"
+                state.count("tool_use")
+            except json.JSONDecodeError:
+                pass
+
+        # 4. Latency: first byte, then generation time
+        time.sleep(state.latency_seconds())
+        generation = usage["output_tokens"] * config.ms_per_token / 1000.0
+
+        if request.get("stream"):
+            state.count("streamed")
+            self._stream(request, text, stop_reason, usage, generation)
+        else:
+            time.sleep(generation)
+            self._send_json(200, build_message(request, content, stop_reason, usage))
+
+    def _stream(self, request: dict, text: str, stop_reason: str, usage: dict, generation: float) -> None:
+        """Server-sent events in the Messages streaming format."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.send_header("cache-control", "no-cache")
+        self.end_headers()
+
+        start_usage = {**usage, "output_tokens": 0}
+        self._sse("message_start", {
+            "type": "message_start",
+            "message": build_message(request, [], None, start_usage),
+        })
+        self._sse("content_block_start", {
+            "type": "content_block_start", "index": 0,
+            "content_block": {"type": "text", "text": ""},
+        })
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+        per_chunk = generation / len(chunks) if chunks else 0.0
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            self._sse("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": chunk},
+            })
+        self._sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._sse("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": usage["output_tokens"]},
+        })
+        self._sse("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+# ─────────────────────────────────────────────────────────────
+# ENTRY POINTS
+# ─────────────────────────────────────────────────────────────
+
+def make_server(config: MockServerConfig) -> ThreadingHTTPServer:
+    """Builds (but does not start) a server bound to config.host:config.port."""
+    if config.latency_dist not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+    handler = type("BoundMockHandler", (MockAnthropicHandler,), {"state": MockState(config)})
+    server = ThreadingHTTPServer((config.host, config.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(config: MockServerConfig) -> tuple[ThreadingHTTPServer, str]:
+    """
+    Starts the server on a background thread (port 0 = any free port).
+    Returns: (server, base_url) — call server.shutdown() when done.
+    """
+    server = make_server(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Anthropic Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean time to first byte")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0,
+                        help="uniform: ± half-width | normal / lognormal: standard deviation")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Generation time per output token")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of an injected 429")
+    parser.add_argument("--rate-529", type=float, default=0.0, help="Probability of an injected 529")
+    parser.add_argument("--rate-timeout", type=float, default=0.0,
+                        help="Probability a request is held open for --timeout-seconds")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0,
+                        help="Probability of repairable broken JSON: prose/fences, trailing comma, "
+             "Python literals or missing closing brackets")
+    parser.add_argument("--rate-truncated", type=float, default=0.0,
+                        help="Probability of a half response with stop_reason=max_tokens")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429 / 529")
+    parser.add_argument("--rpm", type=float, help="Enforce a real requests-per-minute limit")
+    parser.add_argument("--template", action="append", default=[],
+                        help="Response template file or directory of *.json (repeatable)")
+    parser.add_argument("--seed", type=int, help="Seed for latency and failure injection")
+    args = parser.parse_args()
+
+    configure_logging()
+    config = MockServerConfig(
+        host=args.host, port=args.port,
+        latency_dist=args.latency_dist, latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms, ms_per_token=args.ms_per_token,
+        rate_429=args.rate_429, rate_529=args.rate_529,
+        rate_timeout=args.rate_timeout, timeout_seconds=args.timeout_seconds,
+        rate_malformed=args.rate_malformed, rate_truncated=args.rate_truncated,
+        retry_after=args.retry_after, rpm=args.rpm,
+        templates=load_templates(args.template), seed=args.seed,
+    )
+    server = make_server(config)
+    logger.info(f"Mock Anthropic API listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+packing.py — Multi-Transcript Request Packing
+==============================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+A 2-minute check-in is a few hundred transcript tokens behind a few
+thousand tokens of system prompt and instructions. Packing pays that
+overhead once for several calls:
+
+    1. PLAN   — group short transcripts into packs (item + char budgets)
+    2. PACK   — one request, one CALL CONTEXT block per transcript
+                (prompts.py Layer 6), output keyed by transcript_id
+    3. DEMUX  — validate each transcript's slice of the response
+                independently → per-transcript (insights, note)
+    4. REPAIR — any transcript missing from the response, or whose
+                slice fails validation, is re-extracted on its own
+
+Design Decision: Only short transcripts are packed.
+Reason: Packing saves the fixed prompt overhead. Once a transcript is
+        several times larger than that overhead the saving is noise, and
+        a bigger pack only raises the cost of one bad response.
+
+Design Decision: Per-transcript validation and recovery.
+Reason: One malformed insight for one account must not cost the other
+        calls in the pack their results — the same isolation batch.py
+        gives each transcript. Slices are validated under the caller's
+        validation mode; only an unusable slice costs its own request.
+
+Design Decision: Packing is text mode on the primary model only.
+Reason: A packed response is one JSON object keyed by transcript_id; the
+        extraction tool and the cascade tiers both work per transcript.
+        run_batch_async() rejects pack with tool mode or a cascade rather
+        than quietly extracting short calls differently from long ones.
+        --chunked needs nothing here: packed transcripts are shorter than
+        one chunking window.
+"""
+
+from __future__ import annotations
+
+import json
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import anthropic        # Annotations only — main.make_client() imports the SDK
+
+from schema import CallMetadata
+from cache import ExtractionCache
+from prompts import build_system_blocks, build_packed_content
+from error_handler import (
+    load_response_json,
+    validate_extraction,
+    handle_json_parse_failure,
+    handle_validation_failure,
+    handle_api_error,
+    ExtractionValidationError
+)
+from main import (
+    EXTRACTION_MODEL,
+    EXTRACTION_MAX_TOKENS,
+    EXTRACTION_MAX_TOKENS_CAP,
+    MOCK_API_RESPONSE,
+    extract_insights_async,
+    validate_partial_async,
+    request_text
+)
+
+logger = logging.getLogger("jtbd.packing")
+
+PACK_MAX_TRANSCRIPT_CHARS = 4000        # Longer transcripts are extracted alone
+PACK_MAX_CHARS = 24000                  # Transcript chars per packed request
+PACK_MAX_ITEMS = 8                      # Transcripts per packed request
+PACK_OUTPUT_TOKENS_PER_TRANSCRIPT = 1536
+
+
+# ─────────────────────────────────────────────────────────────
+# PLANNING
+# ─────────────────────────────────────────────────────────────
+
+def plan_packs(
+    lengths: list[int],
+    max_transcript_chars: int = PACK_MAX_TRANSCRIPT_CHARS,
+    max_pack_chars: int = PACK_MAX_CHARS,
+    max_items: int = PACK_MAX_ITEMS
+) -> tuple[list[list[int]], list[int]]:
+    """
+    Groups transcript indexes into packs, in input order.
+    A pack of one is pointless, so it is returned as a single instead.
+
+    Returns: (packs, singles) — lists of indexes into `lengths`
+    """
+    packs: list[list[int]] = []
+    singles: list[int] = []
+    current: list[int] = []
+    current_chars = 0
+
+    for i, length in enumerate(lengths):
+        if length > max_transcript_chars:
+            singles.append(i)
+            continue
+        if current and (len(current) >= max_items or current_chars + length > max_pack_chars):
+            packs.append(current)
+            current, current_chars = [], 0
+        current.append(i)
+        current_chars += length
+
+    if current:
+        packs.append(current)
+
+    singles.extend(pack[0] for pack in packs if len(pack) == 1)
+    return [pack for pack in packs if len(pack) > 1], sorted(singles)
+
+
+def pack_max_tokens(count: int) -> int:
+    """Response budget for a pack of `count` transcripts."""
+    return max(EXTRACTION_MAX_TOKENS,
+               min(EXTRACTION_MAX_TOKENS_CAP, count * PACK_OUTPUT_TOKENS_PER_TRANSCRIPT))
+
+
+def _pack_keys(metadatas: list[CallMetadata]) -> list[str]:
+    """Unique per-pack keys — transcript_id, suffixed if two calls share one."""
+    keys, seen = [], {}
+    for metadata in metadatas:
+        key = metadata.transcript_id
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+# ─────────────────────────────────────────────────────────────
+# STATS
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class PackingStats:
+    """Process-wide packing counters, reported at the end of a batch."""
+    packs:          int = 0
+    packed:         int = 0     # Transcripts sent inside a pack
+    recovered:      int = 0     # Transcripts re-extracted alone after a bad slice
+
+    def summary(self) -> str:
+        per_request = self.packed / self.packs if self.packs else 0.0
+        return (
+            f"Packing: {self.packed} transcripts in {self.packs} packed requests "
+            f"({per_request:.1f} per request) | {self.recovered} re-extracted alone"
+        )
+
+
+PACKING_STATS = PackingStats()
+
+
+# ─────────────────────────────────────────────────────────────
+# PACKED EXTRACTION
+# ─────────────────────────────────────────────────────────────
+
+def _mock_packed_response(keys: list[str]) -> str:
+    """Mock mode: the pre-loaded single-call response, once per transcript."""
+    single = json.loads(MOCK_API_RESPONSE)
+    return json.dumps({"transcripts": {key: single for key in keys}})
+
+
+async def extract_packed_async(
+    items: list[tuple[str, CallMetadata]],
+    client: Optional[anthropic.Anthropic | anthropic.AsyncAnthropic],
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    validation: str = "strict"
+) -> list[tuple[list, str | None]]:
+    """
+    Extracts several short transcripts with one request.
+    Each slice is validated under `validation`: "partial" keeps a slice's
+    valid insights and corrects the rest, exactly as the single-call path.
+    Only slices that are missing or leave nothing usable are re-extracted
+    individually through extract_insights_async(), concurrently.
+
+    Returns: [(validated_insights, processing_note), ...] aligned with `items`
+    """
+    metadatas = [metadata for _, metadata in items]
+    keys = _pack_keys(metadatas)
+    max_tokens = pack_max_tokens(len(items))
+
+    calls = [
+        {
+            "transcript_id": key,
+            "transcript":    transcript,
+            "csm_name":      metadata.csm_name,
+            "account_name":  metadata.account_name,
+            "call_date":     metadata.call_date,
+        }
+        for key, (transcript, metadata) in zip(keys, items)
+    ]
+    PACKING_STATS.packs += 1
+    PACKING_STATS.packed += len(items)
+    logger.info(f"Packed extraction | {len(items)} transcripts: {', '.join(keys)}")
+
+    if mock:
+        raw_response = _mock_packed_response(keys)
+    else:
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(
+                json.dumps(calls, sort_keys=True, ensure_ascii=False),
+                "", "", "", EXTRACTION_MODEL, max_tokens, stage="packed"
+            )
+        try:
+            raw_response = await request_text(
+                client,
+                dict(
+                    model=EXTRACTION_MODEL,
+                    max_tokens=max_tokens,
+                    system=build_system_blocks(),
+                    messages=[{"role": "user", "content": build_packed_content(calls)}]
+                ),
+                metadatas[0], cache, cache_key, refresh,
+                label=f"Packed API call ({len(items)} transcripts)"
+            )
+        except Exception as e:
+            handle_api_error(e, ", ".join(keys))
+            raise
+
+    try:
+        parsed, _ = load_response_json(raw_response)
+        slices = parsed.get("transcripts") if isinstance(parsed, dict) else None
+        if not isinstance(slices, dict):
+            raise ExtractionValidationError("Packed response missing 'transcripts' object")
+    except json.JSONDecodeError:
+        handle_json_parse_failure(raw_response, attempt=1)
+        slices = {}
+    except ExtractionValidationError as e:
+        handle_validation_failure(e, attempt=1)
+        slices = {}
+
+    async def settle(key: str, item: tuple[str, CallMetadata]) -> tuple[list, str | None]:
+        """This transcript's slice, validated — or its own extraction if unusable."""
+        try:
+            if key not in slices:
+                raise ExtractionValidationError(f"Packed response has no entry for '{key}'")
+            if validation == "partial":
+                insights, note = await validate_partial_async(
+                    slices[key], item[1], client, mock=mock, cache=cache, refresh=refresh
+                )
+            else:
+                insights, note = validate_extraction(slices[key])
+            return insights, f"PACKED ({len(items)} per request). {note or ''}".strip()
+        except ExtractionValidationError as e:
+            handle_validation_failure(e, attempt=1)
+
+        PACKING_STATS.recovered += 1
+        logger.warning(f"Re-extracting '{key}' alone after packed extraction failed")
+        return await extract_insights_async(
+            *item, client, mock=mock, cache=cache, refresh=refresh, validation=validation
+        )
+
+    # Slices settle concurrently (corrections, recoveries). A failed recovery
+    # fails the pack (process_pack_async), so the rest are cancelled.
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(settle(key, item)) for key, item in zip(keys, items)]
+    except ExceptionGroup as failed:
+        raise failed.exceptions[0]      # Callers handle the extraction's own error type
+    results = [task.result() for task in tasks]
+
+    return results
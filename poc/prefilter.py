@@ -0,0 +1,389 @@
+"""
+prefilter.py — Local Signal Pre-Filter
+=======================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+SYSTEM_PROMPT rule 7 already expects transcripts with nothing to extract.
+Paying a full API call to learn that is the most expensive "no" in the
+pipeline. This stage answers it locally first:
+
+    1. Lexicon scan — one regex family per EXTRACTION TARGET in
+       prompts.py, plus known competitor names and churn phrases
+    2. Signal score — small logistic model over per-type hit counts
+       and call length → P(transcript has extractable insights)
+    3. Skip        — score below threshold → handle_empty_extraction(),
+                     no API call
+    4. Rank        — everything else is ordered by an urgency score so
+                     churn / bug / competitor calls are extracted first
+
+Design Decision: Hand-set weights, tuned by threshold — not a trained model.
+Reason: There is no labelled corpus yet, and a lexicon anyone can read is
+        easier to trust than a pickled classifier. The threshold is the
+        one knob: calibrate_threshold() picks it from a previous batch run
+        so the miss rate on real calls stays under a target.
+
+Design Decision: Default threshold never skips a call with a lexicon hit.
+Reason: A false negative is a churn signal nobody hears about. Until the
+        threshold is calibrated on real traffic, the filter only removes
+        calls that match nothing at all and are short (under ~2,000 words).
+        The weakest possible evidence — one general_feedback or
+        positive_signal hit in a one-line call — scores ≈ 0.091; the
+        default sits below it, and weakest_hit_score() checks that.
+"""
+
+import re
+import json
+import math
+import logging
+import argparse
+from dataclasses import dataclass, field
+
+from schema import InsightType
+from logging_config import configure_logging
+
+logger = logging.getLogger("jtbd.prefilter")
+
+# Logistic model: P(signal) = sigmoid(BIAS + Σ weight·log1p(hits) + LENGTH_WEIGHT·log1p(words/1000))
+SIGNAL_BIAS = -3.0
+LENGTH_WEIGHT = 0.5
+DEFAULT_THRESHOLD = 0.08        # Below the weakest single hit (≈ 0.091); hitless calls score 0.047+
+DEFAULT_TARGET_FNR = 0.02       # calibrate_threshold() default miss rate
+
+# Processing-note prefix for skipped transcripts — also lets load_labels()
+# ignore them, since a skipped call has no ground truth
+PREFILTER_NOTE = "PREFILTER:"
+
+# Vendors the customer is most likely to name on a call
+KNOWN_COMPETITORS = (
+    "Marchex",
+    "CallRail",
+    "CallTrackingMetrics",
+    "Convirza",
+    "Ringba",
+    "DialogTech",
+    "Dialpad",
+    "Gong",
+    "Chorus",
+    "Salesloft",
+)
+
+CHURN_PHRASES = (
+    r"\bcancel\w*",
+    r"\bchurn\w*",
+    r"\bterminat\w+",
+    r"\bnot (going to )?renew\w*",
+    r"\bwon'?t (be )?renew\w*",
+    r"\bwalk away\b",
+    r"\bmov(e|ing) (away|off)\b",
+    r"\bre-?evaluat\w+",
+    r"\bevaluate alternatives\b",
+    r"\bunacceptable\b",
+    r"\bfrustrat\w+",
+    r"\blos(e|ing) (trust|confidence)\b",
+)
+
+# One pattern family per EXTRACTION TARGET in prompts.EXTRACTION_INSTRUCTIONS
+LEXICON: dict[InsightType, tuple[str, ...]] = {
+    InsightType.COMPETITOR_MENTION: (
+        r"\bcompetit\w+",
+        r"\balternatives?\b",
+        r"\bwe (looked|are looking|were looking) at\b",
+        r"\bdemo with\b",
+        r"\bswitch(ing)? (to|over)\b",
+        r"\bother vendors?\b",
+    ) + tuple(rf"\b{re.escape(name)}\b" for name in KNOWN_COMPETITORS),
+    InsightType.FEATURE_REQUEST: (
+        r"\bwish(list)?\b",
+        r"\bit would be (really |so )?(great|nice|valuable|helpful|useful)\b",
+        r"\bcan (you|we) add\b",
+        r"\broadmap\b",
+        r"\bfeature\b",
+        r"\bintegrat\w+",
+        r"\bwe need\b",
+    ),
+    InsightType.BUG_REPORT: (
+        r"\bbugs?\b",
+        r"\bbroken\b",
+        r"\bnot working\b",
+        r"\bdoesn'?t work\b",
+        r"\berrors?\b",
+        r"\bdiscrepanc\w+",
+        r"\binconsistent\b",
+        r"\bsupport ticket\b|\bticket\b",
+        r"\boutage\b",
+        r"\bcrash\w*",
+    ),
+    InsightType.PRICING_FRICTION: (
+        r"\bpric(e|es|ing)\b",
+        r"\bcosts?\b",
+        r"\bbudget\w*",
+        r"\bROI\b",
+        r"\bexpensive\b",
+        r"\bdiscount\w*",
+        r"\bper[- ]seat\b",
+    ),
+    InsightType.CHURN_SIGNAL: CHURN_PHRASES,
+    InsightType.POSITIVE_SIGNAL: (
+        r"\blove\b",
+        r"\bimpressed\b",
+        r"\bexpan(d|sion)\b",
+        r"\brefer(ral|red)?\b",
+        r"\bgame[- ]changer\b",
+        r"\bthrilled\b",
+    ),
+    InsightType.GENERAL_FEEDBACK: (
+        r"\bfeedback\b",
+        r"\bsuggest\w*",
+        r"\bconcern\w*",
+    ),
+}
+
+# Evidence weights for the signal score
+SIGNAL_WEIGHTS: dict[InsightType, float] = {
+    InsightType.COMPETITOR_MENTION: 2.0,
+    InsightType.FEATURE_REQUEST:    1.5,
+    InsightType.BUG_REPORT:         2.0,
+    InsightType.PRICING_FRICTION:   1.5,
+    InsightType.CHURN_SIGNAL:       2.5,
+    InsightType.POSITIVE_SIGNAL:    1.0,
+    InsightType.GENERAL_FEEDBACK:   1.0,
+}
+
+# Urgency weights for ranking — mirrors which types tend to come back HIGH/CRITICAL
+URGENCY_WEIGHTS: dict[InsightType, float] = {
+    InsightType.CHURN_SIGNAL:       4.0,
+    InsightType.BUG_REPORT:         3.0,
+    InsightType.COMPETITOR_MENTION: 2.5,
+    InsightType.PRICING_FRICTION:   2.0,
+    InsightType.FEATURE_REQUEST:    0.5,
+    InsightType.GENERAL_FEEDBACK:   0.25,
+    InsightType.POSITIVE_SIGNAL:    0.0,
+}
+
+
+
+def weakest_hit_score() -> float:
+    """
+    Signal score of the least evidence that counts: one hit of the
+    lowest-weighted type in an empty transcript. Any call with a lexicon
+    hit scores at least this much.
+    """
+    logit = SIGNAL_BIAS + min(SIGNAL_WEIGHTS.values()) * math.log1p(1)
+    return 1.0 / (1.0 + math.exp(-logit))
+
+
+# Re-tuning SIGNAL_BIAS or SIGNAL_WEIGHTS must not let the default skip a call with a hit
+if DEFAULT_THRESHOLD >= weakest_hit_score():
+    raise ValueError(
+        f"DEFAULT_THRESHOLD {DEFAULT_THRESHOLD} would skip single-hit calls "
+        f"(weakest hit scores {weakest_hit_score():.3f})"
+    )
+
+_COMPILED: dict[InsightType, list[re.Pattern]] = {
+    insight_type: [re.compile(p, re.IGNORECASE) for p in patterns]
+    for insight_type, patterns in LEXICON.items()
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# SCORING
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class PrefilterScore:
+    """
+    Local estimate for one transcript.
+    signal_score  — P(transcript has extractable insights), 0.0 - 1.0
+    urgency_score — ranking key; higher = extract sooner
+    hits          — lexicon matches per insight type
+    """
+    signal_score:   float
+    urgency_score:  float
+    hits:           dict[str, int] = field(default_factory=dict)
+    skip:           bool = False
+
+    @property
+    def note(self) -> str:
+        return (
+            f"{PREFILTER_NOTE} no extraction signal "
+            f"(score {self.signal_score:.2f}) — API call skipped."
+        )
+
+
+def count_hits(transcript: str) -> dict[InsightType, int]:
+    """Lexicon matches per insight type."""
+    return {
+        insight_type: sum(len(p.findall(transcript)) for p in patterns)
+        for insight_type, patterns in _COMPILED.items()
+    }
+
+
+def score_transcript(transcript: str) -> PrefilterScore:
+    """Scores one transcript. Pure function — no stats are recorded."""
+    hits = count_hits(transcript)
+    words = len(transcript.split())
+
+    logit = SIGNAL_BIAS + LENGTH_WEIGHT * math.log1p(words / 1000)
+    urgency = 0.0
+    for insight_type, n in hits.items():
+        if n:
+            logit += SIGNAL_WEIGHTS[insight_type] * math.log1p(n)
+            urgency += URGENCY_WEIGHTS[insight_type] * math.log1p(n)
+
+    return PrefilterScore(
+        signal_score=1.0 / (1.0 + math.exp(-logit)),
+        urgency_score=urgency,
+        hits={t.value: n for t, n in hits.items() if n},
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# PREFILTER STAGE
+# ─────────────────────────────────────────────────────────────
+
+class Prefilter:
+    """
+    Skip / rank stage in front of extract_insights.
+    Counts every decision so the skip rate can be reported per run.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"threshold must be between 0 and 1, got: {threshold}")
+        self.threshold = threshold
+        self.evaluated = 0
+        self.skipped = 0
+
+    def evaluate(self, transcript: str, transcript_id: str = "") -> PrefilterScore:
+        """Scores the transcript and decides whether to skip the API call."""
+        result = score_transcript(transcript)
+        result.skip = result.signal_score < self.threshold
+        self.evaluated += 1
+        if result.skip:
+            self.skipped += 1
+            logger.info(
+                f"Prefilter skipped '{transcript_id}' — signal score "
+                f"{result.signal_score:.3f} < {self.threshold:.3f}"
+            )
+        return result
+
+    def rank(self, transcripts: list[str]) -> list[int]:
+        """
+        Indexes of `transcripts` ordered most-urgent first.
+        Stable, so equal scores keep their input order.
+        """
+        urgency = [score_transcript(t).urgency_score for t in transcripts]
+        return sorted(range(len(transcripts)), key=lambda i: -urgency[i])
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.evaluated if self.evaluated else 0.0
+
+    def summary(self) -> str:
+        """One-line skip summary for end-of-run output."""
+        return (
+            f"Prefilter: {self.skipped}/{self.evaluated} skipped "
+            f"({self.skip_rate:.0%}) | threshold {self.threshold:.3f}"
+        )
+
+
+# ─────────────────────────────────────────────────────────────
+# CALIBRATION
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class CalibrationResult:
+    threshold:              float
+    false_negative_rate:    float   # Share of insight-bearing calls that would be skipped
+    skip_rate:              float   # Share of all labelled calls that would be skipped
+    positives:              int
+    total:                  int
+
+
+def calibrate_threshold(
+    scores: list[float],
+    labels: list[bool],
+    target_fnr: float = DEFAULT_TARGET_FNR
+) -> CalibrationResult:
+    """
+    Picks the highest threshold whose false-negative rate on the labelled
+    calls stays at or under `target_fnr`.
+    labels[i] is True if transcript i produced at least one insight.
+    """
+    if len(scores) != len(labels):
+        raise ValueError("scores and labels must have the same length")
+    if not 0.0 <= target_fnr < 1.0:
+        raise ValueError(f"target_fnr must be in [0, 1), got: {target_fnr}")
+
+    positives = sorted(s for s, label in zip(scores, labels) if label)
+    if not positives:
+        raise ValueError("Calibration needs at least one transcript with insights")
+
+    allowed_misses = math.floor(target_fnr * len(positives))
+    threshold = positives[allowed_misses]
+
+    missed = sum(1 for s in positives if s < threshold)
+    skipped = sum(1 for s in scores if s < threshold)
+    return CalibrationResult(
+        threshold=threshold,
+        false_negative_rate=missed / len(positives),
+        skip_rate=skipped / len(scores),
+        positives=len(positives),
+        total=len(scores),
+    )
+
+
+def load_labels(batch_output_path: str) -> list[tuple[str, bool]]:
+    """
+    Reads (transcript_path, has_insights) pairs from a previous
+    `main.py --transcript-dir ... --output json` run.
+    Failed and prefilter-skipped transcripts carry no label and are ignored.
+    """
+    with open(batch_output_path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    labels = []
+    for item in data.get("results", []):
+        if item.get("status") == "failed":
+            continue
+        if (item.get("processing_note") or "").startswith(PREFILTER_NOTE):
+            continue
+        labels.append((item["path"], item.get("total_insights", 0) > 0))
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calibrate the prefilter threshold from a labelled batch run"
+    )
+    parser.add_argument(
+        "--labels",
+        required=True,
+        help="JSON output of a batch run without --prefilter (main.py --output json)"
+    )
+    parser.add_argument(
+        "--target-fnr",
+        type=float,
+        default=DEFAULT_TARGET_FNR,
+        help=f"Max share of insight-bearing calls to skip (default: {DEFAULT_TARGET_FNR})"
+    )
+    args = parser.parse_args()
+    configure_logging()
+
+    # Imported here — main.py imports this module (Prefilter, DEFAULT_THRESHOLD)
+    from main import load_transcript
+
+    labelled = load_labels(args.labels)
+    scores = [score_transcript(load_transcript(path)[0]).signal_score for path, _ in labelled]
+    result = calibrate_threshold(scores, [label for _, label in labelled], args.target_fnr)
+
+    print(f"\n  Labelled transcripts: {result.total} ({result.positives} with insights)")
+    print(f"  Threshold:            {result.threshold:.4f}")
+    print(f"  False-negative rate:  {result.false_negative_rate:.1%} (target {args.target_fnr:.1%})")
+    print(f"  Skip rate:            {result.skip_rate:.1%}")
+    print(f"\n  Use: python main.py --prefilter --prefilter-threshold {result.threshold:.4f}\n")
+
+
+if __name__ == "__main__":
+    main()
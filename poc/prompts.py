@@ -7,18 +7,28 @@ Author: Erwin M. McDonald
 This file is the entire prompt engineering strategy made explicit.
 Every design decision is documented inline.
 
-Three prompt layers:
+Prompt layers:
     1. SYSTEM_PROMPT     — Sets the model's persona and constraints
     2. EXTRACTION_PROMPT — Structured entity extraction with JSON schema enforcement
     3. FALLBACK_PROMPT   — Simplified extraction when full schema fails validation
+    4. CORRECTION_PROMPT — Re-requests only the insights that failed validation
+    5. EXTRACTION_TOOL   — The output contract as a tool input schema (tool-use mode)
+    6. PACKED_PROMPT     — Several short calls in one request, output keyed by transcript_id
 
 Design Philosophy:
     - Prompts are code. They are versioned, documented, and testable.
     - The extraction schema is embedded in the prompt — not assumed.
     - The model is told what to do when it isn't sure (confidence scoring).
     - Output format is JSON — no prose, no markdown, no ambiguity.
+    - Static instructions come before per-call context so the prefix is cacheable
+      once it clears the model's minimum (tool mode does; text mode does not).
 """
 
+import json
+
+from schema import InsightType, SentimentLabel, UrgencyLevel
+from metrics import timed_stage
+
 
 # ─────────────────────────────────────────────────────────────
 # LAYER 1 — SYSTEM PROMPT
@@ -78,12 +88,69 @@ a 0.85 that routes incorrectly.
 """
 
 
+# ─────────────────────────────────────────────────────────────
+# PROMPT CACHING
+# Anthropic prompt caching reuses a request PREFIX. Everything that is
+# identical across calls (tools, system prompt, extraction instructions)
+# goes first; everything per-call (CALL CONTEXT, TRANSCRIPT) goes after it.
+# A prefix shorter than the model's minimum (1,024 tokens on Sonnet) is
+# silently not cached — the breakpoint is accepted and does nothing.
+# ─────────────────────────────────────────────────────────────
+
+CACHE_CONTROL = {"type": "ephemeral"}
+CACHE_MIN_TOKENS = 1024
+CHARS_PER_TOKEN = 4             # Same rough estimate as main.py and scheduler.py
+
+
+def cache_breakpoint(*prefix: str) -> dict:
+    """
+    {"cache_control": ...} for a block that ends the static prefix `prefix`
+    (every static text before and including it, in request order), or {}
+    when that prefix is under CACHE_MIN_TOKENS and could never be cached.
+    """
+    tokens = sum(len(text) for text in prefix) // CHARS_PER_TOKEN
+    return {"cache_control": CACHE_CONTROL} if tokens >= CACHE_MIN_TOKENS else {}
+
+
+def build_system_blocks() -> list[dict]:
+    """
+    SYSTEM_PROMPT as a system content block, without a cache breakpoint.
+
+    Design Decision: Breakpoints are placed by cache_breakpoint(), never by hand.
+    Reason: A breakpoint on a prefix under CACHE_MIN_TOKENS is accepted and
+            does nothing. SYSTEM_PROMPT alone is ~700 tokens. TEXT MODE IS NOT
+            CACHED: system + instructions is ~880 tokens (extraction), ~870
+            (fallback), ~830 (correction), ~1,010 (packed) — all under the
+            minimum, so those requests carry no breakpoint. Tool mode is
+            cached: the tool definition leads the prefix and lifts it to
+            ~1,270. If an instruction block grows past the minimum, its
+            breakpoint appears without further changes.
+    """
+    return [{"type": "text", "text": SYSTEM_PROMPT}]
+
+
 # ─────────────────────────────────────────────────────────────
 # LAYER 2 — EXTRACTION PROMPT
 # The main extraction call — includes full context injection
 # ─────────────────────────────────────────────────────────────
 
-def build_extraction_prompt(
+# Static instruction block — byte-identical on every call so it can be cached.
+EXTRACTION_INSTRUCTIONS = """Analyze the customer call transcript below and extract all structured insights.
+
+EXTRACTION TARGETS — look specifically for:
+  • Competitor mentions (named competitors, comparisons, "we looked at X")
+  • Feature requests (things the customer wants that don't exist yet)
+  • Bug reports (things that are broken, not working, or inconsistent)
+  • Pricing friction (cost concerns, ROI questions, pricing model complaints)
+  • Churn signals (cancellation language, dissatisfaction, switching intent)
+  • Positive signals (praise, expansion intent, referral mentions)
+  • General feedback (anything strategically relevant that doesn't fit above)
+
+Use the CALL CONTEXT that follows to interpret the transcript.
+"""
+
+
+def format_call_block(
     transcript: str,
     csm_name: str,
     account_name: str,
@@ -91,19 +158,8 @@ def build_extraction_prompt(
     additional_context: str = ""
 ) -> str:
     """
-    Builds the full extraction prompt with call context injected.
-
-    Design Decision: Context injection over generic extraction.
-    Reason: Knowing the account name and CSM lets the model distinguish
-            "they mentioned Gong" (competitive intel) from
-            "they use Gong internally" (stack context, not competitive threat).
-
-    Parameters:
-        transcript         — Full call transcript text
-        csm_name           — CSM on the call (for attribution)
-        account_name       — Customer account name
-        call_date          — Date of call (for time-sensitive urgency signals)
-        additional_context — Any pre-call notes or account context (optional)
+    CALL CONTEXT + TRANSCRIPT for one call, without the closing instruction.
+    Shared by single-call and packed extraction prompts.
     """
 
     context_block = ""
@@ -113,29 +169,83 @@ ADDITIONAL ACCOUNT CONTEXT (use to inform extraction, do not hallucinate from it
 {additional_context}
 """
 
-    return f"""Analyze the following customer call transcript and extract all structured insights.
-
-CALL CONTEXT:
+    return f"""CALL CONTEXT:
   CSM: {csm_name}
   Account: {account_name}
   Call Date: {call_date}
 {context_block}
-
-EXTRACTION TARGETS — look specifically for:
-  • Competitor mentions (named competitors, comparisons, "we looked at X")
-  • Feature requests (things the customer wants that don't exist yet)
-  • Bug reports (things that are broken, not working, or inconsistent)
-  • Pricing friction (cost concerns, ROI questions, pricing model complaints)
-  • Churn signals (cancellation language, dissatisfaction, switching intent)
-  • Positive signals (praise, expansion intent, referral mentions)
-  • General feedback (anything strategically relevant that doesn't fit above)
-
 TRANSCRIPT:
 ---
 {transcript}
----
+---"""
+
+
+def build_call_context(
+    transcript: str,
+    csm_name: str,
+    account_name: str,
+    call_date: str,
+    additional_context: str = ""
+) -> str:
+    """
+    The per-call half of the extraction prompt: CALL CONTEXT + TRANSCRIPT.
+    Everything that varies between calls lives here, after the cached prefix.
+    """
+    return format_call_block(
+        transcript, csm_name, account_name, call_date, additional_context
+    ) + "\n\nExtract all insights now. Return valid JSON only."
+
 
-Extract all insights now. Return valid JSON only."""
+@timed_stage("prompt_build")
+def build_extraction_prompt(
+    transcript: str,
+    csm_name: str,
+    account_name: str,
+    call_date: str,
+    additional_context: str = ""
+) -> str:
+    """
+    Builds the full extraction prompt with call context injected.
+
+    Design Decision: Context injection over generic extraction.
+    Reason: Knowing the account name and CSM lets the model distinguish
+            "they mentioned Gong" (competitive intel) from
+            "they use Gong internally" (stack context, not competitive threat).
+
+    Parameters:
+        transcript         — Full call transcript text
+        csm_name           — CSM on the call (for attribution)
+        account_name       — Customer account name
+        call_date          — Date of call (for time-sensitive urgency signals)
+        additional_context — Any pre-call notes or account context (optional)
+    """
+    return EXTRACTION_INSTRUCTIONS + "\n" + build_call_context(
+        transcript, csm_name, account_name, call_date, additional_context
+    )
+
+
+@timed_stage("prompt_build")
+def build_extraction_content(
+    transcript: str,
+    csm_name: str,
+    account_name: str,
+    call_date: str,
+    additional_context: str = "",
+    mode: str = "text"
+) -> list[dict]:
+    """
+    Same prompt as build_extraction_prompt(), split into user content blocks:
+    the static EXTRACTION_INSTRUCTIONS followed by the per-call context.
+    The instructions carry a cache breakpoint when the prefix up to them
+    can be cached — in tool mode (`mode="tool"`) the tool definition is
+    part of that prefix. The text the model sees is identical either way.
+    """
+    return [
+        {"type": "text", "text": EXTRACTION_INSTRUCTIONS, **_EXTRACTION_BREAKPOINT[mode]},
+        {"type": "text", "text": build_call_context(
+            transcript, csm_name, account_name, call_date, additional_context
+        )},
+    ]
 
 
 # ─────────────────────────────────────────────────────────────
@@ -144,26 +254,18 @@ Extract all insights now. Return valid JSON only."""
 # or fails schema validation.
 # ─────────────────────────────────────────────────────────────
 
-def build_fallback_prompt(transcript: str, failed_output: str) -> str:
-    """
-    Simplified extraction prompt used as fallback when primary fails.
-
-    Design Decision: Two-stage fallback over hard failure.
-    Reason: In a live system, a single JSON parsing failure should not
-            kill the entire pipeline. The fallback simplifies the schema
-            and asks the model to try again with explicit error context.
-
-    This is the error handling strategy made visible to the panel.
-    """
-    return f"""Your previous extraction attempt returned output that could not be parsed as valid JSON.
+# The fallback sees at most this much of a whole transcript. A chunking
+# window (chunking.py) is already sized for one request, so its fallback
+# gets the whole window (max_chars=None).
+FALLBACK_TRANSCRIPT_CHARS = 2000
 
-Previous (invalid) output:
-{failed_output[:500]}...
+# Static fallback instructions — placed before the failed output
+FALLBACK_INSTRUCTIONS = """Your previous extraction attempt returned output that could not be parsed as valid JSON.
 
 Please try again with a SIMPLIFIED extraction. Return ONLY this minimal JSON structure:
-{{
+{
   "insights": [
-    {{
+    {
       "insight_type": "<type>",
       "summary": "<1 sentence summary>",
       "verbatim_quote": null,
@@ -175,26 +277,257 @@ Please try again with a SIMPLIFIED extraction. Return ONLY this minimal JSON str
       "bug_description": null,
       "action_required": false,
       "suggested_action": null
-    }}
+    }
   ],
   "processing_note": "Fallback extraction — simplified schema"
-}}
+}
+"""
+
+
+def build_fallback_context(
+    transcript: str,
+    failed_output: str,
+    max_chars: int | None = FALLBACK_TRANSCRIPT_CHARS
+) -> str:
+    """
+    The per-call half of the fallback prompt: failed output + transcript,
+    cut to `max_chars` (None sends it whole).
+    """
+    return f"""Previous (invalid) output:
+{failed_output[:500]}...
 
 TRANSCRIPT:
 ---
-{transcript[:2000]}
+{transcript[:max_chars]}
 ---
 
 Return valid JSON only. No other text."""
 
 
+def build_fallback_prompt(
+    transcript: str,
+    failed_output: str,
+    max_chars: int | None = FALLBACK_TRANSCRIPT_CHARS
+) -> str:
+    """
+    Simplified extraction prompt used as fallback when primary fails.
+
+    Design Decision: Two-stage fallback over hard failure.
+    Reason: In a live system, a single JSON parsing failure should not
+            kill the entire pipeline. The fallback simplifies the schema
+            and asks the model to try again with explicit error context.
+
+    This is the error handling strategy made visible to the panel.
+    """
+    return FALLBACK_INSTRUCTIONS + "\n" + build_fallback_context(transcript, failed_output, max_chars)
+
+
+def build_fallback_content(
+    transcript: str,
+    failed_output: str,
+    max_chars: int | None = FALLBACK_TRANSCRIPT_CHARS
+) -> list[dict]:
+    """
+    build_fallback_prompt() split into the static instruction block
+    and the per-call failed output + transcript.
+    """
+    return [
+        {"type": "text", "text": FALLBACK_INSTRUCTIONS,
+         **cache_breakpoint(SYSTEM_PROMPT, FALLBACK_INSTRUCTIONS)},
+        {"type": "text", "text": build_fallback_context(transcript, failed_output, max_chars)},
+    ]
+
+
+# ─────────────────────────────────────────────────────────────
+# LAYER 4 — CORRECTION PROMPT
+# Partial validation mode: re-request ONLY the insights that failed
+# validation, with their exact field errors, instead of re-extracting
+# the whole transcript through the simplified fallback schema.
+# ─────────────────────────────────────────────────────────────
+
+CORRECTION_INSTRUCTIONS = """Some insights you extracted failed schema validation.
+Each one is listed below with its exact field errors.
+
+Return ONLY a JSON object of this form, with one corrected insight per item,
+in the same order:
+{"insights": [ <corrected insight>, ... ]}
+
+RULES:
+  • Fix only the fields named in the errors. Keep every other field unchanged.
+  • Enum fields must use exactly one of the listed values.
+  • confidence_score must be a number between 0.0 and 1.0.
+  • If an item cannot be corrected without guessing, lower its confidence_score.
+"""
+
+
+def build_correction_content(items: list[dict]) -> list[dict]:
+    """
+    Builds the correction request for rejected insights.
+
+    Parameters:
+        items — [{"insight": <raw insight as returned>, "errors": [<str>, ...]}, ...]
+
+    Design Decision: Send the rejected objects, not the transcript.
+    Reason: The model already did the hard part. Fixing "urgency": "urgent"
+            needs the object and the allowed values — re-sending a 40-minute
+            transcript to fix one enum would cost more than the original call.
+    """
+    blocks = []
+    for n, item in enumerate(items, start=1):
+        errors = "\n".join(f"    - {e}" for e in item["errors"])
+        blocks.append(
+            f"ITEM {n}:\n"
+            f"  insight: {json.dumps(item['insight'], ensure_ascii=False)}\n"
+            f"  errors:\n{errors}"
+        )
+    return [
+        {"type": "text", "text": CORRECTION_INSTRUCTIONS,
+         **cache_breakpoint(SYSTEM_PROMPT, CORRECTION_INSTRUCTIONS)},
+        {"type": "text", "text": "\n\n".join(blocks) + "\n\nReturn valid JSON only."},
+    ]
+
+
+# ─────────────────────────────────────────────────────────────
+# LAYER 5 — EXTRACTION TOOL
+# Tool-use mode: the OUTPUT CONTRACT is declared as a tool input
+# schema and the model is forced to call the tool. The insights arrive
+# as parsed tool arguments — no fences to strip, no JSON to repair.
+# ─────────────────────────────────────────────────────────────
+
+EXTRACTION_TOOL_NAME = "record_insights"
+
+_NULLABLE_STRING = {"type": ["string", "null"]}
+
+
+def build_extraction_tool() -> dict:
+    """
+    The record_insights tool definition, generated from the schema.py enums.
+
+    Design Decision: Derive the enums, don't copy them.
+    Reason: The text prompt lists allowed values by hand; the tool schema is
+            built from InsightType / SentimentLabel / UrgencyLevel, so adding
+            an insight type can never leave the contract out of date.
+    """
+    insight = {
+        "type": "object",
+        "properties": {
+            "insight_type":      {"type": "string", "enum": [t.value for t in InsightType]},
+            "summary":           {"type": "string", "description": "1-2 sentence structured summary"},
+            "verbatim_quote":    {**_NULLABLE_STRING, "description": "Exact words from the transcript, or null"},
+            "sentiment":         {"type": "string", "enum": [s.value for s in SentimentLabel]},
+            "urgency":           {"type": "string", "enum": [u.value for u in UrgencyLevel]},
+            "confidence_score":  {"type": "number", "minimum": 0.0, "maximum": 1.0},
+            "competitor_named":  {**_NULLABLE_STRING, "description": "Only for competitor_mention"},
+            "feature_requested": {**_NULLABLE_STRING, "description": "Only for feature_request"},
+            "bug_description":   {**_NULLABLE_STRING, "description": "Only for bug_report"},
+            "action_required":   {"type": "boolean"},
+            "suggested_action":  _NULLABLE_STRING,
+        },
+        "required": [
+            "insight_type", "summary", "verbatim_quote", "sentiment", "urgency",
+            "confidence_score", "competitor_named", "feature_requested",
+            "bug_description", "action_required", "suggested_action",
+        ],
+    }
+    return {
+        "name": EXTRACTION_TOOL_NAME,
+        "description": (
+            "Record every structured insight extracted from the call transcript. "
+            "Call exactly once; pass an empty insights array if there are none."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "insights": {"type": "array", "items": insight},
+                "processing_note": _NULLABLE_STRING,
+            },
+            "required": ["insights", "processing_note"],
+        },
+    }
+
+
+def build_tool_choice() -> dict:
+    """Forces the model to answer through the extraction tool."""
+    return {"type": "tool", "name": EXTRACTION_TOOL_NAME}
+
+
+# Tools precede the system prompt in the request, so in tool mode the tool
+# definition is part of the prefix the extraction breakpoint closes.
+_EXTRACTION_BREAKPOINT = {
+    "text": cache_breakpoint(SYSTEM_PROMPT, EXTRACTION_INSTRUCTIONS),
+    "tool": cache_breakpoint(
+        json.dumps(build_extraction_tool()), SYSTEM_PROMPT, EXTRACTION_INSTRUCTIONS
+    ),
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# LAYER 6 — PACKED EXTRACTION PROMPT
+# Several short calls in one request. For a 2-minute check-in the
+# system prompt + instructions are most of the input; packing pays
+# for them once per request instead of once per call.
+# ─────────────────────────────────────────────────────────────
+
+# Static — placed after EXTRACTION_INSTRUCTIONS so both share a prefix
+PACKED_INSTRUCTIONS = """This request contains SEVERAL separate calls. Each call has its own
+TRANSCRIPT ID, CALL CONTEXT and TRANSCRIPT. Extract each call independently:
+never attribute a quote or insight from one call to another.
+
+For this request the OUTPUT CONTRACT is wrapped per call. Return ONLY:
+{
+  "transcripts": {
+    "<TRANSCRIPT ID>": {
+      "insights": [ <insight objects exactly as in the OUTPUT CONTRACT> ],
+      "processing_note": "<string or null>"
+    }
+  }
+}
+
+Include every TRANSCRIPT ID exactly once, even when its insights array is empty.
+"""
+
+
+@timed_stage("prompt_build")
+def build_packed_content(calls: list[dict]) -> list[dict]:
+    """
+    Builds the user content for a packed extraction request.
+
+    Parameters:
+        calls — [{"transcript_id", "transcript", "csm_name", "account_name",
+                  "call_date"}, ...] — transcript_ids must be unique
+
+    Design Decision: Output keyed by transcript_id, not by position.
+    Reason: A model that skips or merges one call would silently shift
+            every later result onto the wrong account if results were
+            matched by order. Keys make a missing call detectable.
+    """
+    blocks = [
+        f"=== CALL {n} | TRANSCRIPT ID: {call['transcript_id']} ===\n"
+        + format_call_block(
+            call["transcript"], call["csm_name"],
+            call["account_name"], call["call_date"]
+        )
+        for n, call in enumerate(calls, start=1)
+    ]
+    return [
+        {"type": "text", "text": EXTRACTION_INSTRUCTIONS, **_EXTRACTION_BREAKPOINT["text"]},
+        {"type": "text", "text": PACKED_INSTRUCTIONS,
+         **cache_breakpoint(SYSTEM_PROMPT, EXTRACTION_INSTRUCTIONS, PACKED_INSTRUCTIONS)},
+        {"type": "text", "text": "\n\n".join(blocks)
+            + f"\n\nExtract all insights for all {len(calls)} calls now. Return valid JSON only."},
+    ]
+
+
 # ─────────────────────────────────────────────────────────────
 # PROMPT VERSIONING
 # Production systems need prompt version tracking.
 # When a prompt changes, extraction behavior changes.
 # ─────────────────────────────────────────────────────────────
 
-PROMPT_VERSION = "1.0.0"
+PROMPT_VERSION = "1.3.0"
 PROMPT_CHANGELOG = {
-    "1.0.0": "Initial extraction prompt — Invoca POC demo version"
+    "1.0.0": "Initial extraction prompt — Invoca POC demo version",
+    "1.1.0": "Static instructions moved ahead of CALL CONTEXT / TRANSCRIPT for prompt caching",
+    "1.2.0": "record_insights tool schema (generated from schema.py enums) for tool-use extraction",
+    "1.3.0": "Packed extraction prompt — several short calls per request, output keyed by transcript_id",
 }
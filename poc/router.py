@@ -30,6 +30,8 @@ from schema import (
     CallMetadata, RoutingDestination, UrgencyLevel,
     ROUTING_RULES, CONFIDENCE_THRESHOLD, CRITICAL_SLA
 )
+from metrics import timed_stage, ALERTS_ROUTED, HUMAN_REVIEW_ROUTES
+from tracing import traced, current_span
 
 logger = logging.getLogger("jtbd.router")
 
@@ -38,6 +40,7 @@ logger = logging.getLogger("jtbd.router")
 # CORE ROUTING FUNCTION
 # ─────────────────────────────────────────────────────────────
 
+@traced("route_insight")
 def route_insight(
     insight: ExtractedInsight,
     metadata: CallMetadata
@@ -49,9 +52,11 @@ def route_insight(
     # Determine SLA
     if insight.urgency == UrgencyLevel.CRITICAL:
         sla = CRITICAL_SLA
+        # %-style: per-insight lines are formatted only if a handler keeps them
         logger.info(
-            f"CRITICAL urgency detected for '{insight.insight_type.value}' — "
-            f"SLA collapsed to {CRITICAL_SLA}"
+            "CRITICAL urgency detected for '%s' — SLA collapsed to %s",
+            insight.insight_type.value, CRITICAL_SLA,
+            extra={"event": "critical_sla", "transcript_id": metadata.transcript_id}
         )
     else:
         rules = ROUTING_RULES.get(insight.insight_type, {})
@@ -70,36 +75,68 @@ def route_insight(
         response_sla=sla
     )
 
+    ALERTS_ROUTED.inc(destination=insight.routing_target.value)
+    if insight.routing_target == RoutingDestination.HUMAN_REVIEW:
+        HUMAN_REVIEW_ROUTES.inc()
+    current_span().set_attributes(
+        alert_id=alert_id, transcript_id=metadata.transcript_id,
+        insight_type=insight.insight_type.value, destination=insight.routing_target.value,
+        confidence=insight.confidence_score, urgency=insight.urgency.value
+    )
+
     logger.info(
-        f"[{alert_id}] Routed {insight.insight_type.value} → "
-        f"{insight.routing_target.value} | "
-        f"Confidence: {insight.confidence_score:.2f} | "
-        f"Urgency: {insight.urgency.value} | "
-        f"SLA: {sla}"
+        "[%s] Routed %s → %s | Confidence: %.2f | Urgency: %s | SLA: %s",
+        alert_id, insight.insight_type.value, insight.routing_target.value,
+        insight.confidence_score, insight.urgency.value, sla,
+        extra={
+            "event": "route",
+            "alert_id": alert_id,
+            "transcript_id": metadata.transcript_id,
+            "insight_type": insight.insight_type.value,
+            "destination": insight.routing_target.value,
+            "confidence": insight.confidence_score,
+            "urgency": insight.urgency.value,
+            "sla": sla,
+        }
     )
 
     return routed_alert
 
 
+@timed_stage("route")
+@traced("route_all")
 def route_all(result: ExtractionResult) -> list[RoutedAlert]:
     """
     Routes all insights from an ExtractionResult.
     Returns list of RoutedAlerts sorted by urgency (CRITICAL first).
     """
+    current_span().set_attributes(
+        transcript_id=result.metadata.transcript_id, insights=len(result.insights)
+    )
     alerts = []
     for insight in result.insights:
         alert = route_insight(insight, result.metadata)
         alerts.append(alert)
 
-    # Sort: CRITICAL → HIGH → MEDIUM → LOW
-    urgency_order = {
-        UrgencyLevel.CRITICAL: 0,
-        UrgencyLevel.HIGH:     1,
-        UrgencyLevel.MEDIUM:   2,
-        UrgencyLevel.LOW:      3
-    }
-    alerts.sort(key=lambda a: urgency_order.get(a.urgency, 99))
+    return sort_alerts_by_urgency(alerts)
 
+
+# Sort: CRITICAL → HIGH → MEDIUM → LOW
+URGENCY_ORDER = {
+    UrgencyLevel.CRITICAL: 0,
+    UrgencyLevel.HIGH:     1,
+    UrgencyLevel.MEDIUM:   2,
+    UrgencyLevel.LOW:      3
+}
+
+
+def sort_alerts_by_urgency(alerts: list[RoutedAlert]) -> list[RoutedAlert]:
+    """
+    Sorts alerts in place, CRITICAL first, and returns the same list.
+    Used by route_all() and by the streaming path, which routes one
+    insight at a time and sorts only for the final summary.
+    """
+    alerts.sort(key=lambda a: URGENCY_ORDER.get(a.urgency, 99))
     return alerts
 
 
@@ -107,6 +144,7 @@ def route_all(result: ExtractionResult) -> list[RoutedAlert]:
 # ALERT FORMATTERS
 # ─────────────────────────────────────────────────────────────
 
+@timed_stage("format")
 def format_alert_terminal(alert: RoutedAlert) -> str:
     """
     Formats a RoutedAlert for terminal display during the live demo.
@@ -197,39 +235,44 @@ def format_csm_confirmation(alert: RoutedAlert) -> str:
     )
 
 
+def alert_to_dict(alert: RoutedAlert) -> dict:
+    """
+    Converts one RoutedAlert to the plain-dict shape used by every JSON output.
+    """
+    return {
+        "alert_id":         alert.alert_id,
+        "destination":      alert.destination.value,
+        "urgency":          alert.urgency.value,
+        "response_sla":     alert.response_sla,
+        "requires_response": alert.requires_response,
+        "insight": {
+            "type":             alert.insight.insight_type.value,
+            "summary":          alert.insight.summary,
+            "verbatim_quote":   alert.insight.verbatim_quote,
+            "sentiment":        alert.insight.sentiment.value,
+            "confidence_score": alert.insight.confidence_score,
+            "suggested_action": alert.insight.suggested_action,
+            "competitor_named":  alert.insight.competitor_named,
+            "feature_requested": alert.insight.feature_requested,
+            "bug_description":   alert.insight.bug_description,
+        },
+        "account": {
+            "name":         alert.metadata.account_name,
+            "csm":          alert.metadata.csm_name,
+            "call_date":    alert.metadata.call_date,
+            "arr":          alert.metadata.account_arr,
+            "renewal_date": alert.metadata.renewal_date,
+        }
+    }
+
+
+@timed_stage("format")
 def format_alerts_as_json(alerts: list[RoutedAlert]) -> str:
     """
     Serializes all routed alerts to JSON for downstream system integration.
     Production use: post to Slack webhook, write to database, trigger email.
     """
-    output = []
-    for alert in alerts:
-        output.append({
-            "alert_id":         alert.alert_id,
-            "destination":      alert.destination.value,
-            "urgency":          alert.urgency.value,
-            "response_sla":     alert.response_sla,
-            "requires_response": alert.requires_response,
-            "insight": {
-                "type":             alert.insight.insight_type.value,
-                "summary":          alert.insight.summary,
-                "verbatim_quote":   alert.insight.verbatim_quote,
-                "sentiment":        alert.insight.sentiment.value,
-                "confidence_score": alert.insight.confidence_score,
-                "suggested_action": alert.insight.suggested_action,
-                "competitor_named":  alert.insight.competitor_named,
-                "feature_requested": alert.insight.feature_requested,
-                "bug_description":   alert.insight.bug_description,
-            },
-            "account": {
-                "name":         alert.metadata.account_name,
-                "csm":          alert.metadata.csm_name,
-                "call_date":    alert.metadata.call_date,
-                "arr":          alert.metadata.account_arr,
-                "renewal_date": alert.metadata.renewal_date,
-            }
-        })
-    return json.dumps(output, indent=2)
+    return json.dumps([alert_to_dict(alert) for alert in alerts], indent=2)
 
 
 # ─────────────────────────────────────────────────────────────
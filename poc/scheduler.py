@@ -0,0 +1,421 @@
+"""
+scheduler.py — Rate-Limit-Aware Request Scheduler
+==================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Sits in front of client.messages.create and keeps a batch run just under the
+org's rate limits instead of oscillating between idle and 429 storms:
+
+    1. Token buckets — requests/min, input tokens/min, output tokens/min
+    2. Reservation   — input estimated from prompt size, output = max_tokens
+    3. Reconcile     — refund the difference once message.usage is known
+    4. Retry         — 429 / 529 / 5xx / timeouts, honouring Retry-After,
+                       otherwise jittered exponential backoff
+    5. Adapt         — halve in-flight concurrency on a rate-limit error,
+                       grow it back by one slot per window of successes (AIMD)
+
+Design Decision: Wrap the client, don't thread a scheduler through every call.
+Reason: ScheduledClient exposes the same .messages.create as the SDK client,
+        so extract_insights_async(), chunking and the batch runner use it
+        unchanged. messages.stream is scheduled too: opening the stream (the
+        HTTP request, where 429 / 529 surface) is admitted and retried like
+        create, and its slot is held until the stream closes. Anything else
+        (batches, model listing) passes through to the inner client.
+
+Design Decision: Loop-agnostic waiting (threading.Lock + asyncio.sleep polling).
+Reason: The single-transcript path runs a fresh event loop per call via
+        asyncio.run(). asyncio primitives bind to one loop; a scheduler shared
+        across runs must not.
+"""
+
+import time
+import random
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+from error_handler import is_retryable_api_error, is_rate_limit_error, retry_after_seconds
+from tracing import current_span
+
+logger = logging.getLogger("jtbd.scheduler")
+
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BASE_DELAY = 1.0        # Seconds — first backoff step
+DEFAULT_MAX_DELAY = 60.0        # Seconds — backoff ceiling
+CHARS_PER_TOKEN = 4             # Rough input-token estimate for reservations
+POLL_INTERVAL = 0.05            # Seconds between capacity checks
+
+
+# ─────────────────────────────────────────────────────────────
+# TOKEN BUCKET
+# ─────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at capacity_per_minute / 60 per second.
+    The balance may go negative after reconciliation — later requests then
+    wait for the overdraft to refill, which is exactly what the server does.
+    """
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, amount: float) -> float:
+        """
+        Takes `amount` if available and returns 0. Otherwise takes nothing
+        and returns the seconds until it would be available.
+        Requests larger than the bucket are capped at a full bucket.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """Refunds (positive) or charges (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+
+# ─────────────────────────────────────────────────────────────
+# ADAPTIVE CONCURRENCY (AIMD)
+# ─────────────────────────────────────────────────────────────
+
+class AdaptiveConcurrency:
+    """
+    In-flight request limiter with additive-increase / multiplicative-decrease.
+    Rate-limit errors halve the limit; each success adds 1/limit, so the
+    limit grows by about one slot per full window of successful requests.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight < max(self.min_limit, int(self.limit)):
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+
+    def on_rate_limited(self) -> None:
+        with self._lock:
+            self.limit = max(self.min_limit, self.limit / 2.0)
+        logger.warning(f"Rate limited — concurrency limit reduced to {int(self.limit)}")
+
+
+# ─────────────────────────────────────────────────────────────
+# SCHEDULER
+# ─────────────────────────────────────────────────────────────
+
+def estimate_input_tokens(request: dict) -> int:
+    """
+    Rough input-token estimate from the characters in system + messages.
+    Only used for reservations; actual usage is reconciled afterwards.
+    """
+    def chars(content) -> int:
+        if isinstance(content, str):
+            return len(content)
+        if isinstance(content, list):
+            return sum(chars(block.get("text", "")) if isinstance(block, dict) else 0
+                       for block in content)
+        return 0
+
+    total = chars(request.get("system", ""))
+    for message in request.get("messages", []):
+        total += chars(message.get("content", ""))
+    return max(1, total // CHARS_PER_TOKEN)
+
+
+class RateLimitScheduler:
+    """
+    Admission control + retry policy for Messages API calls.
+    Limits left as None are not enforced (retries and AIMD still apply).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        input_tokens_per_minute: Optional[float] = None,
+        output_tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY
+    ):
+        self.rpm = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.itpm = TokenBucket(input_tokens_per_minute) if input_tokens_per_minute else None
+        self.otpm = TokenBucket(output_tokens_per_minute) if output_tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    # ─────────────────────────────────────────────────────────
+    # ADMISSION
+    # ─────────────────────────────────────────────────────────
+
+    async def _acquire(self, input_tokens: int, output_tokens: int) -> None:
+        """
+        Waits for a concurrency slot and for every bucket to cover the request.
+        Buckets are taken one at a time; if a later bucket is short, earlier
+        takes are refunded so no capacity is held while waiting.
+        """
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            if not self.concurrency.try_acquire():
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+
+            wait = 0.0
+            taken = []
+            for bucket, amount in ((self.rpm, 1), (self.itpm, input_tokens),
+                                   (self.otpm, output_tokens)):
+                if bucket is None:
+                    continue
+                wait = bucket.try_take(amount)
+                if wait > 0:
+                    break
+                taken.append((bucket, amount))
+
+            if wait <= 0:
+                return
+
+            for bucket, amount in taken:
+                bucket.adjust(min(amount, bucket.capacity))
+            self.concurrency.release()
+            await asyncio.sleep(min(max(wait, POLL_INTERVAL), 1.0))
+
+    def _reconcile(self, message, input_estimate: int, output_reserved: int) -> None:
+        """Adjusts token buckets from the reservation to actual message.usage."""
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        actual_input = (
+            (getattr(usage, "input_tokens", 0) or 0)
+            + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+            + (getattr(usage, "cache_read_input_tokens", 0) or 0)
+        )
+        if self.itpm is not None:
+            self.itpm.adjust(input_estimate - actual_input)
+        if self.otpm is not None:
+            self.otpm.adjust(output_reserved - (getattr(usage, "output_tokens", 0) or 0))
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform(0, min(max, base * 2^attempt))."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    # ─────────────────────────────────────────────────────────
+    # SUBMIT
+    # ─────────────────────────────────────────────────────────
+
+    async def submit(self, send: Callable[[], Awaitable], request: dict, hold_slot: bool = False):
+        """
+        Runs `send()` (one Messages API call for `request`) under the rate
+        limits, retrying retryable failures. Returns the API message.
+        Non-retryable errors, or the last retryable one, are re-raised.
+
+        hold_slot=True (streams): on success the concurrency slot stays taken
+        and nothing is reconciled — the caller ends the call with release_held().
+        """
+        input_estimate = estimate_input_tokens(request)
+        output_reserved = int(request.get("max_tokens", 0))
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(input_estimate, output_reserved)
+            with self._lock:
+                self.requests += 1
+            try:
+                message = await send()
+            except Exception as e:
+                self.concurrency.release()
+                if not is_retryable_api_error(e) or attempt == self.max_retries:
+                    raise
+
+                hinted = retry_after_seconds(e)
+                delay = hinted if hinted is not None else self._backoff(attempt)
+                with self._lock:
+                    self.retries += 1
+                if is_rate_limit_error(e):
+                    with self._lock:
+                        self.rate_limited += 1
+                        # Limits are org-wide: every caller waits out Retry-After
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    self.concurrency.on_rate_limited()
+
+                # Recorded on the caller's span (the api_call that is waiting)
+                active = current_span()
+                active.incr("retries")
+                active.add_event(
+                    "retry", attempt=attempt + 1, error=type(e).__name__,
+                    delay_s=round(delay, 3), retry_after=hinted is not None
+                )
+                logger.warning(
+                    f"Retryable API error ({type(e).__name__}) — retry "
+                    f"{attempt + 1}/{self.max_retries} in {delay:.2f}s"
+                    f"{' (Retry-After)' if hinted is not None else ''}"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if hold_slot:
+                return message
+            self.concurrency.release()
+            self.concurrency.on_success()
+            self._reconcile(message, input_estimate, output_reserved)
+            return message
+
+    def release_held(self, request: dict, message=None) -> None:
+        """
+        Ends a call admitted with hold_slot=True: frees its slot and, given
+        the final message, counts a success and reconciles its usage.
+        """
+        self.concurrency.release()
+        if message is not None:
+            self.concurrency.on_success()
+            self._reconcile(message, estimate_input_tokens(request), int(request.get("max_tokens", 0)))
+
+    def summary(self) -> str:
+        """One-line scheduler summary for end-of-run output."""
+        return (
+            f"Scheduler: {self.requests} requests | {self.retries} retries | "
+            f"{self.rate_limited} rate-limited | "
+            f"concurrency limit {int(self.concurrency.limit)}/{self.concurrency.max_limit}"
+        )
+
+
+# ─────────────────────────────────────────────────────────────
+# CLIENT WRAPPER
+# ─────────────────────────────────────────────────────────────
+
+class _ScheduledMessages:
+    """messages resource whose create() goes through the scheduler."""
+
+    def __init__(self, messages, scheduler: RateLimitScheduler):
+        self._messages = messages
+        self._scheduler = scheduler
+
+    async def create(self, **request):
+        if inspect.iscoroutinefunction(inspect.unwrap(self._messages.create)):
+            send = lambda: self._messages.create(**request)
+        else:
+            send = lambda: asyncio.to_thread(self._messages.create, **request)
+        return await self._scheduler.submit(send, request)
+
+    def stream(self, **request) -> "_ScheduledStream":
+        return _ScheduledStream(self._messages, self._scheduler, request)
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class _ScheduledStream:
+    """
+    Stand-in for the SDK's stream manager (`with` or `async with`).
+    Entering opens the stream through the scheduler — admission, retries,
+    Retry-After — and the slot is held until exit. Errors after the stream
+    has opened are not retried: its text may already have been consumed.
+    """
+
+    def __init__(self, messages, scheduler: RateLimitScheduler, request: dict):
+        self._messages = messages
+        self._scheduler = scheduler
+        self._request = request
+        self._manager = None
+        self._stream = None
+
+    def _open(self):
+        manager = self._messages.stream(**self._request)
+        return manager, manager.__enter__()
+
+    async def _open_async(self):
+        manager = self._messages.stream(**self._request)
+        return manager, await manager.__aenter__()
+
+    def _final_message(self, exc_type):
+        # The snapshot is complete once the stream has been read to the end
+        if exc_type is not None:
+            return None
+        return getattr(self._stream, "current_message_snapshot", None)
+
+    def __enter__(self):
+        # The streaming path is synchronous; run one admission + retry loop for the open
+        self._manager, self._stream = asyncio.run(self._scheduler.submit(
+            lambda: asyncio.to_thread(self._open), self._request, hold_slot=True
+        ))
+        return self._stream
+
+    def __exit__(self, exc_type, exc, tb):
+        final = self._final_message(exc_type)
+        try:
+            return self._manager.__exit__(exc_type, exc, tb)
+        finally:
+            self._scheduler.release_held(self._request, final)
+
+    async def __aenter__(self):
+        self._manager, self._stream = await self._scheduler.submit(
+            self._open_async, self._request, hold_slot=True
+        )
+        return self._stream
+
+    async def __aexit__(self, exc_type, exc, tb):
+        final = self._final_message(exc_type)
+        try:
+            return await self._manager.__aexit__(exc_type, exc, tb)
+        finally:
+            self._scheduler.release_held(self._request, final)
+
+
+class ScheduledClient:
+    """
+    Drop-in wrapper for anthropic.Anthropic / anthropic.AsyncAnthropic.
+    Build the inner client with max_retries=0 so retries happen here, once,
+    with rate-limit awareness — not stacked on top of the SDK's own retries.
+    """
+
+    def __init__(self, client, scheduler: RateLimitScheduler):
+        self._client = client
+        self.scheduler = scheduler
+        self.messages = _ScheduledMessages(client.messages, scheduler)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
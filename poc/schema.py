@@ -12,12 +12,29 @@ Design Decision: Pydantic-style dataclasses over raw dicts.
 Reason: Makes prompt output validation explicit and self-documenting.
         When the model returns unexpected structure, we catch it here —
         not silently downstream.
+
+Design Decision: Slotted dataclasses, interned repeated strings.
+Reason: A day of alerts held for aggregation is millions of objects. Slots
+        drop the per-instance __dict__; CSM, account, date and ARR strings
+        repeat across every call with the same account, so each distinct
+        value is stored once. CallMetadata is frozen because every alert
+        of a call holds a reference to the same instance.
+
+Design Decision: InsightTable is columnar and numpy is optional.
+Reason: Dashboard roll-ups over millions of insights are one vectorized pass
+        over small integer codes, not a loop over dataclasses. numpy is only
+        imported when a table is built, so the CLI neither needs it nor pays
+        its import time.
 """
 
-from dataclasses import dataclass, field
-from typing import Optional
+import sys
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Iterable, Optional
 from enum import Enum
 
+if TYPE_CHECKING:
+    import numpy
+
 
 # ─────────────────────────────────────────────────────────────
 # ENUMS — Controlled Vocabularies
@@ -71,7 +88,12 @@ class UrgencyLevel(str, Enum):
 # CORE DATA STRUCTURES
 # ─────────────────────────────────────────────────────────────
 
-@dataclass
+def _intern(value: Optional[str]) -> Optional[str]:
+    """sys.intern() for exact str values; None and anything else pass through."""
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(slots=True)
 class ExtractedInsight:
     """
     A single structured insight extracted from a call transcript.
@@ -98,8 +120,13 @@ class ExtractedInsight:
     action_required:    bool            # True = recipient must respond
     suggested_action:   Optional[str]   # What the recipient should do
 
+    def __post_init__(self):
+        # Competitor and feature names repeat across calls; free text does not
+        self.competitor_named = _intern(self.competitor_named)
+        self.feature_requested = _intern(self.feature_requested)
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CallMetadata:
     """
     Context envelope around the transcript.
@@ -117,8 +144,12 @@ class CallMetadata:
     call_duration:  Optional[str]
     transcript_id:  str
 
+    def __post_init__(self):
+        for name in ("csm_name", "account_name", "account_arr", "renewal_date", "call_date", "call_duration"):
+            object.__setattr__(self, name, _intern(getattr(self, name)))
 
-@dataclass
+
+@dataclass(slots=True)
 class ExtractionResult:
     """
     The full output of one transcript processing run.
@@ -130,9 +161,10 @@ class ExtractionResult:
     high_confidence:    int             # Count of insights >= 0.75
     routed_to_review:   int             # Count of insights < 0.75
     processing_note:    Optional[str]   # Any anomalies or edge cases flagged
+    model_tier:         Optional[str] = None    # Cascade tier that produced the insights
 
 
-@dataclass
+@dataclass(slots=True)
 class RoutedAlert:
     """
     The final structured alert delivered to a stakeholder.
@@ -199,3 +231,283 @@ CRITICAL_SLA = "4 hours"
 
 # Confidence threshold for auto-routing vs human review
 CONFIDENCE_THRESHOLD = 0.75
+
+
+# ─────────────────────────────────────────────────────────────
+# COLUMNAR INSIGHT TABLE
+# Enum columns are stored as uint8 codes — a member's position in its enum
+# ─────────────────────────────────────────────────────────────
+
+_CATEGORICAL: dict[str, tuple[Enum, ...]] = {
+    "insight_type":     tuple(InsightType),
+    "sentiment":        tuple(SentimentLabel),
+    "urgency":          tuple(UrgencyLevel),
+    "routing_target":   tuple(RoutingDestination),
+}
+_CODES: dict[str, dict[Enum, int]] = {
+    name: {member: code for code, member in enumerate(members)}
+    for name, members in _CATEGORICAL.items()
+}
+_TEXT_COLUMNS = (
+    "summary", "verbatim_quote", "competitor_named",
+    "feature_requested", "bug_description", "suggested_action",
+)
+_HUMAN_REVIEW_CODE = _CODES["routing_target"][RoutingDestination.HUMAN_REVIEW]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("InsightTable requires numpy: pip install numpy") from e
+    return numpy
+
+
+@dataclass(slots=True, eq=False)
+class InsightTable:
+    """
+    Column-per-field form of a list of ExtractedInsights, for bulk analytics.
+
+        table = InsightTable.from_results(results)
+        table.count_by("account", "urgency")              # {(account, UrgencyLevel): n}
+        table.where(insight_type=InsightType.CHURN_SIGNAL, min_confidence=0.9)
+        table.rescore(0.8).count_by("routing_target")     # what a new threshold would do
+
+    Enum columns are uint8 codes, confidence_score is float64 and
+    action_required is bool. Free-text columns are object arrays that
+    reference the insights' own str objects — building a table, filtering
+    it or converting it back never copies a string. `account` indexes
+    into `accounts`, so every insight can be rolled up by account.
+    """
+    insight_type:       "numpy.ndarray"
+    sentiment:          "numpy.ndarray"
+    urgency:            "numpy.ndarray"
+    routing_target:     "numpy.ndarray"
+    confidence_score:   "numpy.ndarray"
+    action_required:    "numpy.ndarray"
+    summary:            "numpy.ndarray"
+    verbatim_quote:     "numpy.ndarray"
+    competitor_named:   "numpy.ndarray"
+    feature_requested:  "numpy.ndarray"
+    bug_description:    "numpy.ndarray"
+    suggested_action:   "numpy.ndarray"
+    account:            "numpy.ndarray"             # int32 index into accounts
+    accounts:           tuple[Optional[str], ...] = (None,)
+
+    def __post_init__(self):
+        rows = len(self.confidence_score)
+        for name in self._columns():
+            if len(getattr(self, name)) != rows:
+                raise ValueError(f"column '{name}' has {len(getattr(self, name))} rows, expected {rows}")
+
+    @staticmethod
+    def _columns() -> tuple[str, ...]:
+        return (*_CATEGORICAL, "confidence_score", "action_required", *_TEXT_COLUMNS, "account")
+
+    def __len__(self) -> int:
+        return len(self.confidence_score)
+
+    # ─────────────────────────────────────────────────────────
+    # CONVERSION
+    # ─────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_insights(
+        cls,
+        insights: list[ExtractedInsight],
+        account_name: Optional[str] = None
+    ) -> "InsightTable":
+        """Builds a table from validated insights, all attributed to `account_name`."""
+        np = _numpy()
+        rows = len(insights)
+
+        def text(name: str) -> "numpy.ndarray":
+            column = np.empty(rows, dtype=object)
+            column[:] = [getattr(insight, name) for insight in insights]
+            return column
+
+        columns: dict[str, Any] = {
+            name: np.fromiter((codes[getattr(insight, name)] for insight in insights), dtype=np.uint8, count=rows)
+            for name, codes in _CODES.items()
+        }
+        columns["confidence_score"] = np.fromiter(
+            (insight.confidence_score for insight in insights), dtype=np.float64, count=rows
+        )
+        columns["action_required"] = np.fromiter(
+            (insight.action_required for insight in insights), dtype=bool, count=rows
+        )
+        for name in _TEXT_COLUMNS:
+            columns[name] = text(name)
+        return cls(**columns, account=np.zeros(rows, dtype=np.int32), accounts=(account_name,))
+
+    @classmethod
+    def from_results(cls, results: Iterable[ExtractionResult]) -> "InsightTable":
+        """Builds one table from many calls, with each insight attributed to its call's account."""
+        np = _numpy()
+        insights: list[ExtractedInsight] = []
+        account_codes: list[int] = []
+        accounts: dict[str, int] = {}
+        for result in results:
+            code = accounts.setdefault(result.metadata.account_name, len(accounts))
+            insights.extend(result.insights)
+            account_codes.extend([code] * len(result.insights))
+        if not accounts:
+            return cls.from_insights(insights)
+        return replace(
+            cls.from_insights(insights),
+            account=np.array(account_codes, dtype=np.int32),
+            accounts=tuple(accounts),
+        )
+
+    def to_insights(self) -> list[ExtractedInsight]:
+        """Inverse of from_insights(). Text fields are the same str objects, not copies."""
+        enums = [
+            [members[code] for code in getattr(self, name).tolist()]
+            for name, members in _CATEGORICAL.items()
+        ]
+        return [
+            ExtractedInsight(
+                insight_type=insight_type,
+                summary=summary,
+                verbatim_quote=verbatim_quote,
+                sentiment=sentiment,
+                urgency=urgency,
+                confidence_score=confidence_score,
+                routing_target=routing_target,
+                competitor_named=competitor_named,
+                feature_requested=feature_requested,
+                bug_description=bug_description,
+                action_required=action_required,
+                suggested_action=suggested_action,
+            )
+            for (insight_type, sentiment, urgency, routing_target, confidence_score, action_required,
+                 summary, verbatim_quote, competitor_named, feature_requested, bug_description,
+                 suggested_action) in zip(
+                *enums, self.confidence_score.tolist(), self.action_required.tolist(),
+                *(getattr(self, name) for name in _TEXT_COLUMNS),
+            )
+        ]
+
+    # ─────────────────────────────────────────────────────────
+    # FILTERS
+    # ─────────────────────────────────────────────────────────
+
+    def take(self, rows: "numpy.ndarray") -> "InsightTable":
+        """Rows selected by a boolean mask or an index array."""
+        return replace(self, **{name: getattr(self, name)[rows] for name in self._columns()})
+
+    def mask(
+        self,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        **equals
+    ) -> "numpy.ndarray":
+        """
+        Boolean row mask. `equals` maps a categorical column (or "account")
+        to one value or a collection of values, e.g.
+            mask(urgency=[UrgencyLevel.HIGH, UrgencyLevel.CRITICAL], min_confidence=0.75)
+        """
+        np = _numpy()
+        selected = np.ones(len(self), dtype=bool)
+        for name, wanted in equals.items():
+            values = [wanted] if isinstance(wanted, (str, Enum)) or wanted is None else list(wanted)
+            codes = [self._code(name, value) for value in values]
+            selected &= np.isin(getattr(self, name), [code for code in codes if code is not None])
+        if min_confidence is not None:
+            selected &= self.confidence_score >= min_confidence
+        if max_confidence is not None:
+            selected &= self.confidence_score <= max_confidence
+        return selected
+
+    def where(
+        self,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        **equals
+    ) -> "InsightTable":
+        """take(mask(...)) — the matching rows as a new table."""
+        return self.take(self.mask(min_confidence, max_confidence, **equals))
+
+    def _code(self, name: str, value) -> Optional[int]:
+        if name == "account":
+            return self.accounts.index(value) if value in self.accounts else None
+        if name not in _CODES:
+            raise ValueError(f"cannot filter on '{name}' — use one of {(*_CATEGORICAL, 'account')}")
+        members = _CATEGORICAL[name]
+        return _CODES[name][type(members[0])(value)]
+
+    # ─────────────────────────────────────────────────────────
+    # GROUP-BYS
+    # ─────────────────────────────────────────────────────────
+
+    def _group_keys(self, columns: tuple[str, ...]) -> tuple["numpy.ndarray", list[int], list[tuple]]:
+        np = _numpy()
+        if not columns:
+            raise ValueError("group by at least one column")
+        labels = []
+        for name in columns:
+            if name == "account":
+                labels.append(self.accounts)
+            elif name in _CATEGORICAL:
+                labels.append(_CATEGORICAL[name])
+            else:
+                raise ValueError(f"cannot group by '{name}' — use one of {(*_CATEGORICAL, 'account')}")
+        sizes = [len(values) for values in labels]
+        key = np.zeros(len(self), dtype=np.int64)
+        for name, size in zip(columns, sizes):
+            key = key * size + getattr(self, name)
+        return key, sizes, labels
+
+    def _label(self, flat: int, sizes: list[int], labels: list[tuple]):
+        np = _numpy()
+        parts = tuple(values[i] for values, i in zip(labels, np.unravel_index(flat, sizes)))
+        return parts if len(parts) > 1 else parts[0]
+
+    def count_by(self, *columns: str) -> dict:
+        """
+        Rows per combination of column values, non-empty groups only.
+        One column → {value: n}; several → {(value, value, ...): n}.
+        """
+        np = _numpy()
+        key, sizes, labels = self._group_keys(columns)
+        counts = np.bincount(key, minlength=int(np.prod(sizes)))
+        return {
+            self._label(flat, sizes, labels): int(counts[flat])
+            for flat in np.flatnonzero(counts).tolist()
+        }
+
+    def mean_confidence_by(self, *columns: str) -> dict:
+        """Mean confidence_score per group, keyed like count_by()."""
+        np = _numpy()
+        key, sizes, labels = self._group_keys(columns)
+        groups = int(np.prod(sizes))
+        counts = np.bincount(key, minlength=groups)
+        sums = np.bincount(key, weights=self.confidence_score, minlength=groups)
+        return {
+            self._label(flat, sizes, labels): float(sums[flat] / counts[flat])
+            for flat in np.flatnonzero(counts).tolist()
+        }
+
+    # ─────────────────────────────────────────────────────────
+    # THRESHOLD RE-EVALUATION
+    # ─────────────────────────────────────────────────────────
+
+    def rescore(self, threshold: float = CONFIDENCE_THRESHOLD) -> "InsightTable":
+        """
+        routing_target recomputed as validation would under `threshold`:
+        the type's primary destination, or Human Review below it. Every
+        other column is shared with this table, not copied.
+        """
+        np = _numpy()
+        primary = np.array([
+            _CODES["routing_target"][ROUTING_RULES.get(insight_type, {}).get("primary", RoutingDestination.HUMAN_REVIEW)]
+            for insight_type in _CATEGORICAL["insight_type"]
+        ], dtype=np.uint8)
+        routing = np.where(
+            self.confidence_score < threshold, np.uint8(_HUMAN_REVIEW_CODE), primary[self.insight_type]
+        ).astype(np.uint8, copy=False)
+        return replace(self, routing_target=routing)
+
+    def review_count(self, threshold: float = CONFIDENCE_THRESHOLD) -> int:
+        """Insights that would go to the Human Review Queue under `threshold`."""
+        return int((self.confidence_score < threshold).sum())
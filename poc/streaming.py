@@ -0,0 +1,301 @@
+"""
+streaming.py — Streaming Extraction + Immediate Routing
+========================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+Routes each insight the moment the model finishes writing it:
+    1. Stream the extraction response (Messages streaming API)
+    2. Feed text deltas into IncrementalInsightParser
+    3. Each completed object in the "insights" array → validate_insight_dict
+    4. Valid insight → route_insight → on_alert callback, immediately
+    5. Stream ends → processing_note, cache write, local repair / fallback
+       only if nothing usable came through
+
+Design Decision: Route per insight, not per response.
+Reason: The model tends to emit the most severe finding first. Waiting for
+        a full 4096-token response means a CRITICAL churn signal sits behind
+        every trailing positive_signal. Time-to-first-alert should be the
+        time to generate the first insight — not the whole answer.
+
+Design Decision: A bad insight is skipped, not fatal.
+Reason: Alerts already delivered cannot be recalled. An invalid insight
+        mid-stream is logged through handle_validation_failure() and the
+        stream continues. The fallback call is reserved for the case where
+        nothing valid came out at all.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    import anthropic        # Annotations only — main.make_client() imports the SDK
+
+from schema import CallMetadata, ExtractedInsight, RoutedAlert
+from prompts import build_system_blocks, build_extraction_content, PROMPT_VERSION
+from cache import ExtractionCache
+from error_handler import (
+    validate_insight_dict,
+    strip_markdown_fences,
+    parse_with_local_repair,
+    handle_validation_failure,
+    handle_api_error,
+    ExtractionValidationError
+)
+from router import route_insight, sort_alerts_by_urgency
+from main import (
+    EXTRACTION_MODEL,
+    MOCK_API_RESPONSE,
+    log_usage,
+    record_usage,
+    size_max_tokens,
+    continue_truncated_async,
+    fallback_extraction_async
+)
+
+logger = logging.getLogger("jtbd.streaming")
+
+# Chunk size used to replay mock / cached responses through the parser
+REPLAY_CHUNK_CHARS = 64
+
+
+# ─────────────────────────────────────────────────────────────
+# INCREMENTAL JSON PARSER
+# ─────────────────────────────────────────────────────────────
+
+class IncrementalInsightParser:
+    """
+    Yields each completed object of the top-level "insights" array
+    as soon as its closing brace arrives.
+
+    A small character scanner tracks string/escape state and nesting depth,
+    so braces inside summaries or quotes never confuse it. Anything before
+    the first '{' (stray prose, ```json fences) is ignored.
+
+    Depth map for the expected contract:
+        1 — inside the top-level object ("insights", "processing_note")
+        2 — inside the insights array
+        3 — inside one insight object  ← sliced + json.loads'd on close
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.array_found = False
+        self.array_closed = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._in_array = False
+        self._obj_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Appends a text delta and returns any insight objects it completed.
+        """
+        self.text += chunk
+        text = self.text
+        completed = []
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._depth == 0 and ch != "{":
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == "{" or ch == "[":
+                self._depth += 1
+                if (ch == "[" and self._depth == 2 and not self.array_found
+                        and self._last_key == "insights"):
+                    self._in_array = True
+                    self.array_found = True
+                elif ch == "{" and self._in_array and self._depth == 3:
+                    self._obj_start = i
+            elif ch == "}" or ch == "]":
+                if ch == "}" and self._in_array and self._depth == 3 \
+                        and self._obj_start is not None:
+                    raw = text[self._obj_start:i + 1]
+                    self._obj_start = None
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Streamed insight could not be parsed: {e}")
+                elif ch == "]" and self._in_array and self._depth == 2:
+                    self._in_array = False
+                    self.array_closed = True
+                self._depth -= 1
+
+        self._pos = len(text)
+        return completed
+
+
+# ─────────────────────────────────────────────────────────────
+# STREAMING PIPELINE
+# ─────────────────────────────────────────────────────────────
+
+def stream_extract_and_route(
+    transcript: str,
+    metadata: CallMetadata,
+    client: Optional[anthropic.Anthropic],
+    mock: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    on_alert: Optional[Callable[[RoutedAlert], None]] = None
+) -> tuple[list[RoutedAlert], list[ExtractedInsight], Optional[str]]:
+    """
+    Streams the primary extraction and routes each insight as it completes.
+    `on_alert` is called once per RoutedAlert, in generation order.
+
+    Returns: (alerts sorted CRITICAL first, validated_insights, processing_note)
+    """
+    started = time.perf_counter()
+    parser = IncrementalInsightParser()
+    insights: list[ExtractedInsight] = []
+    alerts: list[RoutedAlert] = []
+    rejected = 0
+
+    def route_one(insight: ExtractedInsight) -> None:
+        alert = route_insight(insight, metadata)
+        if not alerts:
+            logger.info(
+                f"First alert routed {time.perf_counter() - started:.2f}s after request start"
+            )
+        insights.append(insight)
+        alerts.append(alert)
+        if on_alert is not None:
+            on_alert(alert)
+
+    def consume(chunk: str) -> None:
+        nonlocal rejected
+        for raw in parser.feed(chunk):
+            index = len(insights) + rejected
+            try:
+                route_one(validate_insight_dict(raw, index))
+            except ExtractionValidationError as e:
+                handle_validation_failure(e, attempt=1)
+                rejected += 1
+
+    def replay(text: str) -> None:
+        for i in range(0, len(text), REPLAY_CHUNK_CHARS):
+            consume(text[i:i + REPLAY_CHUNK_CHARS])
+
+    # 1. Stream (or replay) the primary response
+    max_tokens = size_max_tokens(transcript)
+    cache_key = None
+    cached = None
+    if not mock and cache is not None:
+        cache_key = cache.make_key(
+            transcript, metadata.csm_name, metadata.account_name,
+            metadata.call_date, EXTRACTION_MODEL, max_tokens
+        )
+        if not refresh:
+            cached = cache.get(cache_key)
+
+    if mock:
+        logger.info("MOCK MODE — replaying pre-loaded response as a stream")
+        replay(MOCK_API_RESPONSE)
+    elif cached is not None:
+        logger.info(f"Cache hit — replaying cached response | Transcript: {metadata.transcript_id}")
+        replay(cached)
+    else:
+        logger.info(
+            f"Streaming Anthropic API | Model: {EXTRACTION_MODEL} | "
+            f"Prompt version: {PROMPT_VERSION}"
+        )
+        content = build_extraction_content(
+            transcript=transcript,
+            csm_name=metadata.csm_name,
+            account_name=metadata.account_name,
+            call_date=metadata.call_date
+        )
+        request = dict(
+            model=EXTRACTION_MODEL,
+            max_tokens=max_tokens,
+            system=build_system_blocks(),
+            messages=[{"role": "user", "content": content}]
+        )
+        try:
+            with client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    consume(text)
+                final_message = stream.get_final_message()
+                log_usage("Streaming API call complete", final_message)
+                record_usage(EXTRACTION_MODEL, final_message)
+
+            # Stopped on max_tokens: finish the same JSON instead of falling back
+            if getattr(final_message, "stop_reason", None) == "max_tokens":
+                streamed = parser.text.rstrip()
+                stitched, _ = asyncio.run(continue_truncated_async(
+                    client, request, streamed, final_message, "Streaming API call"
+                ))
+                consume(stitched[len(streamed):])
+        except Exception as e:
+            handle_api_error(e, metadata.transcript_id)
+            raise
+
+        if cache is not None:
+            cache.put(
+                cache_key, parser.text,
+                model=EXTRACTION_MODEL, transcript_id=metadata.transcript_id
+            )
+
+    # 2. Processing note from the complete response
+    processing_note = None
+    parse_failed = False
+    try:
+        parsed = json.loads(strip_markdown_fences(parser.text))
+        processing_note = parsed.get("processing_note")
+    except (json.JSONDecodeError, AttributeError):
+        parse_failed = True
+
+    # 3. Local repair, then fallback, only if the stream produced nothing usable
+    if not insights and parse_failed:
+        try:
+            repaired_insights, processing_note = parse_with_local_repair(parser.text)
+            for insight in repaired_insights:
+                route_one(insight)
+            parse_failed = False
+        except (json.JSONDecodeError, ExtractionValidationError):
+            pass
+
+    if not insights and (parse_failed or rejected or not parser.array_found):
+        logger.warning("Streaming extraction produced no valid insights — attempting fallback")
+        fallback_insights, processing_note = asyncio.run(fallback_extraction_async(
+            transcript, metadata, client, parser.text,
+            mock=mock, cache=cache, refresh=refresh
+        ))
+        for insight in fallback_insights:
+            route_one(insight)
+    elif parse_failed or rejected:
+        note = (
+            f"STREAMED PARTIAL: {len(insights)} insights routed, "
+            f"{rejected} rejected{', response JSON incomplete' if parse_failed else ''}."
+        )
+        processing_note = f"{note} {processing_note or ''}".strip()
+
+    logger.info(
+        f"Streaming extraction complete — {len(insights)} insights routed in "
+        f"{time.perf_counter() - started:.2f}s"
+    )
+    return sort_alerts_by_urgency(alerts), insights, processing_note
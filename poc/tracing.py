@@ -0,0 +1,332 @@
+"""
+tracing.py — Per-Transcript Span Tracing (Local JSONL Exporter)
+================================================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+metrics.py says where p99 goes across a run; it can't say why *this*
+transcript took 40 seconds. Tracing records one tree of timed spans per
+transcript:
+
+    run_pipeline / process_transcript     transcript_id, account_name
+      └─ extract_insights                 model, mode, validation, insights
+           ├─ api_call  (primary)         tokens, cache_hit, retries, continuations
+           ├─ parse_and_validate
+           └─ fallback
+                └─ api_call  (fallback)
+      └─ route_all
+           └─ route_insight               alert_id, destination, confidence
+      └─ deliver                          alerts, output_format
+
+Spans are written to a local file as each one ends, one JSON object per
+line — either a flat span record (default) or an OTLP/JSON
+ExportTraceServiceRequest per line that a collector's file receiver (or
+`otel-cli`, or jq) can read:
+
+    python main.py --transcript-dir transcripts/ --trace-file spans.jsonl
+    python main.py --transcript-dir transcripts/ --trace-file spans.jsonl --trace-format otlp
+
+Design Decision: Standard library only, no opentelemetry-sdk.
+Reason: Same call as metrics.py. The OTLP/JSON shape is a documented wire
+        format; emitting it needs json, not a dependency tree.
+
+Design Decision: Disabled by default; a disabled span is one shared no-op.
+Reason: Untraced runs must not pay for tracing. When off, span() returns a
+        module-level singleton and @traced calls straight through — no ids,
+        no clock reads, no allocation.
+
+Design Decision: The active span lives in a ContextVar.
+Reason: The batch runner interleaves transcripts on one event loop, and the
+        single-transcript path crosses asyncio.run() / to_thread(). Both
+        copy the current context, so children find the right parent
+        without a span argument threaded through every signature.
+"""
+
+import json
+import time
+import atexit
+import random
+import logging
+import inspect
+import threading
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger("jtbd.tracing")
+
+TRACE_FORMATS = ("jsonl", "otlp")
+SERVICE_NAME = "jtbd-feedback-loop"
+SCOPE_NAME = "jtbd.tracing"
+
+_OTLP_STATUS = {"UNSET": 0, "OK": 1, "ERROR": 2}
+_OTLP_SPAN_KIND_INTERNAL = 1
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("jtbd_current_span", default=None)
+_exporter: Optional["JsonlSpanExporter"] = None
+
+
+# ─────────────────────────────────────────────────────────────
+# SPANS
+# ─────────────────────────────────────────────────────────────
+
+class Span:
+    """
+    One timed operation. Use as a context manager: entering makes it the
+    current span, leaving records the end time, marks an escaping exception
+    as ERROR and hands the span to the exporter.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns",
+        "attributes", "events", "status", "status_message", "_token",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.events: list[dict] = []
+        self.status = "UNSET"
+        self.status_message = ""
+        self._token = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        """Adds to a numeric attribute — e.g. retries across several attempts."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def set_status(self, status: str, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.set_status("ERROR", f"{exc_type.__name__}: {exc}")
+        elif self.status == "UNSET":
+            self.status = "OK"
+        _current_span.reset(self._token)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+
+    def to_dict(self) -> dict:
+        """Flat span record — the default JSONL line."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "status_message": self.status_message or None,
+            "attributes": self.attributes,
+            "events": [
+                {"name": e["name"], "time_unix_nano": e["time_ns"], "attributes": e["attributes"]}
+                for e in self.events
+            ],
+        }
+
+    def to_otlp(self) -> dict:
+        """OTLP/JSON span (opentelemetry-proto trace.v1.Span, JSON mapping)."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _OTLP_SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {
+                    "name": e["name"],
+                    "timeUnixNano": str(e["time_ns"]),
+                    "attributes": _otlp_attributes(e["attributes"]),
+                }
+                for e in self.events
+            ],
+            "status": {"code": _OTLP_STATUS[self.status]},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled. Every method does nothing."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes) -> None:
+        pass
+
+    def set_status(self, status: str, message: str = "") -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}     # int64 is a string in OTLP/JSON
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+# ─────────────────────────────────────────────────────────────
+# EXPORTER
+# ─────────────────────────────────────────────────────────────
+
+class JsonlSpanExporter:
+    """
+    Appends one line per finished span. Lines are buffered by the file
+    object and flushed on close; the lock keeps lines whole when spans end
+    on scheduler or to_thread worker threads.
+    """
+
+    def __init__(self, path: str, fmt: str = "jsonl"):
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"trace format must be one of {TRACE_FORMATS}, got: {fmt!r}")
+        self.path = Path(path)
+        self.format = fmt
+        self.exported = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _record(self, span: Span) -> dict:
+        if self.format == "jsonl":
+            return span.to_dict()
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp()]}],
+            }]
+        }
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(self._record(span), default=str)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self.exported += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+# ─────────────────────────────────────────────────────────────
+# API
+# ─────────────────────────────────────────────────────────────
+
+def configure_tracing(path: str, fmt: str = "jsonl") -> JsonlSpanExporter:
+    """
+    Enables tracing for the rest of the process, exporting to `path`.
+    The file is appended to, so resumed or repeated runs share one log.
+    """
+    global _exporter
+    shutdown_tracing()
+    _exporter = JsonlSpanExporter(path, fmt)
+    atexit.register(shutdown_tracing)
+    logger.info(f"Tracing enabled — spans → {path} ({fmt})")
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """Flushes and closes the exporter; later spans become no-ops."""
+    global _exporter
+    exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.close()
+        logger.info(f"Tracing: {exporter.exported} spans written to {exporter.path}")
+
+
+def tracing_enabled() -> bool:
+    return _exporter is not None
+
+
+def span(name: str, **attributes) -> Span | _NoopSpan:
+    """`with span("deliver", alerts=3): ...` — a child of the current span, if any."""
+    if _exporter is None:
+        return NOOP_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+
+def current_span() -> Span | _NoopSpan:
+    """The innermost active span, or the no-op span outside any (or when disabled)."""
+    if _exporter is None:
+        return NOOP_SPAN
+    active = _current_span.get()
+    return active if active is not None else NOOP_SPAN
+
+
+def traced(name: str) -> Callable:
+    """Decorator: runs each call of a sync or async function in its own span."""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return await func(*args, **kwargs)
+                with Span(name, _current_span.get(), {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with Span(name, _current_span.get(), {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
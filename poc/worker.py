@@ -0,0 +1,336 @@
+"""
+worker.py — Long-Running Inbox Worker
+======================================
+JTBD Feedback Loop Architect | Invoca Applied AI Analyst POC
+Author: Erwin M. McDonald
+
+`python main.py --transcript x.txt` pays interpreter startup, the anthropic
+import, client construction and a fresh TLS connection for every call —
+then throws all of it away. The worker pays those once and stays up:
+
+    inbox/             ← drop *.txt transcripts here (write elsewhere, then rename in)
+    inbox/processing/  ← claimed by the worker; back to inbox/ on the next start
+    inbox/done/        ← routed or empty — with <name>.json (alerts, note, timing)
+    inbox/failed/      ← failed — with <name>.json (error)
+
+    python main.py --serve --inbox inbox/ --concurrency 16 --metrics-port 9108
+    python main.py --serve --inbox inbox/ --once        # drain what is there, then exit
+
+Each file goes through batch.process_transcript_async() — the same load →
+extract → route path (prefilter, cascade, chunking, cache, tracing) as a
+batch run — on one event loop with one AsyncAnthropic client, so every
+request reuses the client's keep-alive connection pool.
+
+Design Decision: Claim by rename.
+Reason: os.rename() within one filesystem is atomic. A file is either still
+        in the inbox or already in processing/ — never half-claimed, never
+        processed twice — and a crash leaves it in processing/, where the
+        next start puts it back in the inbox.
+
+Design Decision: Poll the directory (os.scandir), no inotify / watchdog.
+Reason: Standard library only, works on every OS and on network mounts
+        where inotify does not fire. One scandir per interval is noise
+        next to an API round trip.
+
+Design Decision: Only settled *.txt files are claimed.
+Reason: A producer copying a large file in place is still writing it.
+        Files must be unchanged for `settle_seconds` before they are
+        claimed; producers that write to a temp name and rename into the
+        inbox are picked up on the next scan.
+"""
+
+import os
+import json
+import time
+import signal
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from cache import ExtractionCache
+from scheduler import RateLimitScheduler
+from prefilter import Prefilter
+from main import make_client
+from batch import process_transcript_async, batch_result_to_dict, BatchItemResult, DEFAULT_CONCURRENCY
+from metrics import WORKER_FILES
+
+logger = logging.getLogger("jtbd.worker")
+
+DEFAULT_WATCH_INTERVAL = 1.0    # Seconds between inbox scans
+DEFAULT_SETTLE_SECONDS = 0.5    # A file must be this old before it is claimed
+INBOX_PATTERN = ".txt"
+
+
+# ─────────────────────────────────────────────────────────────
+# DATA STRUCTURES
+# ─────────────────────────────────────────────────────────────
+
+@dataclass
+class InboxLayout:
+    """The worker's four directories. done/failed default to inside the inbox."""
+    inbox:      Path
+    processing: Path
+    done:       Path
+    failed:     Path
+
+    @classmethod
+    def under(cls, inbox: str, done: Optional[str] = None, failed: Optional[str] = None) -> "InboxLayout":
+        root = Path(inbox)
+        return cls(
+            inbox=root,
+            processing=root / "processing",
+            done=Path(done) if done else root / "done",
+            failed=Path(failed) if failed else root / "failed",
+        )
+
+    def create(self) -> None:
+        for directory in (self.inbox, self.processing, self.done, self.failed):
+            directory.mkdir(parents=True, exist_ok=True)
+
+
+@dataclass
+class WorkerStats:
+    """Running totals for one worker process."""
+    routed:   int = 0
+    empty:    int = 0
+    failed:   int = 0
+    seconds:  float = 0.0               # Sum of per-transcript processing time
+    started:  float = field(default_factory=time.monotonic)
+
+    def record(self, result: BatchItemResult) -> None:
+        setattr(self, result.status, getattr(self, result.status) + 1)
+        self.seconds += result.elapsed_seconds
+
+    @property
+    def processed(self) -> int:
+        return self.routed + self.empty + self.failed
+
+    def summary(self) -> str:
+        """One-line worker summary for shutdown output."""
+        uptime = time.monotonic() - self.started
+        mean = self.seconds / self.processed if self.processed else 0.0
+        return (
+            f"Worker: {self.processed} transcripts ({self.routed} routed, "
+            f"{self.empty} empty, {self.failed} failed) | "
+            f"{mean:.2f}s mean per transcript | up {uptime:.0f}s"
+        )
+
+
+# ─────────────────────────────────────────────────────────────
+# INBOX OPERATIONS
+# ─────────────────────────────────────────────────────────────
+
+def scan_inbox(inbox: Path, settle_seconds: float = DEFAULT_SETTLE_SECONDS) -> tuple[list[Path], int]:
+    """
+    Lists claimable transcripts, oldest first.
+    Returns: (settled_paths, unsettled_count)
+    """
+    now = time.time()
+    settled: list[tuple[float, str]] = []
+    unsettled = 0
+    with os.scandir(inbox) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.name.endswith(INBOX_PATTERN):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue        # Claimed or removed since the listing
+            if now - mtime >= settle_seconds:
+                settled.append((mtime, entry.path))
+            else:
+                unsettled += 1
+    settled.sort()
+    return [Path(path) for _, path in settled], unsettled
+
+
+def _free_name(directory: Path, name: str) -> Path:
+    """directory/name, or directory/stem.N.suffix if that is taken."""
+    target = directory / name
+    stem, suffix = os.path.splitext(name)
+    n = 1
+    while target.exists():
+        target = directory / f"{stem}.{n}{suffix}"
+        n += 1
+    return target
+
+
+def claim(path: Path, layout: InboxLayout) -> Optional[Path]:
+    """Moves an inbox file into processing/. None if another claimant won."""
+    target = layout.processing / path.name
+    try:
+        os.rename(path, target)
+    except FileNotFoundError:
+        return None
+    return target
+
+
+def finish(path: Path, destination: Path, result: BatchItemResult) -> Path:
+    """
+    Writes <name>.json next to the transcript's final location, then moves
+    the transcript out of processing/. The result file is written first,
+    so a transcript in done/ or failed/ always has its result beside it.
+    """
+    target = _free_name(destination, path.name)
+    report = target.with_suffix(".json")
+    tmp = report.with_name(f".{report.name}.{os.getpid()}.tmp")
+    record = batch_result_to_dict(result)
+    record["path"] = str(target)
+    tmp.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    os.replace(tmp, report)
+    os.replace(path, target)
+    return target
+
+
+def recover_claimed(layout: InboxLayout) -> int:
+    """
+    Returns files left in processing/ by a worker that died mid-transcript
+    to the inbox. Assumes one worker per inbox.
+    """
+    recovered = 0
+    for path in sorted(layout.processing.glob(f"*{INBOX_PATTERN}")):
+        os.replace(path, _free_name(layout.inbox, path.name))
+        recovered += 1
+    if recovered:
+        logger.warning(f"Re-queued {recovered} transcripts left in {layout.processing}")
+    return recovered
+
+
+# ─────────────────────────────────────────────────────────────
+# WORKER LOOP
+# ─────────────────────────────────────────────────────────────
+
+async def _process_claimed(
+    path: Path,
+    layout: InboxLayout,
+    client,
+    semaphore: asyncio.Semaphore,
+    stats: WorkerStats,
+    **options
+) -> None:
+    result = await process_transcript_async(str(path), client, semaphore, **options)
+    destination = layout.failed if result.status == "failed" else layout.done
+    try:
+        moved = finish(path, destination, result)
+    except OSError as e:
+        # Left in processing/ — re-queued on the next start
+        logger.error(f"Could not move '{path.name}' to {destination}: {e}")
+        return
+    stats.record(result)
+    WORKER_FILES.inc(status=result.status)
+    logger.info(
+        f"{result.status.upper()} {result.transcript_id or path.name} → {moved} | "
+        f"{len(result.alerts)} alerts | {result.elapsed_seconds:.2f}s"
+    )
+
+
+async def _close_client(client) -> None:
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    closed = close()
+    if inspect.isawaitable(closed):
+        await closed
+
+
+async def run_worker_async(
+    inbox: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    mock: bool = False,
+    client=None,
+    cache: Optional[ExtractionCache] = None,
+    refresh: bool = False,
+    chunked: bool = False,
+    validation: str = "strict",
+    scheduler: Optional[RateLimitScheduler] = None,
+    cascade: Optional[tuple] = None,
+    prefilter: Optional[Prefilter] = None,
+    mode: str = "text",
+    watch_interval: float = DEFAULT_WATCH_INTERVAL,
+    settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+    once: bool = False,
+    done_dir: Optional[str] = None,
+    failed_dir: Optional[str] = None,
+    stop: Optional[asyncio.Event] = None
+) -> WorkerStats:
+    """
+    Watches `inbox` until `stop` is set (SIGINT / SIGTERM set it too) or,
+    with once=True, until the inbox is empty. At most `concurrency` files
+    are claimed at a time; unclaimed files stay in the inbox. In-flight
+    transcripts are always finished before returning.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be >= 1, got: {concurrency}")
+
+    layout = InboxLayout.under(inbox, done_dir, failed_dir)
+    layout.create()
+    recover_claimed(layout)
+
+    owns_client = client is None and not mock
+    if owns_client:
+        client = make_client(async_client=True, scheduler=scheduler)
+
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    handled_signals = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+            handled_signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass    # Not on this platform / not the main thread
+
+    options = dict(
+        mock=mock, cache=cache, refresh=refresh, chunked=chunked,
+        validation=validation, cascade=cascade, prefilter=prefilter, mode=mode
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = WorkerStats()
+    in_flight: set[asyncio.Task] = set()
+    stop_waiter = asyncio.ensure_future(stop.wait())
+
+    logger.info(
+        f"Worker watching {layout.inbox} | Concurrency: {concurrency} | "
+        f"done → {layout.done} | failed → {layout.failed}"
+    )
+    try:
+        while not stop.is_set():
+            ready, unsettled = scan_inbox(layout.inbox, settle_seconds)
+            for path in ready[:concurrency - len(in_flight)]:
+                claimed = claim(path, layout)
+                if claimed is None:
+                    continue
+                task = asyncio.create_task(_process_claimed(
+                    claimed, layout, client, semaphore, stats, **options
+                ))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if once and not in_flight and not ready and not unsettled:
+                break
+            # Wake on the interval, a shutdown request, or a freed slot
+            await asyncio.wait(
+                {*in_flight, stop_waiter}, timeout=watch_interval,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+    finally:
+        if in_flight:
+            logger.info(f"Worker stopping — finishing {len(in_flight)} in-flight transcripts")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        stop_waiter.cancel()
+        for sig in handled_signals:
+            loop.remove_signal_handler(sig)
+        if owns_client:
+            await _close_client(client)
+        logger.info(stats.summary())
+    return stats
+
+
+def run_worker(inbox: str, **kwargs) -> WorkerStats:
+    """CLI entry point for worker mode. Blocks until stopped (or drained with once=True)."""
+    return asyncio.run(run_worker_async(inbox, **kwargs))